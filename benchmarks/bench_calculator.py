@@ -0,0 +1,574 @@
+"""Benchmarks for the calculator's evaluation and UI-event hot paths.
+
+Run from the repository root::
+
+    python benchmarks/bench_calculator.py --json bench.json
+    python benchmarks/bench_calculator.py --compare bench.json
+
+GUI benchmarks need a display.  When ``DISPLAY`` is unset and ``Xvfb`` is
+installed a private virtual display is started for the run; otherwise the
+GUI benchmarks are reported as skipped.  With ``--compare`` the run exits
+with status 1 if any benchmark's median got slower than the baseline by more
+than ``--threshold``.
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calc_engine  # noqa: E402
+from calc_history import HistoryStore  # noqa: E402
+from calc_worker import EvaluationWorker  # noqa: E402
+
+# Representative expressions as typed on the keypad
+CORPUS = [
+    "2+3",
+    "3×4÷2",
+    "12.5-7.25",
+    "2e3",
+    "1.5e-3*4",
+    "10 mod 3",
+    "2**10",
+    "(1+2)*(3+4)/5",
+    "-2**2+7",
+    "3.141592653589793*2",
+    "2.718281828459045**2",
+    "((1+2)*3-4)/5 mod 7",
+    "sin(30)+cos(60)",
+    "log(1000)+ln(2.718281828459045)",
+    "sqrt(16)*abs(-3)",
+]
+
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """Raised by a benchmark setup that cannot run in this environment"""
+
+
+def benchmark(name, number, gui=False):
+    """Register a setup function returning a callable that runs one op
+
+    ``number`` calls of that callable make one timed repeat.
+    """
+    def register(setup):
+        BENCHMARKS[name] = (setup, number, gui)
+        return setup
+    return register
+
+
+# -- Engine ---------------------------------------------------------------
+
+@benchmark('engine.evaluate.cached', number=20000)
+def bench_engine_cached():
+    engine = calc_engine.ExpressionEngine()
+    corpus = CORPUS
+    state = {'i': 0}
+
+    def run():
+        i = state['i']
+        engine.evaluate(corpus[i % len(corpus)])
+        state['i'] = i + 1
+    return run
+
+
+@benchmark('engine.evaluate.uncached', number=2000)
+def bench_engine_uncached():
+    corpus = CORPUS
+    state = {'i': 0}
+
+    def run():
+        # A cache miss: parse, optimize and compile, as the engine does
+        i = state['i']
+        calc_engine.compile_expression(corpus[i % len(corpus)], optimize=True)()
+        state['i'] = i + 1
+    return run
+
+
+# A keypad-built formula: π inserted as digits, and ``e`` exponents
+KEYPAD_FORMULA = ("sin(x*3.141592653589793/180)**2 + cos(x*3.141592653589793/180)**2"
+                  " * 2.718281828459045e2 / (3.141592653589793*2)")
+
+
+def _keypad_formula(optimize):
+    def setup():
+        compiled = calc_engine.compile_expression(KEYPAD_FORMULA, optimize=optimize)
+        return lambda: compiled({'x': 0.3})
+    return setup
+
+
+benchmark('engine.keypad_formula.optimized', number=20000)(_keypad_formula(True))
+benchmark('engine.keypad_formula.unoptimized', number=20000)(_keypad_formula(False))
+
+
+@benchmark('engine.evaluate_batch.1e5', number=10)
+def bench_engine_batch():
+    import numpy as np
+
+    x = np.linspace(0, 360, 100000)
+    engine = calc_engine.ExpressionEngine()
+    return lambda: engine.evaluate_batch('sin(x)*2 + 3', {'x': x})
+
+
+@benchmark('engine.batch.fast_math.1e-6', number=200)
+def bench_engine_batch_fast():
+    import numpy as np
+
+    x = np.linspace(0, 360, 100000)
+    engine = calc_engine.ExpressionEngine()
+    return lambda: engine.evaluate_batch('sin(x)*2 + 3', {'x': x}, tolerance=1e-6)
+
+
+@benchmark('plot.zoom_redraw', number=200)
+def bench_plot_zoom():
+    from calc_plot import ZOOM_STEP, FunctionSampler, decimate
+
+    sampler = FunctionSampler("sqrt(abs(x))*sin(x)**2 + tan(x)/(1+x**2) - ln(abs(x)+1)*cos(3*x)", 'RAD')
+    state = {'i': 0}
+
+    def run():
+        # Zoom in one wheel step per op, moving to an unsampled region every 40
+        i = state['i']
+        center = 1000.0 * (i // 40)
+        half = 10 / ZOOM_STEP ** (i % 40)
+        xs, ys, _ = sampler.samples(center - half, center + half, 800)
+        decimate(xs, ys, center - half, center + half, 800)
+        state['i'] = i + 1
+    return run
+
+
+def _calculus(method, *args):
+    def setup():
+        from calc_calculus import CalculusEngine
+
+        calculus = CalculusEngine()
+
+        def run():
+            calculus.cache.clear()  # time the computation, not the result cache
+            getattr(calculus, method)(*args)
+        return run
+    return setup
+
+
+benchmark('calculus.integrate.1e-12', number=200)(
+    _calculus('integrate', "sqrt(x)*ln(x) + sin(x)**2", 0, 10, 1e-12, 'RAD'))
+benchmark('calculus.derivative', number=2000)(
+    _calculus('derivative', "sin(x)*2**x", 1.5, 'RAD'))
+benchmark('calculus.solve', number=200)(
+    _calculus('solve', "cos(x) - x/10", -20, 20, 1e-12, 'RAD'))
+
+
+def _matrix(expression, size):
+    def setup():
+        from calc_matrix import MatrixWorkspace
+
+        workspace = MatrixWorkspace()
+        workspace.evaluate(f"A = rand({size}, {size})")
+        workspace.evaluate(f"B = rand({size}, {size})")
+        return lambda: workspace.evaluate(expression)
+    return setup
+
+
+benchmark('matrix.elementwise.1000', number=20)(_matrix("sqrt(abs(sin(A - B)))*2", 1000))
+benchmark('matrix.inv.500', number=20)(_matrix("inv(A)", 500))
+
+
+@benchmark('stats.update.1M', number=20)
+def bench_stats_update():
+    import numpy as np
+    from calc_stats import Summary
+
+    values = np.random.default_rng(0).normal(size=1 << 20)
+    return lambda: Summary().update(values)
+
+
+@benchmark('stats.parse_text.100k', number=20)
+def bench_stats_parse():
+    from calc_stats import parse_numbers
+
+    text = "\n".join(f"{i * 0.37:.6f}" for i in range(100000)).encode()
+    return lambda: parse_numbers(text)
+
+
+@benchmark('combinatorics.factorial.100000', number=3)
+def bench_factorial_exact():
+    from calc_combinatorics import factorial
+
+    return lambda: factorial(100000)
+
+
+@benchmark('combinatorics.comb.1M', number=3)
+def bench_comb_exact():
+    from calc_combinatorics import comb
+
+    return lambda: comb(1000000, 500000)
+
+
+@benchmark('combinatorics.gamma_array.1M', number=20)
+def bench_gamma_array():
+    import numpy as np
+    from calc_combinatorics import gamma_array
+
+    values = np.linspace(-50.5, 170.5, 1 << 20)
+    return lambda: gamma_array(values)
+
+
+@benchmark('columns.evaluate.4M', number=5)
+def bench_columns_evaluate():
+    import numpy as np
+    from calc_columns import evaluate_columns
+
+    directory = tempfile.mkdtemp(prefix='calc-bench-columns-')
+    atexit.register(shutil.rmtree, directory, True)
+    x = os.path.join(directory, 'x.npy')
+    y = os.path.join(directory, 'y.f64')
+    rng = np.random.default_rng(0)
+    np.save(x, rng.normal(size=1 << 22))
+    rng.normal(size=1 << 22).tofile(y)
+    output = os.path.join(directory, 'out.npy')
+    return lambda: evaluate_columns("sqrt(x**2 + y**2)*sin(x)", {'x': x, 'y': y}, output)
+
+
+@benchmark('worksheet.edit_input.500', number=2000)
+def bench_worksheet_edit():
+    from calc_variables import Worksheet
+
+    # Ten chains of fifty definitions; an edit reaches one chain only
+    worksheet = Worksheet()
+    for chain in range(10):
+        worksheet.define(f"a{chain}", "1")
+        for i in range(1, 50):
+            worksheet.define(f"a{chain}_{i}", f"a{chain}_{i - 1}*1.01 + sin(a{chain})"
+                             if i > 1 else f"a{chain}*1.01")
+    state = {'i': 0}
+
+    def run():
+        state['i'] += 1
+        worksheet.define("a3", str(state['i'] % 7))
+    return run
+
+
+# -- Worker-backed operations ---------------------------------------------
+
+def _worker_roundtrip(func, *args):
+    worker = EvaluationWorker()
+    worker.start()
+    atexit.register(worker.close)
+
+    def run():
+        worker.submit(func, *args)
+        while worker.poll(1) is None:
+            pass
+    return run
+
+
+@benchmark('worker.calculate', number=500)
+def bench_worker_calculate():
+    return _worker_roundtrip(calc_engine.evaluate, "(1+2)*(3+4)/5", "DEG")
+
+
+@benchmark('worker.factorial.170', number=500)
+def bench_worker_factorial():
+    import math
+
+    return _worker_roundtrip(math.factorial, 170)
+
+
+# -- History --------------------------------------------------------------
+
+def _populated_history(count):
+    directory = tempfile.mkdtemp(prefix='calc-bench-history-')
+    atexit.register(shutil.rmtree, directory, True)
+    store = HistoryStore(directory)
+    for i in range(count):
+        store.append(f"{i}+{i % 97} = {i + i % 97}")
+    atexit.register(store.close)
+    return store
+
+
+@benchmark('history.append', number=5000)
+def bench_history_append():
+    store = _populated_history(0)
+    return lambda: store.append("12+34 = 46")
+
+
+@benchmark('history.recent_page', number=2000)
+def bench_history_recent():
+    store = _populated_history(100000)
+    return lambda: store.recent(0, 25)
+
+
+@benchmark('history.search_page', number=200)
+def bench_history_search():
+    store = _populated_history(100000)
+    return lambda: store.search("+96 =").page(0, 25)
+
+
+# -- GUI ------------------------------------------------------------------
+
+def ensure_display():
+    """Make sure tkinter can open a window, starting Xvfb if needed"""
+    if sys.platform in ('win32', 'darwin') or os.environ.get('DISPLAY'):
+        return True
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        return False
+    display = f":{100 + os.getpid() % 100}"
+    process = subprocess.Popen([xvfb, display, '-screen', '0', '1024x768x24', '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    atexit.register(process.terminate)
+    os.environ['DISPLAY'] = display
+    time.sleep(0.5)
+    return process.poll() is None
+
+
+_gui = {}
+
+
+def _calculator():
+    """Create (once) a calculator on a withdrawn Tk root"""
+    if 'calculator' not in _gui:
+        if not ensure_display():
+            raise Skip("no display and Xvfb is not installed")
+        import tkinter as tk
+        from scientific_calculator import ScientificCalculator
+
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            raise Skip(f"cannot open a Tk root: {e}")
+        root.withdraw()
+        directory = tempfile.mkdtemp(prefix='calc-bench-gui-')
+        atexit.register(shutil.rmtree, directory, True)
+        calculator = ScientificCalculator(root, history_dir=directory)
+        atexit.register(calculator.worker.close)
+        _gui['root'] = root
+        _gui['calculator'] = calculator
+    return _gui['root'], _gui['calculator']
+
+
+def _settle(root, calculator):
+    """Process Tk events until no evaluation is pending"""
+    root.update_idletasks()
+    while calculator.pending_job is not None:
+        calculator.poll_worker()
+        root.update()
+
+
+@benchmark('gui.calculate', number=300, gui=True)
+def bench_gui_calculate():
+    root, calculator = _calculator()
+    corpus = CORPUS
+    state = {'i': 0}
+
+    def run():
+        i = state['i']
+        calculator.current_expression = corpus[i % len(corpus)]
+        calculator.calculate()
+        _settle(root, calculator)
+        state['i'] = i + 1
+    return run
+
+
+def _scientific(func, mode):
+    def setup():
+        root, calculator = _calculator()
+        calculator.angle_mode = mode
+
+        def run():
+            calculator.current_expression = "30"
+            calculator.scientific_function(func)
+            root.update_idletasks()
+        return run
+    return setup
+
+
+for _func in ('sin', 'cos', 'tan', 'log', 'ln'):
+    for _mode in ('DEG', 'RAD'):
+        benchmark(f'gui.scientific_function.{_func}.{_mode}', number=2000, gui=True)(
+            _scientific(_func, _mode))
+
+
+@benchmark('gui.factorial', number=300, gui=True)
+def bench_gui_factorial():
+    root, calculator = _calculator()
+
+    def run():
+        calculator.current_expression = "170"
+        calculator.factorial()
+        _settle(root, calculator)
+    return run
+
+
+@benchmark('gui.button_click.digit', number=5000, gui=True)
+def bench_gui_click_digit():
+    root, calculator = _calculator()
+    state = {'i': 0}
+
+    def run():
+        state['i'] += 1
+        if state['i'] % 200 == 0:
+            calculator.clear_all()
+        calculator.button_click('7')
+        root.update_idletasks()
+    return run
+
+
+@benchmark('gui.button_click.sequence', number=300, gui=True)
+def bench_gui_click_sequence():
+    root, calculator = _calculator()
+    keys = ['C', '1', '2', '+', '3', '4', '×', '(', '5', '-', '6', ')', '=']
+
+    def run():
+        for key in keys:
+            calculator.button_click(key)
+            root.update_idletasks()
+        _settle(root, calculator)
+    return run
+
+
+@benchmark('gui.key_press.held_digit', number=5000, gui=True)
+def bench_gui_key_repeat():
+    import types
+
+    root, calculator = _calculator()
+    # Auto-repeat delivers press after press without a release in between
+    event = types.SimpleNamespace(keysym='7', state=0, time=0)
+    state = {'i': 0}
+
+    def run():
+        state['i'] += 1
+        if state['i'] % 200 == 0:
+            calculator.clear_all()
+        calculator.on_key_press(event)
+        root.update_idletasks()
+    return run
+
+
+# -- Macros ---------------------------------------------------------------
+
+@benchmark('macro.replay_headless.sequence', number=2000)
+def bench_macro_replay():
+    try:
+        from calc_headless import HeadlessCalculator
+    except ImportError as e:
+        raise Skip(f"tkinter is not available ({e})")
+    import calc_macro
+
+    # The same keys as gui.button_click.sequence, without Tk
+    calculator = HeadlessCalculator()
+    keys = ['C', '1', '2', '+', '3', '4', '×', '(', '5', '-', '6', ')', '=']
+    return lambda: calc_macro.replay(calculator, keys)
+
+
+# -- Runner ---------------------------------------------------------------
+
+def measure(run, number, repeat):
+    """Return per-op timings in nanoseconds for each repeat"""
+    run()  # warm up caches and lazy initialisation
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number * 1e9)
+    return timings
+
+
+def run_benchmarks(names, repeat, scale):
+    results = {}
+    for name in names:
+        setup, number, _ = BENCHMARKS[name]
+        number = max(1, int(number * scale))
+        try:
+            run = setup()
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+            print(f"{name:45} skipped: {e}")
+            continue
+        timings = measure(run, number, repeat)
+        median = statistics.median(timings)
+        results[name] = {
+            'median_ns': median,
+            'min_ns': min(timings),
+            'ops_per_sec': 1e9 / median if median else None,
+            'number': number,
+            'repeat': repeat,
+        }
+        print(f"{name:45} {median / 1000:12.2f} us/op  {1e9 / median:14.0f} op/s")
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline and return regressed names"""
+    regressions = []
+    print(f"\n{'benchmark':45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if 'median_ns' not in result or not base or 'median_ns' not in base:
+            continue
+        change = result['median_ns'] / base['median_ns'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:45} {base['median_ns'] / 1000:10.2f}us {result['median_ns'] / 1000:10.2f}us"
+              f" {change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', '--filter', default='',
+                        help="only run benchmarks whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true',
+                        help="run a tenth of the operations per repeat")
+    parser.add_argument('--no-gui', action='store_true', help="skip GUI benchmarks")
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default 0.10)")
+    args = parser.parse_args(argv)
+
+    names = [name for name, (_, _, gui) in BENCHMARKS.items()
+             if args.filter in name and not (gui and args.no_gui)]
+    results = run_benchmarks(names, args.repeat, 0.1 if args.quick else 1.0)
+    report = {'meta': metadata(), 'results': results}
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Startup-time benchmark for the calculator GUI.
+
+Each run starts a fresh interpreter that imports ``scientific_calculator``
+and, when a display is available, opens the calculator and records:
+
+- import time
+- construction time
+- time to the display's first ``Expose`` (the first frame)
+- time until the deferred keypad is complete
+
+It fails when modules that should load lazily (NumPy, multiprocessing,
+cProfile) are imported before the first frame, or when the median
+time-to-first-frame exceeds ``--max-first-frame``::
+
+    python benchmarks/bench_startup.py --max-first-frame 0.4 --json startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+
+sys.path.insert(0, HERE)
+from bench_calculator import ensure_display  # noqa: E402
+
+# Modules that must not be imported before the first frame
+LAZY_MODULES = ('numpy', 'multiprocessing', 'cProfile')
+
+_PROBE = r'''
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import scientific_calculator
+result = {{'import_seconds': time.perf_counter() - start}}
+if {gui!r}:
+    import tkinter as tk
+    root = tk.Tk()
+    calculator = scientific_calculator.ScientificCalculator(root, history_dir={history!r})
+    result['construct_seconds'] = time.perf_counter() - start
+    def exposed(event):
+        if 'first_frame_seconds' not in result:
+            result['first_frame_seconds'] = time.perf_counter() - start
+            result['loaded_at_first_frame'] = sorted(m for m in {lazy!r} if m in sys.modules)
+    calculator.display_label.bind('<Expose>', exposed)
+    deadline = time.perf_counter() + 10
+    while ('first_frame_seconds' not in result or not calculator.keypad_ready) \
+            and time.perf_counter() < deadline:
+        root.update()
+    result['keypad_ready_seconds'] = time.perf_counter() - start
+    calculator.worker.close()
+    root.destroy()
+else:
+    result['loaded_at_first_frame'] = sorted(m for m in {lazy!r} if m in sys.modules)
+import json
+print(json.dumps(result))
+'''
+
+
+def probe(gui):
+    history = tempfile.mkdtemp(prefix='calc-bench-startup-')
+    try:
+        code = _PROBE.format(repo=REPO, gui=gui, history=history, lazy=LAZY_MODULES)
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                                text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(history, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure calculator startup time")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-first-frame', type=float, default=0.5,
+                        help="fail if the median time-to-first-frame exceeds this (seconds)")
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    gui = ensure_display()
+    if not gui:
+        print("No display and Xvfb is not installed; measuring imports only")
+    runs = [probe(gui) for _ in range(args.repeat)]
+
+    failures = []
+    summary = {}
+    for key in ('import_seconds', 'construct_seconds', 'first_frame_seconds',
+                'keypad_ready_seconds'):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            summary[key] = statistics.median(values)
+            print(f"{key:25} {summary[key] * 1000:9.1f} ms")
+    eager = sorted({module for run in runs for module in run['loaded_at_first_frame']})
+    if eager:
+        failures.append(f"imported before the first frame: {', '.join(eager)}")
+    first_frame = summary.get('first_frame_seconds')
+    if first_frame is not None and first_frame > args.max_first_frame:
+        failures.append(f"time to first frame {first_frame * 1000:.1f} ms exceeds "
+                        f"{args.max_first_frame * 1000:.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'runs': runs, 'failures': failures},
+                      f, indent=2, sort_keys=True)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Load test for the HTTP/JSON evaluation service.
+
+Opens ``--concurrency`` keep-alive connections and sends ``--requests``
+requests through them as fast as the server answers, then reports the
+p50/p99 latency and throughput.  With ``--spawn`` a local server is started
+on a free port for the run::
+
+    python benchmarks/load_test_server.py --spawn -j 4 --requests 5000 --concurrency 32
+    python benchmarks/load_test_server.py --port 8080 --batch-size 100 --json load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+
+sys.path.insert(0, HERE)
+from bench_calculator import CORPUS  # noqa: E402
+
+SHUTDOWN_TIMEOUT = 10.0  # seconds a spawned server gets to stop its workers
+
+
+def spawn_server(workers, timeout):
+    """Start calc_server on a free port and return (process, port)"""
+    command = [sys.executable, os.path.join(REPO, 'calc_server.py'), '--port', '0',
+               '--timeout', str(timeout)]
+    if workers:
+        command += ['-j', str(workers)]
+    process = subprocess.Popen(command, stderr=subprocess.PIPE, text=True)
+    line = process.stderr.readline()
+    if not line.startswith('Serving on '):
+        process.kill()
+        raise RuntimeError(f"server failed to start: {line.strip()}")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def stop_server(process):
+    """Ask a spawned server to shut down cleanly, killing it only if it hangs"""
+    process.send_signal(signal.SIGTERM)
+    try:
+        return process.wait(SHUTDOWN_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise RuntimeError("server did not shut down; it was killed") from None
+
+
+async def request(reader, writer, host, path, payload):
+    """Send one POST on an open connection and return (status, body)"""
+    body = json.dumps(payload).encode('utf-8')
+    writer.write(f'POST {path} HTTP/1.1\r\nHost: {host}\r\n'
+                 f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+                 .encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, path, payloads, counter, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] > 0:
+            counter[0] -= 1
+            payload = payloads[counter[0] % len(payloads)]
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, host, path, payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, requests, concurrency, batch_size, angle_mode):
+    if batch_size:
+        path = '/evaluate/batch'
+        expressions = (CORPUS * (batch_size // len(CORPUS) + 1))[:batch_size]
+        payloads = [{'expressions': expressions, 'angle_mode': angle_mode}]
+    else:
+        path = '/evaluate'
+        payloads = [{'expression': expression, 'angle_mode': angle_mode}
+                    for expression in CORPUS]
+    counter = [requests]
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, path, payloads, counter, latencies, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        'requests': count,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'elapsed_seconds': elapsed,
+        'requests_per_sec': count / elapsed,
+        'expressions_per_sec': count * (batch_size or 1) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(count - 1, int(count * 0.99))] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the calculator HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--spawn', action='store_true',
+                        help="start a local server on a free port for the run")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes for a spawned server")
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help="per-request timeout for a spawned server")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help="expressions per request on /evaluate/batch (default: single)")
+    parser.add_argument('--angle-mode', choices=('DEG', 'RAD'), default='DEG')
+    parser.add_argument('--json', metavar='PATH', help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    process = None
+    port = args.port
+    if args.spawn:
+        process, port = spawn_server(args.workers, args.timeout)
+    try:
+        report = asyncio.run(run_load(args.host, port, args.requests, args.concurrency,
+                                      args.batch_size, args.angle_mode))
+    finally:
+        if process is not None:
+            returncode = stop_server(process)
+            if returncode:
+                print(f"server exited with status {returncode}", file=sys.stderr)
+
+    print(f"requests     {report['requests']} ({report['concurrency']} connections)")
+    print(f"statuses     {report['statuses']}")
+    print(f"throughput   {report['requests_per_sec']:.0f} req/s"
+          f"  ({report['expressions_per_sec']:.0f} expressions/s)")
+    print(f"latency      p50 {report['p50_ms']:.2f} ms  p99 {report['p99_ms']:.2f} ms"
+          f"  max {report['max_ms']:.2f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0 if set(report['statuses']) == {'200'} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
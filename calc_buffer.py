@@ -0,0 +1,92 @@
+"""Chunked text buffer for the expression being edited.
+
+Keystrokes append to and delete from the end of a list of short string
+chunks, so each edit copies at most ``CHUNK_SIZE`` characters no matter how
+long the expression is.  The joined text is built only when something needs
+the whole expression and is cached until the next edit.
+"""
+
+CHUNK_SIZE = 256
+
+
+class ExpressionBuffer:
+    """Append/delete-at-end text buffer with O(1) amortized edits"""
+
+    def __init__(self, text=""):
+        self.set(text)
+
+    def set(self, text):
+        """Replace the whole contents"""
+        text = str(text)
+        self._chunks = [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+        self._length = len(text)
+        self._text = text
+
+    def append(self, text):
+        """Add text at the end"""
+        if not text:
+            return
+        chunks = self._chunks
+        if len(text) > CHUNK_SIZE:
+            chunks.extend(text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE))
+        elif chunks and len(chunks[-1]) + len(text) <= CHUNK_SIZE:
+            chunks[-1] += text
+        else:
+            chunks.append(text)
+        self._length += len(text)
+        self._text = None
+
+    def delete(self, count=1):
+        """Remove up to count characters from the end"""
+        chunks = self._chunks
+        while count > 0 and chunks:
+            last = chunks[-1]
+            if len(last) <= count:
+                chunks.pop()
+                self._length -= len(last)
+                count -= len(last)
+            else:
+                chunks[-1] = last[:-count]
+                self._length -= count
+                count = 0
+        self._text = None
+
+    def head(self, count):
+        """Return the first count characters without joining the buffer"""
+        if self._text is not None:
+            return self._text[:count]
+        parts = []
+        remaining = count
+        for chunk in self._chunks:
+            if remaining <= 0:
+                break
+            parts.append(chunk[:remaining])
+            remaining -= len(chunk)
+        return ''.join(parts)
+
+    def tail(self, count):
+        """Return the last count characters without joining the buffer"""
+        if count <= 0:
+            return ""
+        if self._text is not None:
+            return self._text[-count:]
+        parts = []
+        remaining = count
+        for chunk in reversed(self._chunks):
+            if remaining <= 0:
+                break
+            parts.append(chunk[-remaining:])
+            remaining -= len(chunk)
+        parts.reverse()
+        return ''.join(parts)
+
+    def __len__(self):
+        return self._length
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ''.join(self._chunks)
+        return self._text
+
+    def __repr__(self):
+        return f"ExpressionBuffer({self.head(40)!r}, length={self._length})"
@@ -0,0 +1,180 @@
+"""Evaluate an expression over memory-mapped numeric columns.
+
+Each variable is bound to a ``.npy`` file or a raw little-endian float64
+file (``.f64``/``.bin``), or to a constant.  The result column is
+preallocated on disk and filled in place::
+
+    python calc_columns.py "sqrt(x**2 + y**2)" x=x.npy y=y.f64 -o r.npy -j 4
+
+Files are mapped one window of ``WINDOW_ROWS`` rows at a time and each
+window is cut into ``BLOCK_ROWS`` blocks evaluated by a thread pool; NumPy
+releases the GIL inside its loops, so the threads run in parallel.  A
+window is unmapped before the next is mapped, so resident memory stays
+bounded by the window size however large the files are, and values never
+pass through Python lists.  Expressions are compiled by ``calc_engine``
+exactly as ``evaluate_batch`` does, with the calculator's semantics.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from calc_engine import ExpressionEngine, ExpressionError
+
+BLOCK_ROWS = 1 << 16  # rows evaluated per task; small enough to stay in cache
+WINDOW_ROWS = 1 << 23  # rows mapped at once per column (64 MB of float64)
+
+_engine = ExpressionEngine()
+
+
+def column_layout(path):
+    """(data offset, dtype, length) of a .npy or raw float64 file"""
+    if not path.endswith('.npy'):
+        size = os.path.getsize(path)
+        if size % 8:
+            raise ExpressionError(f"{path}: size is not a multiple of 8 bytes")
+        return 0, np.dtype('<f8'), size // 8
+    with open(path, 'rb') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            raise ExpressionError(f"{path}: unsupported .npy version {version}")
+        offset = f.tell()
+    if dtype.kind not in 'biuf' or dtype.hasobject:
+        raise ExpressionError(f"{path}: {dtype} is not a numeric column")
+    if fortran_order and len(shape) > 1:
+        raise ExpressionError(f"{path}: Fortran-ordered arrays are not supported")
+    return offset, dtype, int(np.prod(shape))
+
+
+def create_column(path, length):
+    """Preallocate a float64 output file; .npy files get a header"""
+    with open(path, 'wb') as f:
+        if path.endswith('.npy'):
+            np.lib.format.write_array_header_1_0(
+                f, {'descr': '<f8', 'fortran_order': False, 'shape': (length,)})
+        # A sparse file: no data is written until the blocks fill it in
+        f.truncate(f.tell() + length * 8)
+    return column_layout(path)
+
+
+def _map(path, layout, start, stop, mode='r'):
+    offset, dtype, _ = layout
+    if stop <= start:
+        return np.empty(0, dtype)
+    return np.memmap(path, dtype=dtype, mode=mode, offset=offset + start * dtype.itemsize,
+                     shape=(stop - start,))
+
+
+def _evaluate_block(compiled, env, out):
+    # Integer and float32 columns are computed in float64, as evaluate_batch
+    # does; float64 columns are used in place
+    env = {name: np.asarray(values, dtype=np.float64) for name, values in env.items()}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        out[:] = compiled(env)
+
+
+def evaluate_columns(text, variables, output, angle_mode='DEG', workers=None,
+                     block_rows=BLOCK_ROWS, window_rows=WINDOW_ROWS, tolerance=None):
+    """Evaluate text over file columns, writing a float64 column to output
+
+    ``variables`` maps names to file paths or numbers.  All files must
+    hold the same number of values.  ``tolerance`` selects fast sin/cos as
+    in ``evaluate_batch``.  Returns the number of rows written.
+    """
+    compiled = _engine.compile(text, angle_mode, vectorized=True, tolerance=tolerance)
+    missing = compiled.variables.difference(variables)
+    if missing:
+        raise ExpressionError(f"Missing values for {', '.join(sorted(missing))}")
+    columns = {}
+    constants = {}
+    for name in compiled.variables:
+        value = variables[name]
+        if isinstance(value, str):
+            if os.path.abspath(value) == os.path.abspath(output):
+                raise ExpressionError(f"{value} is both an input and the output")
+            columns[name] = (value, column_layout(value))
+        else:
+            constants[name] = float(value)
+    lengths = {layout[2] for _, layout in columns.values()}
+    if len(lengths) > 1:
+        raise ExpressionError("Columns have different lengths: "
+                              + ", ".join(f"{name}={layout[2]}"
+                                          for name, (_, layout) in sorted(columns.items())))
+    length = lengths.pop() if lengths else 1
+    out_layout = create_column(output, length)
+
+    workers = workers or os.cpu_count() or 1
+    window_rows = max(window_rows, block_rows)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, length, window_rows):
+            stop = min(start + window_rows, length)
+            inputs = {name: _map(path, layout, start, stop)
+                      for name, (path, layout) in columns.items()}
+            out = _map(output, out_layout, start, stop, mode='r+')
+            tasks = []
+            for lo in range(0, stop - start, block_rows):
+                hi = lo + block_rows
+                env = dict(constants)
+                for name, values in inputs.items():
+                    env[name] = values[lo:hi]
+                tasks.append(pool.submit(_evaluate_block, compiled, env, out[lo:hi]))
+            for task in tasks:
+                task.result()
+            if isinstance(out, np.memmap):
+                out.flush()
+            # Unmap the window so its pages can leave memory before the next
+            del inputs, out, tasks
+    return length
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate an expression over memory-mapped columns of numbers.")
+    parser.add_argument('expression', help="expression in the calculator's syntax")
+    parser.add_argument('bindings', nargs='*', metavar='NAME=VALUE',
+                        help="a .npy or raw float64 (.f64/.bin) file, or a number, per variable")
+    parser.add_argument('-o', '--output', required=True,
+                        help="result file; .npy gets a header, anything else is raw float64")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="threads evaluating blocks (default: all CPUs)")
+    parser.add_argument('--angle-mode', choices=('DEG', 'RAD'), default='DEG')
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS,
+                        help="rows per evaluation task")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="absolute error allowed in sin/cos for speed, e.g. 1e-6 "
+                             "(default: full precision)")
+    args = parser.parse_args(argv)
+
+    variables = {}
+    for binding in args.bindings:
+        name, sep, value = binding.partition('=')
+        if not sep:
+            parser.error(f"expected NAME=VALUE, got {binding!r}")
+        try:
+            variables[name] = float(value)
+        except ValueError:
+            variables[name] = value
+    started = time.perf_counter()
+    try:
+        rows = evaluate_columns(args.expression, variables, args.output, args.angle_mode,
+                                args.workers, args.block_rows, tolerance=args.tolerance)
+    except ZeroDivisionError:
+        print("calc_columns: Cannot divide by zero", file=sys.stderr)
+        return 1
+    except (ExpressionError, ArithmeticError, ValueError, OSError) as e:
+        print(f"calc_columns: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    print(f"{rows} rows in {elapsed:.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,748 @@
+"""Expression engine for the scientific calculator.
+
+Tokenizes, parses and compiles calculator expressions into closures without
+touching tkinter, so the calculator semantics (``×``, ``÷``, ``mod``, the
+``e`` exponent operator, DEG/RAD trigonometry) are usable headless.  Compiled
+expressions are kept in a bounded LRU cache keyed by normalized text.
+
+Before compiling, ``optimize_tree`` folds constant subtrees (the long ``π`` and
+``e`` literals the keypad inserts, ``10**3`` from the exponent operator) and
+merges identical subtrees; a subtree used more than once is then evaluated
+once per call.
+"""
+import math
+import operator
+import re
+from collections import OrderedDict, namedtuple
+from fractions import Fraction
+
+from calc_combinatorics import (comb, comb_array, factorial_array, gamma_array,
+                                lgamma_array, perm, perm_array, scientific_text)
+from calc_combinatorics import factorial as exact_factorial
+from calc_trig import (cos_degrees, cos_degrees_array, sin_degrees, sin_degrees_array,
+                       table_trig, tan_degrees, tan_degrees_array)
+
+DEFAULT_CACHE_SIZE = 256
+MAX_EXACT_FACTORIAL = 250000  # beyond this exact factorials take seconds
+INLINE_FACTORIAL_LIMIT = 2000  # for evaluation on the UI thread
+MAX_DISPLAY_DIGITS = 40  # longer integers are displayed in e notation
+_DISPLAY_LIMIT = 10 ** MAX_DISPLAY_DIGITS
+FOLD_MAX_BITS = 4096  # larger integer powers are left to evaluation time
+
+# Display symbols mapped to their evaluable operators
+_SYMBOLS = str.maketrans({'×': '*', '÷': '/'})
+
+_TOKEN_RE = re.compile(r"""
+    (?P<num>\d+\.?\d*|\.\d+)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<op>\*\*|//|[-+*/%(),])
+  | (?P<space>\s+)
+""", re.VERBOSE)
+
+# ``2e3`` means ``2*10**3`` on the calculator, so ``e`` (optionally followed
+# by the exponent digits) is an operator rather than an identifier; typing
+# exp twice gives names like ``e2e1``
+_EXP_NAME_RE = re.compile(r'(?:e\d*)+$')
+_EXP_PART_RE = re.compile(r'e(\d*)')
+
+
+def multiply(left, right):
+    """``left * right``, exact when a float meets an integer too large for floats
+
+    The display shows long integers as ``d.ddde<n>``, which evaluates as a
+    float times ``10**n``; pressing = on it then gives the number shown
+    instead of an overflow.
+    """
+    try:
+        return left * right
+    except OverflowError:
+        if type(left) in (int, float) and type(right) in (int, float):
+            return int(Fraction(left) * Fraction(right))
+        raise
+
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': multiply,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '%': operator.mod,
+    '**': operator.pow,
+}
+
+UNARY_OPERATORS = {
+    '-': operator.neg,
+    '+': operator.pos,
+}
+
+# AST nodes
+Num = namedtuple('Num', 'value')
+Var = namedtuple('Var', 'name')
+UnaryOp = namedtuple('UnaryOp', 'op operand')
+BinOp = namedtuple('BinOp', 'op left right')
+Call = namedtuple('Call', 'name args')
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+OptimizationInfo = namedtuple('OptimizationInfo', 'nodes_before nodes_after folded shared')
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be tokenized, parsed or resolved"""
+
+
+def normalize(text):
+    """Return the canonical form of an expression used as the cache key"""
+    return ' '.join(text.translate(_SYMBOLS).split())
+
+
+def factorial(x, limit=MAX_EXACT_FACTORIAL):
+    """Exact x! for whole numbers up to limit, Γ(x+1) for other numbers"""
+    if isinstance(x, float) and not x.is_integer():
+        return math.gamma(x + 1)
+    if x > limit:
+        raise ValueError(f"exact factorial is limited to {limit}")
+    return exact_factorial(int(x))
+
+
+def combinations(n, r, limit=MAX_EXACT_FACTORIAL):
+    """Exact nCr, refusing ones that would take longer than factorial(limit)"""
+    if min(r, n - r) > limit:
+        raise ValueError(f"nCr is limited to {limit} factors")
+    return comb(n, r)
+
+
+def permutations(n, r, limit=MAX_EXACT_FACTORIAL):
+    """Exact nPr, refusing ones that would take longer than factorial(limit)"""
+    if r > limit:
+        raise ValueError(f"nPr is limited to {limit} factors")
+    return perm(n, r)
+
+
+def bounded_pow(base, exponent, max_bits):
+    """``base ** exponent`` refusing integer results wider than max_bits"""
+    if (isinstance(base, int) and isinstance(exponent, int) and exponent > 0
+            and abs(base) > 1 and exponent * math.log2(abs(base)) > max_bits):
+        raise OverflowError("result too large")
+    return base ** exponent
+
+
+def scalar_functions(angle_mode='DEG', factorial_limit=MAX_EXACT_FACTORIAL):
+    """Return the scalar function table for the given angle mode
+
+    ``factorial_limit`` bounds exact factorials, nCr and nPr; callers on the
+    UI thread pass ``INLINE_FACTORIAL_LIMIT``.
+    """
+    if angle_mode == 'DEG':
+        sin, cos, tan = sin_degrees, cos_degrees, tan_degrees
+    else:
+        sin, cos, tan = math.sin, math.cos, math.tan
+    return {
+        'sin': sin,
+        'cos': cos,
+        'tan': tan,
+        'log': math.log10,
+        'ln': math.log,
+        'sqrt': math.sqrt,
+        'abs': abs,
+        'factorial': lambda x: factorial(x, factorial_limit),
+        'gamma': math.gamma,
+        'lgamma': math.lgamma,
+        'nCr': lambda n, r: combinations(n, r, factorial_limit),
+        'nPr': lambda n, r: permutations(n, r, factorial_limit),
+    }
+
+
+def vector_functions(angle_mode='DEG', tolerance=None):
+    """Return the NumPy function table for element-wise evaluation
+
+    With a ``tolerance`` sin and cos come from ``calc_trig.TableTrig``,
+    accurate to that absolute error, instead of full precision.
+    """
+    import numpy as np
+
+    if angle_mode == 'DEG':
+        sin, cos, tan = sin_degrees_array, cos_degrees_array, tan_degrees_array
+    else:
+        sin, cos, tan = np.sin, np.cos, np.tan
+    if tolerance is not None:
+        table = table_trig(angle_mode, tolerance)
+        sin, cos = table.sin, table.cos
+    return {
+        'sin': sin,
+        'cos': cos,
+        'tan': tan,
+        'log': np.log10,
+        'ln': np.log,
+        'sqrt': np.sqrt,
+        'abs': np.abs,
+        'factorial': factorial_array,
+        'gamma': gamma_array,
+        'lgamma': lgamma_array,
+        'nCr': comb_array,
+        'nPr': perm_array,
+    }
+
+
+def iter_tokens(text, offset=0):
+    """Yield ``(position, kind, value)`` tokens from expression text
+
+    Positions are relative to ``offset`` so a caller can re-tokenize just
+    the tail of a longer expression.  All tokens produced by one ``e``
+    exponent operator share its position.
+    """
+    text = text.translate(_SYMBOLS)
+    pos = 0
+    length = len(text)
+    while pos < length:
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:
+            raise ExpressionError(f"Unexpected character {text[pos]!r} at {pos + offset}")
+        start = pos + offset
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'space':
+            continue
+        if kind == 'num':
+            yield start, 'num', float(value) if '.' in value else int(value)
+        elif kind == 'name':
+            if value == 'mod':
+                yield start, 'op', '%'
+            elif _EXP_NAME_RE.match(value):
+                for exp in _EXP_PART_RE.finditer(value):
+                    yield start, 'op', '*'
+                    yield start, 'num', 10
+                    yield start, 'op', '**'
+                    if exp.group(1):
+                        yield start, 'num', int(exp.group(1))
+            else:
+                yield start, 'name', value
+        else:
+            yield start, 'op', value
+
+
+def tokenize(text):
+    """Split normalized expression text into ``(kind, value)`` tokens"""
+    return [(kind, value) for _, kind, value in iter_tokens(text)]
+
+
+class _Parser:
+    """Recursive-descent parser following Python operator precedence"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return ('end', None)
+
+    def advance(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        token = self.advance()
+        if token != ('op', value):
+            raise ExpressionError(f"Expected {value!r}")
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        node = self.expression()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def expression(self):
+        node = self.term()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            op = self.advance()[1]
+            node = BinOp(op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek() in (('op', '*'), ('op', '/'), ('op', '//'), ('op', '%')):
+            op = self.advance()[1]
+            node = BinOp(op, node, self.factor())
+        return node
+
+    def factor(self):
+        if self.peek() in (('op', '-'), ('op', '+')):
+            op = self.advance()[1]
+            return UnaryOp(op, self.factor())
+        return self.power()
+
+    def power(self):
+        node = self.atom()
+        if self.peek() == ('op', '**'):
+            self.advance()
+            # Right associative, and the exponent may carry a unary sign
+            node = BinOp('**', node, self.factor())
+        return node
+
+    def atom(self):
+        kind, value = self.advance()
+        if kind == 'num':
+            return Num(value)
+        if kind == 'name':
+            if self.peek() == ('op', '('):
+                self.advance()
+                args = []
+                if self.peek() != ('op', ')'):
+                    args.append(self.expression())
+                    while self.peek() == ('op', ','):
+                        self.advance()
+                        args.append(self.expression())
+                self.expect(')')
+                return Call(value, tuple(args))
+            return Var(value)
+        if (kind, value) == ('op', '('):
+            node = self.expression()
+            self.expect(')')
+            return node
+        if kind == 'end':
+            raise ExpressionError("Unexpected end of expression")
+        raise ExpressionError(f"Unexpected token {value!r}")
+
+
+def parse(text):
+    """Parse expression text into an AST"""
+    return _Parser(tokenize(normalize(text))).parse()
+
+
+def variables(node):
+    """Return the set of variable names referenced by an AST"""
+    names = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        kind = type(node)
+        if kind is Var:
+            names.add(node.name)
+        elif kind is UnaryOp:
+            stack.append(node.operand)
+        elif kind is BinOp:
+            stack.append(node.left)
+            stack.append(node.right)
+        elif kind is Call:
+            stack.extend(node.args)
+    return names
+
+
+def _left_chain(node, shared=None):
+    """Unwind a left-leaning chain of left-associative binary operators
+
+    Returns the leftmost operand and the ``(op, right)`` steps applied to it,
+    so long pasted sums such as ``1+1+...+1`` compile without recursing once
+    per operator.  The chain stops at a shared node.
+    """
+    steps = []
+    while type(node) is BinOp and node.op != '**' and not (shared and id(node) in shared):
+        steps.append((node.op, node.right))
+        node = node.left
+    steps.reverse()
+    return node, steps
+
+
+def compile_node(node, functions, operators=BINARY_OPERATORS, shared=None):
+    """Compile an AST into a closure taking a variable mapping
+
+    ``operators`` maps binary operator symbols to the functions applying
+    them, so callers can substitute guarded versions.  ``shared`` maps the
+    ids of subtrees evaluated ahead of time to the names holding their
+    values.
+    """
+    if shared and id(node) in shared:
+        return compile_node(Var(shared[id(node)]), functions)
+    kind = type(node)
+    if kind is Num:
+        value = node.value
+        return lambda env: value
+    if kind is Var:
+        name = node.name
+
+        def lookup(env):
+            try:
+                return env[name]
+            except (KeyError, TypeError):
+                raise ExpressionError(f"Unknown variable {name!r}") from None
+        return lookup
+    if kind is UnaryOp:
+        func = UNARY_OPERATORS[node.op]
+        operand = compile_node(node.operand, functions, operators, shared)
+        return lambda env: func(operand(env))
+    if kind is BinOp:
+        if (node.op != '**' and type(node.left) is BinOp and node.left.op != '**'
+                and not (shared and id(node.left) in shared)):
+            first, steps = _left_chain(node, shared)
+            first = compile_node(first, functions, operators, shared)
+            steps = [(operators[op], compile_node(right, functions, operators, shared))
+                     for op, right in steps]
+
+            def chain(env):
+                value = first(env)
+                for func, right in steps:
+                    value = func(value, right(env))
+                return value
+            return chain
+        func = operators[node.op]
+        left = compile_node(node.left, functions, operators, shared)
+        right = compile_node(node.right, functions, operators, shared)
+        return lambda env: func(left(env), right(env))
+    if kind is Call:
+        if node.name not in functions:
+            raise ExpressionError(f"Unknown function {node.name!r}")
+        func = functions[node.name]
+        args = [compile_node(arg, functions, operators, shared) for arg in node.args]
+        if len(args) == 1:
+            arg = args[0]
+            return lambda env: func(arg(env))
+        return lambda env: func(*[arg(env) for arg in args])
+    raise ExpressionError(f"Cannot compile node {node!r}")
+
+
+def _children(node):
+    kind = type(node)
+    if kind is BinOp:
+        return (node.left, node.right)
+    if kind is UnaryOp:
+        return (node.operand,)
+    if kind is Call:
+        return node.args
+    return ()
+
+
+def _fold(node, functions, vectorized):
+    """The value of a node whose operands are all numbers, or None to keep it"""
+    kind = type(node)
+    try:
+        if kind is UnaryOp:
+            value = UNARY_OPERATORS[node.op](node.operand.value)
+        elif kind is BinOp:
+            left, right = node.left.value, node.right.value
+            if node.op == '**':
+                value = bounded_pow(left, right, FOLD_MAX_BITS)
+            else:
+                value = BINARY_OPERATORS[node.op](left, right)
+        elif node.name in functions:
+            value = functions[node.name](*[arg.value for arg in node.args])
+        else:
+            return None
+    except (ArithmeticError, ValueError, TypeError):
+        # Left in place so the error is raised, or NumPy's inf/nan produced,
+        # when the expression is evaluated
+        return None
+    if isinstance(value, complex) or (vectorized and isinstance(value, int)
+                                      and abs(value) > 2 ** 53):
+        return None
+    return Num(value)
+
+
+def optimize_tree(tree, angle_mode='DEG', vectorized=False):
+    """Fold constant subtrees and merge identical ones
+
+    Returns the new tree, in which equal subtrees are the same object, and
+    an ``OptimizationInfo``.  Folding uses the scalar functions, skipping
+    any subtree that raises or whose value NumPy would handle differently.
+    """
+    functions = scalar_functions(angle_mode, INLINE_FACTORIAL_LIMIT)
+    canonical = {}  # structural key -> node
+    optimized = {}  # id of an input node -> its optimized node
+    before = 0
+    folded = 0
+    stack = [(tree, False)]
+    while stack:
+        original, expanded = stack.pop()
+        if id(original) in optimized:
+            continue
+        children = _children(original)
+        if children and not expanded:
+            stack.append((original, True))
+            stack.extend((child, False) for child in children)
+            continue
+        before += 1
+        node = original
+        kind = type(node)
+        if kind is BinOp:
+            node = BinOp(node.op, optimized[id(node.left)], optimized[id(node.right)])
+        elif kind is UnaryOp:
+            node = UnaryOp(node.op, optimized[id(node.operand)])
+        elif kind is Call:
+            node = Call(node.name, tuple(optimized[id(arg)] for arg in node.args))
+        children = _children(node)
+        if children and all(type(child) is Num for child in children):
+            value = _fold(node, functions, vectorized)
+            if value is not None:
+                node = value
+                children = ()
+                folded += 1
+        kind = type(node)
+        if kind is Num:
+            # repr keeps 1 and 1.0, and 0.0 and -0.0, apart
+            key = (Num, repr(node.value))
+        elif kind is Var:
+            key = (Var, node.name)
+        else:
+            key = (kind, node[0], tuple(id(child) for child in children))
+        optimized[id(original)] = canonical.setdefault(key, node)
+    tree = optimized[id(tree)]
+    shared, after = _shared_nodes(tree)
+    return tree, OptimizationInfo(before, after, folded, len(shared))
+
+
+def _float_constants(tree):
+    """The tree with every number as a NumPy float64, keeping shared subtrees shared
+
+    Vectorized closures then compute constant subtrees that could not be
+    folded, such as ``1/0`` or ``10**400``, with NumPy's inf/nan results
+    instead of raising.
+    """
+    import numpy as np
+
+    converted = {}  # id of an input node -> its converted node
+    stack = [(tree, False)]
+    while stack:
+        original, expanded = stack.pop()
+        if id(original) in converted:
+            continue
+        children = _children(original)
+        if children and not expanded:
+            stack.append((original, True))
+            stack.extend((child, False) for child in children)
+            continue
+        node = original
+        kind = type(node)
+        if kind is Num:
+            try:
+                node = Num(np.float64(node.value))
+            except OverflowError:
+                # Integer literals too long for a float
+                node = Num(np.float64(np.inf))
+        elif kind is BinOp:
+            node = BinOp(node.op, converted[id(node.left)], converted[id(node.right)])
+        elif kind is UnaryOp:
+            node = UnaryOp(node.op, converted[id(node.operand)])
+        elif kind is Call:
+            node = Call(node.name, tuple(converted[id(arg)] for arg in node.args))
+        converted[id(original)] = node
+    return converted[id(tree)]
+
+
+def _shared_nodes(tree):
+    """Operator and call nodes used more than once, operands first
+
+    Also returns the number of distinct nodes.
+    """
+    uses = {}
+    order = []
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            order.append(node)
+            continue
+        uses[id(node)] = uses.get(id(node), 0) + 1
+        if uses[id(node)] == 1:
+            stack.append((node, True))
+            stack.extend((child, False) for child in _children(node))
+    shared = [node for node in order if uses[id(node)] > 1 and type(node) not in (Num, Var)]
+    return shared, len(order)
+
+
+def compile_shared(tree, functions, operators=BINARY_OPERATORS):
+    """Compile a tree from ``optimize_tree``, evaluating shared subtrees once per call"""
+    shared_nodes, _ = _shared_nodes(tree)
+    if not shared_nodes:
+        return compile_node(tree, functions, operators)
+    # Variables never start with '#', so these names cannot clash
+    shared = {id(node): f"#{i}" for i, node in enumerate(shared_nodes)}
+    steps = []
+    for node in shared_nodes:
+        name = shared.pop(id(node))
+        steps.append((name, compile_node(node, functions, operators, shared)))
+        shared[id(node)] = name
+    body = compile_node(tree, functions, operators, shared)
+
+    def evaluate_shared(env):
+        scope = dict(env)
+        for name, step in steps:
+            scope[name] = step(scope)
+        return body(scope)
+    return evaluate_shared
+
+
+class CompiledExpression:
+    """A parsed expression compiled into a reusable closure"""
+
+    __slots__ = ('source', 'tree', 'variables', 'angle_mode', 'vectorized', 'optimization',
+                 '_fn')
+
+    def __init__(self, source, tree, angle_mode, fn, vectorized=False, optimization=None):
+        self.source = source
+        self.tree = tree
+        self.variables = frozenset(variables(tree))
+        self.angle_mode = angle_mode
+        self.vectorized = vectorized
+        self.optimization = optimization
+        self._fn = fn
+
+    def __call__(self, env=None):
+        return self._fn(env if env is not None else {})
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r}, angle_mode={self.angle_mode!r})"
+
+
+def compile_expression(text, angle_mode='DEG', vectorized=False, optimize=False,
+                       tolerance=None):
+    """Parse and compile expression text without caching
+
+    With ``vectorized`` the closure uses NumPy ufuncs and accepts arrays for
+    its variables, evaluating the whole expression element-wise in one pass;
+    ``tolerance`` then selects fast sin and cos (see ``vector_functions``).
+    With ``optimize`` the tree goes through ``optimize_tree`` first, so
+    constant subtrees are computed here, once, rather than on every call
+    (or every batch, plot tile and quadrature pass).
+    """
+    source = normalize(text)
+    tree = _Parser(tokenize(source)).parse()
+    if vectorized:
+        functions = vector_functions(angle_mode, tolerance)
+    else:
+        functions = scalar_functions(angle_mode)
+    if not optimize:
+        if vectorized:
+            tree = _float_constants(tree)
+        return CompiledExpression(source, tree, angle_mode, compile_node(tree, functions),
+                                  vectorized)
+    tree, info = optimize_tree(tree, angle_mode, vectorized)
+    if vectorized:
+        tree = _float_constants(tree)
+    fn = compile_shared(tree, functions)
+    return CompiledExpression(source, tree, angle_mode, fn, vectorized, info)
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping with hit/miss counters"""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ExpressionEngine:
+    """Compiles and evaluates expressions through an LRU compile cache"""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache = LRUCache(cache_size)
+
+    def compile(self, text, angle_mode='DEG', vectorized=False, tolerance=None):
+        """Return the optimized, compiled form of an expression, parsing only on a miss"""
+        key = (normalize(text), angle_mode, vectorized, tolerance)
+        compiled = self.cache.get(key)
+        if compiled is None:
+            compiled = compile_expression(key[0], angle_mode, vectorized, True, tolerance)
+            self.cache.put(key, compiled)
+        return compiled
+
+    def evaluate(self, text, angle_mode='DEG', env=None):
+        """Evaluate an expression with optional variable bindings"""
+        return self.compile(text, angle_mode)(env)
+
+    def evaluate_batch(self, text, variables=None, angle_mode='DEG', tolerance=None):
+        """Evaluate an expression element-wise over arrays of variable values
+
+        ``variables`` maps names to array-likes which are broadcast against
+        each other; the result is a float64 array of the broadcast shape.
+        A ``tolerance`` such as 1e-6 trades sin/cos precision for speed.
+        """
+        import numpy as np
+
+        compiled = self.compile(text, angle_mode, vectorized=True, tolerance=tolerance)
+        variables = variables or {}
+        missing = compiled.variables.difference(variables)
+        if missing:
+            raise ExpressionError(f"Missing values for {', '.join(sorted(missing))}")
+        env = {name: np.asarray(variables[name], dtype=np.float64)
+               for name in compiled.variables}
+        shape = np.broadcast_shapes(*(np.shape(value) for value in variables.values()))
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            result = np.asarray(compiled(env), dtype=np.float64)
+        if result.shape != shape:
+            result = np.broadcast_to(result, shape).copy()
+        return result
+
+    def cache_info(self):
+        return self.cache.info()
+
+
+def round_result(result):
+    """Round floats the way the calculator display does"""
+    if isinstance(result, float):
+        result = round(result, 10)
+    return result
+
+
+def format_result(result):
+    """Display text for a result; long integers are shown as ``d.ddde<n>``"""
+    result = round_result(result)
+    if isinstance(result, int) and abs(result) >= _DISPLAY_LIMIT:
+        return scientific_text(result)
+    return str(result)
+
+
+_default_engine = ExpressionEngine()
+
+
+def evaluate(text, angle_mode='DEG', env=None):
+    """Evaluate an expression using the shared module-level engine"""
+    return _default_engine.evaluate(text, angle_mode, env)
+
+
+def evaluate_batch(text, variables=None, angle_mode='DEG', tolerance=None):
+    """Vectorized evaluation using the shared module-level engine"""
+    return _default_engine.evaluate_batch(text, variables, angle_mode, tolerance)
+
+
+def optimization_info(text, angle_mode='DEG', vectorized=False):
+    """Node counts before and after optimizing an expression, via the shared engine"""
+    return _default_engine.compile(text, angle_mode, vectorized).optimization
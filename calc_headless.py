@@ -0,0 +1,92 @@
+"""The calculator's command handlers without Tk.
+
+``HeadlessCalculator`` is the GUI class with its widgets replaced by
+stand-ins: labels keep only their text, timers and idle callbacks never
+run (so there is no live preview), history stays in memory and worker
+jobs run synchronously.  Every keypad command therefore behaves exactly as
+in the window, at tens of thousands of commands per second, which is what
+``calc_macro`` replays bug reports and stress tests through.
+
+Jobs run inline by default, so a runaway expression such as ``9**9**9``
+blocks the caller; pass ``isolated=True`` to run them in the evaluation
+worker with its time and memory budget, at the cost of a process round trip.
+"""
+from calc_worker import DEFAULT_TIMEOUT, ERROR, OK, EvaluationWorker
+from scientific_calculator import ScientificCalculator
+
+WORKER_POLL = 0.5  # seconds between deadline checks while waiting on an isolated job
+
+
+class TextLabel:
+    """Stands in for a Tk label, keeping only its text"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text=""):
+        self.text = text
+
+    def config(self, text=None, **options):
+        if text is not None:
+            self.text = text
+
+    configure = config
+
+    def cget(self, option):
+        return self.text if option == 'text' else None
+
+
+class NullRoot:
+    """Stands in for the Tk root; scheduled callbacks are dropped"""
+
+    def after(self, ms, func=None, *args):
+        return None
+
+    def after_idle(self, func, *args):
+        return None
+
+    def after_cancel(self, job):
+        pass
+
+    def clipboard_get(self):
+        return ""
+
+
+class HeadlessCalculator(ScientificCalculator):
+    """A calculator with no window, driven through button_click and paste_text"""
+
+    def __init__(self, history=(), isolated=False, timeout=DEFAULT_TIMEOUT):
+        self.root = NullRoot()
+        self.setup_state()
+        self.history.extend(history)
+        self.isolated = isolated
+        self.worker = EvaluationWorker(timeout)
+        self.display_label = TextLabel("0")
+        self.expression_label = TextLabel()
+        self.angle_label = TextLabel(f"Mode: {self.angle_mode}")
+        self.memory_label = TextLabel("M: 0")
+
+    def open_history(self, directory=None):
+        return []
+
+    def request_redraw(self):
+        # No event loop to coalesce in; labels are cheap to write
+        self.update_display()
+
+    def run_in_worker(self, func, args, on_done):
+        """Run func(*args) to completion and pass (status, value) to on_done"""
+        if self.isolated:
+            self.worker.submit(func, *args)
+            outcome = None
+            while outcome is None:
+                outcome = self.worker.poll(WORKER_POLL)
+            on_done(*outcome)
+            return
+        try:
+            value = func(*args)
+        except Exception as e:
+            on_done(ERROR, e)
+        else:
+            on_done(OK, value)
+
+    def close(self):
+        self.worker.close()
@@ -0,0 +1,236 @@
+"""Persistent calculation history.
+
+Entries are appended as UTF-8 lines to ``history.log``; ``history.idx``
+holds the byte offset of every line as native 64-bit integers.  Both files
+are memory-mapped for reading, so appending, random access by index and
+paging from the newest entry are constant-time regardless of how many
+entries have accumulated, and searches scan the mapped log with ``rfind``
+instead of decoding every line.
+
+Several calculator windows may share one history: appends take an
+exclusive ``flock`` on the log and record the offset where the line really
+landed, and every read picks up entries the other windows have added.
+"""
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows; a single window per history is assumed
+    fcntl = None
+
+HISTORY_DIR = os.path.join(os.path.expanduser('~'), '.scientific_calculator')
+LOG_NAME = 'history.log'
+INDEX_NAME = 'history.idx'
+
+_OFFSET = struct.Struct('Q')
+
+
+def _map(file):
+    """Map a whole file read-only, or return empty bytes for an empty file"""
+    size = os.fstat(file.fileno()).st_size
+    if not size:
+        return b''
+    return mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+
+
+@contextmanager
+def _locked(file):
+    """Hold an exclusive lock on file for the duration of the block"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class HistoryStore:
+    """Append-only history log with a memory-mapped offset index"""
+
+    def __init__(self, directory=HISTORY_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._log = open(os.path.join(directory, LOG_NAME), 'a+b')
+        self._index = open(os.path.join(directory, INDEX_NAME), 'a+b')
+        self._log_map = self._index_map = b''
+        self._offsets = memoryview(b'').cast('Q')
+        self._count = 0
+        with _locked(self._log):
+            self._recover()
+
+    def _recover(self):
+        """Repair the index after a crash between the log and index writes"""
+        index_size = os.fstat(self._index.fileno()).st_size
+        if index_size % _OFFSET.size:
+            self._index.truncate(index_size - index_size % _OFFSET.size)
+        self._refresh()
+        log_size = len(self._log_map)
+        if self._offsets:
+            end = self._log_map.find(b'\n', self._offsets[-1]) + 1
+            if end == 0:
+                # The last line was cut short; drop it from both files
+                self._log.truncate(self._offsets[-1])
+                self._index.truncate((len(self._offsets) - 1) * _OFFSET.size)
+                self._refresh()
+                return
+        else:
+            end = 0
+        # Index any complete lines that were logged but not indexed
+        while end < log_size:
+            newline = self._log_map.find(b'\n', end)
+            if newline < 0:
+                self._log.truncate(end)
+                break
+            self._index.write(_OFFSET.pack(end))
+            end = newline + 1
+        self._index.flush()
+        self._refresh()
+
+    def _refresh(self):
+        """Remap the files if they have grown since they were last mapped"""
+        log_size = os.fstat(self._log.fileno()).st_size
+        if len(self._log_map) != log_size:
+            self._log_map = _map(self._log)
+        index_size = os.fstat(self._index.fileno()).st_size
+        if len(self._index_map) != index_size:
+            self._offsets.release()
+            self._index_map = _map(self._index)
+            self._offsets = memoryview(self._index_map).cast('Q')
+            self._count = len(self._offsets)
+
+    def append(self, entry):
+        """Add an entry to the end of the history"""
+        data = entry.replace('\n', ' ').encode('utf-8') + b'\n'
+        with _locked(self._log):
+            # Another window may have appended since; the log is in append
+            # mode, so the line lands at the current end of the file
+            offset = os.fstat(self._log.fileno()).st_size
+            self._log.write(data)
+            self._log.flush()
+            self._index.write(_OFFSET.pack(offset))
+            self._index.flush()
+            self._count = os.fstat(self._index.fileno()).st_size // _OFFSET.size
+
+    def __len__(self):
+        self._refresh()
+        return self._count
+
+    def __getitem__(self, index):
+        self._refresh()
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("history index out of range")
+        return self._entry(index)
+
+    def _entry(self, index):
+        """Decode one entry from the current mappings"""
+        start = self._offsets[index]
+        end = self._log_map.find(b'\n', start)
+        return self._log_map[start:end].decode('utf-8')
+
+    def entries(self, indices):
+        """Return the entries at several valid indices with one refresh"""
+        self._refresh()
+        return [self._entry(i) for i in indices]
+
+    def recent(self, start=0, count=50):
+        """Return up to count entries, newest first, skipping the newest start"""
+        self._refresh()
+        last = self._count - 1 - start
+        return self.entries(range(last, max(last - count, -1), -1))
+
+    def search(self, query, prefix=False):
+        """Return an incremental search over the history for query"""
+        return HistorySearch(self, query, prefix)
+
+    def _find(self, needle, stop, prefix):
+        """Index of the newest entry before stop containing needle, or -1"""
+        self._refresh()
+        if stop <= 0:
+            return -1
+        end = self._log_map.find(b'\n', self._offsets[stop - 1]) + 1
+        if prefix:
+            pos = self._log_map.rfind(b'\n' + needle, 0, end)
+            if pos >= 0:
+                return bisect_right(self._offsets, pos + 1) - 1
+            # The first entry is not preceded by a newline
+            if self._log_map[:len(needle)] == needle:
+                return 0
+            return -1
+        pos = self._log_map.rfind(needle, 0, end)
+        if pos < 0:
+            return -1
+        return bisect_right(self._offsets, pos) - 1
+
+    def close(self):
+        self._offsets.release()
+        for mapped in (self._log_map, self._index_map):
+            if mapped:
+                mapped.close()
+        self._log.close()
+        self._index.close()
+
+
+class HistorySearch:
+    """Lazily collected matches for one query, newest first
+
+    Matches are only located as far as a caller pages, and a search that
+    narrows a previous one (via ``refine``) filters the matches already
+    found instead of rescanning them.
+    """
+
+    def __init__(self, store, query, prefix=False):
+        self.store = store
+        self.query = query
+        self.prefix = prefix
+        self.matches = []
+        self._needle = query.encode('utf-8')
+        self._stop = len(store)  # entries below this are still unscanned
+
+    @property
+    def exhausted(self):
+        return self._stop <= 0
+
+    def _narrows(self, query):
+        if self.prefix:
+            return query.startswith(self.query)
+        return self.query in query
+
+    def refine(self, query):
+        """Return a search for query, reusing this one if query narrows it"""
+        if not self._narrows(query):
+            return HistorySearch(self.store, query, self.prefix)
+        search = HistorySearch(self.store, query, self.prefix)
+        test = str.startswith if self.prefix else str.__contains__
+        search.matches = [i for i in self.matches if test(self.store[i], query)]
+        search._stop = self._stop
+        return search
+
+    def fetch(self, count):
+        """Scan until at least count matches are known or history runs out"""
+        if not self._needle:
+            # An empty query matches everything
+            while len(self.matches) < count and self._stop > 0:
+                self._stop -= 1
+                self.matches.append(self._stop)
+            return self.matches[:count]
+        while len(self.matches) < count and self._stop > 0:
+            found = self.store._find(self._needle, self._stop, self.prefix)
+            if found < 0:
+                self._stop = 0
+                break
+            self.matches.append(found)
+            self._stop = found
+        return self.matches[:count]
+
+    def page(self, start, count):
+        """Return the matching entries for one page of results"""
+        indices = self.fetch(start + count)[start:start + count]
+        return self.store.entries(indices)
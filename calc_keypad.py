@@ -0,0 +1,131 @@
+"""Declarative command table for the keypad and keyboard.
+
+Every calculator command is one ``Command`` row: the button label, the
+button kind (its color), the ``ScientificCalculator`` method and arguments
+it runs, and the keys that trigger it.  The keypad layout, the key map and
+dispatch are all derived from this table, so a command is added in one
+place and every lookup is a dict access.
+
+Keys are Tk keysyms, optionally prefixed with ``Control-`` or ``Shift-``
+(``Shift-`` only matters for keys whose keysym does not already change
+with Shift, such as F12).  Commands of kind ``shortcut`` have no button.
+"""
+import math
+from collections import namedtuple
+
+# Modifier bits of a Tk event's state
+SHIFT_MASK = 0x1
+CONTROL_MASK = 0x4
+
+
+class Command(namedtuple('Command', 'label kind method args keys buffered repeat')):
+    """One calculator command
+
+    ``buffered`` commands only edit the expression, so their redraws are
+    coalesced; ``repeat`` commands keep firing while their key is held.
+    """
+
+    __slots__ = ()
+
+
+def _command(label, kind, method, *args, keys=(), buffered=False, repeat=None):
+    # Editing keys auto-repeat; anything with a side effect fires once per press
+    return Command(label, kind, method, args, keys, buffered,
+                   buffered if repeat is None else repeat)
+
+
+def _digit(digit):
+    return _command(digit, 'num', 'append_number', digit, keys=(digit, f'KP_{digit}'),
+                    buffered=True)
+
+
+COMMAND_TABLE = (
+    *(_digit(digit) for digit in '0123456789'),
+    _command('00', 'num', 'append_number', '00', buffered=True),
+    _command('.', 'num', 'append_number', '.', keys=('period', 'KP_Decimal'), buffered=True),
+    _command('+', 'op', 'append_operator', '+', keys=('plus', 'KP_Add'), buffered=True),
+    _command('-', 'op', 'append_operator', '-', keys=('minus', 'KP_Subtract'), buffered=True),
+    _command('×', 'op', 'append_operator', '×', keys=('asterisk', 'KP_Multiply'), buffered=True),
+    _command('÷', 'op', 'append_operator', '÷', keys=('slash', 'KP_Divide'), buffered=True),
+    _command('%', 'op', 'append_operator', '%', keys=('percent',), buffered=True),
+    _command('(', 'op', 'append_number', '(', keys=('parenleft',), buffered=True),
+    _command(')', 'op', 'append_number', ')', keys=('parenright',), buffered=True),
+    _command('xⁿ', 'func', 'append_operator', '**', keys=('asciicircum',), buffered=True),
+    _command('exp', 'func', 'append_operator', 'e', keys=('e',), buffered=True),
+    _command('mod', 'func', 'append_operator', ' mod ', keys=('m',), buffered=True),
+    _command('π', 'func', 'append_number', str(math.pi), keys=('p',), buffered=True),
+    _command('e', 'func', 'append_number', str(math.e), keys=('E',), buffered=True),
+    _command('⌫', 'clear', 'backspace', keys=('BackSpace',), buffered=True),
+    _command('=', 'equal', 'calculate', keys=('Return', 'KP_Enter', 'equal')),
+    _command('C', 'clear', 'clear_all', keys=('Escape',)),
+    _command('CE', 'clear', 'clear_entry', keys=('Delete',)),
+    _command('sin', 'func', 'scientific_function', 'sin', keys=('s',)),
+    _command('cos', 'func', 'scientific_function', 'cos', keys=('c',)),
+    _command('tan', 'func', 'scientific_function', 'tan', keys=('t',)),
+    _command('log', 'func', 'scientific_function', 'log', keys=('l',)),
+    _command('ln', 'func', 'scientific_function', 'ln', keys=('n',)),
+    _command('x²', 'func', 'power_function', 2, keys=('q',)),
+    _command('√', 'func', 'sqrt_function', keys=('r',)),
+    _command('1/x', 'func', 'reciprocal', keys=('i',)),
+    _command('|x|', 'func', 'absolute', keys=('bar',)),
+    _command('!', 'func', 'factorial', keys=('exclam',)),
+    _command('±', 'func', 'negate', keys=('F9',)),
+    _command('Ans', 'func', 'use_last_answer', keys=('a',)),
+    _command('DEG/RAD', 'memory', 'toggle_angle_mode', keys=('d',)),
+    _command('MC', 'memory', 'memory_clear', keys=('Control-l',)),
+    _command('MR', 'memory', 'memory_recall', keys=('Control-r',)),
+    _command('M+', 'memory', 'memory_add', keys=('Control-plus', 'Control-equal',
+                                                 'Control-KP_Add')),
+    _command('M-', 'memory', 'memory_subtract', keys=('Control-minus', 'Control-KP_Subtract')),
+    # Keyboard only; these run even while an evaluation is in progress
+    _command('Paste', 'shortcut', 'paste', keys=('Control-v',)),
+    _command('Plot', 'shortcut', 'open_plot', keys=('Control-p',)),
+    _command('Calculus', 'shortcut', 'open_calculus', keys=('Control-i',)),
+    _command('Matrix', 'shortcut', 'open_matrix', keys=('Control-m',)),
+    _command('Variables', 'shortcut', 'open_variables', keys=('Control-d',)),
+    _command('Statistics', 'shortcut', 'open_stats', keys=('Control-t',)),
+    _command('Metrics', 'shortcut', 'dump_metrics', keys=('F12',)),
+    _command('Profile', 'shortcut', 'profile_evaluations', keys=('Shift-F12',)),
+    _command('Record', 'shortcut', 'toggle_recording', keys=('F8',)),
+    _command('Replay', 'shortcut', 'replay_macro', keys=('Shift-F8',)),
+)
+
+COMMANDS = {command.label: command for command in COMMAND_TABLE}
+
+# Button labels, row by row
+KEYPAD_LAYOUT = (
+    ('sin', 'cos', 'tan', 'log', 'ln'),
+    ('x²', '√', 'xⁿ', '1/x', '|x|'),
+    ('MC', 'MR', 'M+', 'M-', 'DEG/RAD'),
+    ('π', 'e', '(', ')', '!'),
+    ('CE', 'C', '⌫', '÷', '%'),
+    ('7', '8', '9', '×', 'exp'),
+    ('4', '5', '6', '-', 'mod'),
+    ('1', '2', '3', '+', '±'),
+    ('0', '00', '.', '=', 'Ans'),
+)
+
+
+def _key_bindings():
+    bindings = {}
+    for command in COMMAND_TABLE:
+        for key in command.keys:
+            if key in bindings:
+                raise ValueError(f"{key} is bound to both {bindings[key]} and {command.label}")
+            bindings[key] = command.label
+    return bindings
+
+
+KEY_BINDINGS = _key_bindings()
+
+
+def command_for_key(keysym, state=0):
+    """The command label a key press triggers, or None"""
+    if state & CONTROL_MASK:
+        return KEY_BINDINGS.get(f'Control-{keysym}') or KEY_BINDINGS.get(f'Control-{keysym.lower()}')
+    if state & SHIFT_MASK:
+        # Shift already shows in the keysym of printable keys ('E', 'plus')
+        label = KEY_BINDINGS.get(f'Shift-{keysym}')
+        if label is not None:
+            return label
+    return KEY_BINDINGS.get(keysym)
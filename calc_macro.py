@@ -0,0 +1,282 @@
+"""Record and replay keypad macros.
+
+A macro is every command that went through ``button_click`` while
+recording, plus pasted text, stored one event per line after a JSON header
+holding the state the recording started from::
+
+    {"format": "calc-macro", "version": 1, "angle_mode": "DEG", ...}
+    1
+    +
+    2
+    =
+    Paste	sin(30)*2
+
+Files ending in ``.gz`` are compressed.  ``replay`` runs the events
+synchronously against any calculator and times each one; in the GUI,
+``MacroPlayer`` steps through them from the Tk event loop instead.  To
+replay headless, without Tk, for bug reports and stress tests::
+
+    python calc_macro.py session.calcmacro --json
+"""
+import argparse
+import gzip
+import heapq
+import json
+import sys
+import time
+
+from calc_keypad import COMMANDS
+
+FORMAT = 'calc-macro'
+VERSION = 1
+PASTE = 'Paste'
+SLOWEST_EVENTS = 10  # slowest events listed in a replay report
+REPLAY_DELAY_MS = 1  # pause between events replayed into the GUI
+POLL_INTERVAL_MS = 20  # how often the GUI replay checks for a finished job
+
+
+class MacroError(ValueError):
+    """Raised for a macro file that cannot be replayed"""
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline='\n')
+    return open(path, mode, encoding='utf-8', newline='\n')
+
+
+def save_macro(path, state, events):
+    """Write the starting state and events to path"""
+    header = dict(state, format=FORMAT, version=VERSION)
+    with _open(path, 'w') as f:
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for event in events:
+            # Pasted text has its whitespace collapsed, so it never holds a tab or newline
+            f.write(event + '\n' if type(event) is str else f"{PASTE}\t{event[1]}\n")
+
+
+def load_macro(path):
+    """Read (state, events) from a macro file, checking every command"""
+    with _open(path, 'r') as f:
+        try:
+            state = json.loads(f.readline())
+        except ValueError:
+            raise MacroError(f"{path}: not a macro file") from None
+        if not isinstance(state, dict) or state.get('format') != FORMAT:
+            raise MacroError(f"{path}: not a macro file")
+        if state.get('version') != VERSION:
+            raise MacroError(f"{path}: unsupported macro version {state.get('version')}")
+        events = []
+        for number, line in enumerate(f, 2):
+            line = line.rstrip('\n')
+            if line.startswith(PASTE + '\t'):
+                events.append((PASTE, line[len(PASTE) + 1:]))
+                continue
+            command = COMMANDS.get(line)
+            if command is None or command.kind == 'shortcut':
+                raise MacroError(f"{path}:{number}: unknown command {line!r}")
+            events.append(command.label)
+    return state, events
+
+
+def capture_state(calculator):
+    """The calculator state a recording starts from"""
+    history = calculator.history
+    return {
+        'angle_mode': calculator.angle_mode,
+        'expression': calculator.current_expression,
+        'memory': calculator.memory,
+        'variables': {name: calculator.worksheet.source(name)
+                      for name in calculator.worksheet.definitions if name != 'M'},
+        # Ans reads the last history entry
+        'history': [history[-1]] if len(history) else [],
+    }
+
+
+def apply_state(calculator, state):
+    """Put a calculator back into a recorded starting state
+
+    The history is left alone; a headless calculator is created with the
+    recorded entries instead.
+    """
+    calculator.clear_all()
+    if state.get('angle_mode', calculator.angle_mode) != calculator.angle_mode:
+        calculator.toggle_angle_mode()
+    for name, source in state.get('variables', {}).items():
+        calculator.refresh_variables(calculator.worksheet.define(name, source))
+    memory = state.get('memory', 0)
+    calculator.memory = memory
+    calculator.memory_label.config(text=f"M: {memory:.4g}")
+    calculator.current_expression = state.get('expression', "")
+    calculator.update_display()
+
+
+def dispatch(calculator, event):
+    """Send one recorded event to the calculator"""
+    if type(event) is str:
+        calculator.button_click(event)
+    else:
+        calculator.paste_text(event[1])
+
+
+def final_state(calculator, history_start=0):
+    """The state a replay ended in; history lists entries added since history_start"""
+    history = calculator.history
+    return {
+        'current_expression': calculator.current_expression,
+        'display': calculator.display_label.cget('text'),
+        'memory': calculator.memory,
+        'angle_mode': calculator.angle_mode,
+        'history': [history[i] for i in range(history_start, len(history))],
+    }
+
+
+def replay(calculator, events, timer=time.perf_counter):
+    """Run events through the calculator one after another; return a report"""
+    history_start = len(calculator.history)
+    click = calculator.button_click
+    paste = calculator.paste_text
+    seconds = []
+    record = seconds.append
+    started = timer()
+    for event in events:
+        start = timer()
+        if type(event) is str:
+            click(event)
+        else:
+            paste(event[1])
+        record(timer() - start)
+    elapsed = timer() - started
+    return make_report(events, seconds, elapsed, final_state(calculator, history_start))
+
+
+def make_report(events, seconds, elapsed, state):
+    """Summarize per-event timings: totals, per command and the slowest events"""
+    commands = {}
+    for event, duration in zip(events, seconds):
+        label = event if type(event) is str else PASTE
+        stats = commands.get(label)
+        if stats is None:
+            commands[label] = [1, duration, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+            if duration > stats[2]:
+                stats[2] = duration
+    slowest = heapq.nlargest(SLOWEST_EVENTS, range(len(seconds)), key=seconds.__getitem__)
+    return {
+        'events': len(seconds),
+        'seconds': elapsed,
+        'events_per_second': len(seconds) / elapsed if elapsed > 0 else 0.0,
+        'state': state,
+        'commands': {label: {'count': count, 'mean': total / count, 'max': longest}
+                     for label, (count, total, longest) in commands.items()},
+        'slowest': [{'index': i, 'command': events[i] if type(events[i]) is str else PASTE,
+                     'seconds': seconds[i]} for i in slowest],
+        'event_seconds': seconds,
+    }
+
+
+def format_report(report):
+    """Plain-text rendering of a replay report"""
+    state = report['state']
+    lines = [f"{report['events']} events in {report['seconds']:.3f}s "
+             f"({report['events_per_second']:,.0f} events/s)",
+             f"expression: {state['current_expression'] or '(empty)'}",
+             f"display:    {state['display']}",
+             f"memory:     {state['memory']}",
+             f"angle mode: {state['angle_mode']}",
+             f"history:    {len(state['history'])} new entries"]
+    lines.extend(f"  {entry}" for entry in state['history'][-SLOWEST_EVENTS:])
+    lines.append(f"{'command':<10} {'count':>8} {'mean µs':>10} {'max µs':>10}")
+    for label, stats in sorted(report['commands'].items(), key=lambda item: -item[1]['count']):
+        lines.append(f"{label:<10} {stats['count']:>8} {stats['mean'] * 1e6:>10.1f} "
+                     f"{stats['max'] * 1e6:>10.1f}")
+    lines.append("slowest events:")
+    lines.extend(f"  #{event['index']:<8} {event['command']:<10} {event['seconds'] * 1e6:>10.1f} µs"
+                 for event in report['slowest'])
+    return '\n'.join(lines)
+
+
+class MacroPlayer:
+    """Replay events into the GUI one at a time from the Tk event loop
+
+    Each event's time runs until any worker job it started has finished,
+    so the report matches a headless replay.  Redraws happen between events.
+    """
+
+    def __init__(self, calculator, events, on_done):
+        self.calculator = calculator
+        self.events = events
+        self.on_done = on_done
+        self.index = 0
+        self.started = None
+        self.seconds = []
+        self.history_start = len(calculator.history)
+        self.replay_started = time.perf_counter()
+        self.job = None
+
+    def start(self):
+        self.job = self.calculator.root.after(REPLAY_DELAY_MS, self.step)
+
+    def cancel(self):
+        if self.job is not None:
+            self.calculator.root.after_cancel(self.job)
+            self.job = None
+
+    def step(self):
+        calculator = self.calculator
+        if calculator.pending_job is not None:
+            self.job = calculator.root.after(POLL_INTERVAL_MS, self.step)
+            return
+        if self.started is not None:
+            self.seconds.append(time.perf_counter() - self.started)
+        if self.index == len(self.events):
+            self.job = None
+            elapsed = time.perf_counter() - self.replay_started
+            self.on_done(make_report(self.events, self.seconds, elapsed,
+                                     final_state(calculator, self.history_start)))
+            return
+        event = self.events[self.index]
+        self.index += 1
+        self.started = time.perf_counter()
+        dispatch(calculator, event)
+        self.job = calculator.root.after(REPLAY_DELAY_MS, self.step)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a recorded macro headless and report the final state and timings.")
+    parser.add_argument('macro', help="macro file recorded with F8 (.gz is decompressed)")
+    parser.add_argument('--json', action='store_true',
+                        help="print the full report, including every event's time, as JSON")
+    parser.add_argument('--isolated', action='store_true',
+                        help="evaluate in the worker process with its time and memory budget")
+    args = parser.parse_args(argv)
+
+    from calc_headless import HeadlessCalculator
+
+    try:
+        state, events = load_macro(args.macro)
+    except (MacroError, OSError, UnicodeDecodeError) as e:
+        print(f"calc_macro: {e}", file=sys.stderr)
+        return 1
+    calculator = HeadlessCalculator(state.get('history', ()), isolated=args.isolated)
+    try:
+        apply_state(calculator, state)
+        report = replay(calculator, events)
+    except (ArithmeticError, ValueError) as e:
+        print(f"calc_macro: {e}", file=sys.stderr)
+        return 1
+    finally:
+        calculator.close()
+    if args.json:
+        json.dump(report, sys.stdout)
+        print()
+    else:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
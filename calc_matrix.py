@@ -0,0 +1,309 @@
+"""Matrix and vector mode backed by NumPy.
+
+Named matrices live in a ``MatrixWorkspace`` as C-contiguous float64
+arrays and are used in ordinary calculator expressions.  Operators and the
+scientific functions (honouring the angle mode) work element-wise, and the
+linear algebra is exposed as functions::
+
+    dot(A, B)  inv(A)  det(A)  solve(A, b)  eig(A)  transpose(A)
+    eye(n)  zeros(rows, cols)  rand(rows, cols)
+
+Literals are written row by row with ``;`` (or newlines) between rows, e.g.
+``[1, 2; 3, 4]``; a single row is a vector.  Element-wise functions write
+into their argument when it is an intermediate result that nothing else
+holds, so ``sqrt(abs(A - B))`` allocates one array rather than three.
+
+``MatrixWindow`` runs evaluations on a background thread; NumPy releases
+the GIL inside its kernels, so the Tk event loop keeps running while a
+large inverse or eigen-decomposition is computed.
+"""
+import re
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog
+
+import numpy as np
+
+from calc_engine import ExpressionError, compile_node, parse, variables
+from calc_trig import cos_degrees_array, sin_degrees_array, tan_degrees_array
+
+POLL_INTERVAL_MS = 20
+PREVIEW_EDGE_ITEMS = 3
+
+_ASSIGN_RE = re.compile(r'\s*([A-Za-z_]\w*)\s*=\s*(.+)$', re.S)
+_NAME_RE = re.compile(r'[A-Za-z_]\w*$')
+_RESERVED_RE = re.compile(r'((e\d*)+|mod)$')  # tokenized as operators
+
+
+def parse_matrix(text):
+    """Parse a ``[1, 2; 3, 4]`` literal into a float64 array
+
+    Rows may also be separated by newlines or written as nested
+    ``[[1, 2], [3, 4]]`` lists; elements by commas or whitespace.
+    """
+    body = text.replace('],', ';').replace('[', ' ').replace(']', ' ').replace('\n', ';')
+    rows = [row.replace(',', ' ').split() for row in body.split(';')]
+    rows = [row for row in rows if row]
+    if not rows:
+        raise ExpressionError("Empty matrix")
+    width = len(rows[0])
+    if any(len(row) != width for row in rows):
+        raise ExpressionError("Rows must all have the same number of elements")
+    try:
+        values = np.array([value for row in rows for value in row], dtype=np.float64)
+    except ValueError:
+        raise ExpressionError("Matrix elements must be numbers") from None
+    return values if len(rows) == 1 else values.reshape(len(rows), width)
+
+
+def load_matrix(path):
+    """Read a matrix from a .npy file or a comma/whitespace separated text file"""
+    if path.endswith('.npy'):
+        return np.load(path)
+    delimiter = ',' if path.endswith('.csv') else None
+    return np.loadtxt(path, delimiter=delimiter, ndmin=1)
+
+
+def describe(value):
+    """Short text form of a result: shape plus a summarized preview"""
+    if not isinstance(value, np.ndarray):
+        return str(value)
+    shape = '×'.join(str(n) for n in value.shape)
+    text = np.array2string(value, precision=6, suppress_small=True, threshold=100,
+                           edgeitems=PREVIEW_EDGE_ITEMS, max_line_width=100)
+    return f"{shape} {value.dtype.name}\n{text}"
+
+
+def _owned_temporary(x, held):
+    """Whether x is an intermediate float64 array safe to overwrite"""
+    return (type(x) is np.ndarray and x.dtype == np.float64 and x.base is None
+            and x.flags.c_contiguous and x.flags.writeable and id(x) not in held)
+
+
+def _elementwise(ufunc, held):
+    def apply(x):
+        out = x if _owned_temporary(x, held) else None
+        return ufunc(x, out=out)
+    return apply
+
+
+def _degrees(exact, ufunc):
+    """A calc_trig degree function, exact at multiples of 90°; complex input is scaled to radians"""
+    def apply(x):
+        if np.iscomplexobj(x):
+            return ufunc(x * (np.pi / 180))
+        result = exact(x)
+        return result[()] if result.ndim == 0 else result
+    return apply
+
+
+def _linalg(func):
+    def apply(*args):
+        try:
+            return func(*args)
+        except np.linalg.LinAlgError as e:
+            raise ExpressionError(str(e)) from None
+    return apply
+
+
+def _eig(a):
+    """Eigenvalues, using the symmetric solver when it applies"""
+    if a.ndim == 2 and a.shape[0] == a.shape[1] and np.allclose(a, a.T):
+        return np.linalg.eigvalsh(a)
+    values = np.linalg.eigvals(a)
+    return values.real if not np.any(values.imag) else values
+
+
+def _shape(rows, cols=None):
+    return (int(rows),) if cols is None else (int(rows), int(cols))
+
+
+def matrix_functions(angle_mode='DEG', held=frozenset()):
+    """Function table for matrix expressions
+
+    ``held`` holds the ids of arrays owned by the workspace, which the
+    element-wise functions must never overwrite.
+    """
+    if angle_mode == 'DEG':
+        sin = _degrees(sin_degrees_array, np.sin)
+        cos = _degrees(cos_degrees_array, np.cos)
+        tan = _degrees(tan_degrees_array, np.tan)
+    else:
+        sin, cos, tan = (_elementwise(ufunc, held) for ufunc in (np.sin, np.cos, np.tan))
+    return {
+        'sin': sin,
+        'cos': cos,
+        'tan': tan,
+        'log': _elementwise(np.log10, held),
+        'ln': _elementwise(np.log, held),
+        'sqrt': _elementwise(np.sqrt, held),
+        'abs': _elementwise(np.abs, held),
+        'dot': _linalg(np.matmul),
+        'inv': _linalg(np.linalg.inv),
+        'det': _linalg(lambda a: float(np.linalg.det(a))),
+        'solve': _linalg(np.linalg.solve),
+        'eig': _linalg(_eig),
+        'transpose': np.transpose,
+        'eye': lambda n: np.eye(int(n)),
+        'zeros': lambda rows, cols=None: np.zeros(_shape(rows, cols)),
+        'rand': lambda rows, cols=None: np.random.default_rng().random(_shape(rows, cols)),
+    }
+
+
+class MatrixWorkspace:
+    """Named matrices and the evaluator for expressions over them"""
+
+    def __init__(self):
+        self.matrices = {}
+
+    def store(self, name, value):
+        """Keep value under name as a C-contiguous array (float64 when real)"""
+        if not _NAME_RE.match(name) or _RESERVED_RE.match(name) or name in matrix_functions():
+            raise ExpressionError(f"{name!r} cannot be used as a matrix name")
+        value = np.asarray(value)
+        dtype = np.complex128 if np.iscomplexobj(value) else np.float64
+        self.matrices[name] = np.ascontiguousarray(value, dtype=dtype)
+        return self.matrices[name]
+
+    def define(self, name, text):
+        return self.store(name, parse_matrix(text))
+
+    def load(self, name, path):
+        return self.store(name, load_matrix(path))
+
+    def remove(self, name):
+        self.matrices.pop(name, None)
+
+    def evaluate(self, text, angle_mode='DEG'):
+        """Evaluate ``expr`` or ``name = expr`` and return (name, value)
+
+        Array results are stored under name (``ans`` by default); scalar
+        results are returned without being stored.
+        """
+        match = _ASSIGN_RE.match(text)
+        name, source = (match.group(1), match.group(2)) if match else ('ans', text)
+        tree = parse(source)
+        missing = variables(tree) - set(self.matrices)
+        if missing:
+            raise ExpressionError(f"Unknown matrices: {', '.join(sorted(missing))}")
+        held = frozenset(id(matrix) for matrix in self.matrices.values())
+        fn = compile_node(tree, matrix_functions(angle_mode, held))
+        with np.errstate(all='ignore'):
+            value = fn(self.matrices)
+        if isinstance(value, np.ndarray) and value.ndim:
+            return name, self.store(name, value)
+        return name, value.item() if isinstance(value, np.generic) else value
+
+
+class MatrixWindow(tk.Toplevel):
+    """Matrix entry and evaluation, computed on a background thread"""
+
+    def __init__(self, master, angle_mode=lambda: 'DEG', on_scalar=None, colors=None):
+        super().__init__(master)
+        colors = colors or {}
+        bg = colors.get('bg', '#1e1e1e')
+        fg = colors.get('display_fg', '#ffffff')
+        self.title("Matrices")
+        self.configure(bg=bg)
+        self.columnconfigure(1, weight=1)
+        self.angle_mode = angle_mode
+        self.on_scalar = on_scalar
+        self.workspace = MatrixWorkspace()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+
+        tk.Label(self, text="Name", bg=bg, fg=fg, font=('Arial', 10)).grid(
+            row=0, column=0, sticky='ne', padx=5, pady=2)
+        self.name_var = tk.StringVar(value='A')
+        tk.Entry(self, textvariable=self.name_var, width=8, font=('Arial', 10)).grid(
+            row=0, column=1, sticky='w', padx=5, pady=2)
+        self.literal_text = tk.Text(self, height=4, width=48, font=('Courier', 10))
+        self.literal_text.insert('1.0', "[1, 2; 3, 4]")
+        self.literal_text.grid(row=1, column=0, columnspan=3, sticky='we', padx=5, pady=2)
+        buttons = tk.Frame(self, bg=bg)
+        buttons.grid(row=2, column=0, columnspan=3, sticky='w', padx=5)
+        tk.Button(buttons, text="Store", command=self.store).pack(side=tk.LEFT)
+        tk.Button(buttons, text="Load…", command=self.load).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(self, text="Expr", bg=bg, fg=fg, font=('Arial', 10)).grid(
+            row=3, column=0, sticky='e', padx=5, pady=(8, 2))
+        self.expression_var = tk.StringVar(value="ans = inv(A)")
+        expression_entry = tk.Entry(self, textvariable=self.expression_var, font=('Arial', 10))
+        expression_entry.grid(row=3, column=1, sticky='we', padx=5, pady=(8, 2))
+        expression_entry.bind('<Return>', lambda e: self.evaluate())
+        tk.Button(self, text="Evaluate", command=self.evaluate).grid(
+            row=3, column=2, padx=5, pady=(8, 2))
+
+        self.matrix_list = tk.Listbox(self, height=5, font=('Courier', 10))
+        self.matrix_list.grid(row=4, column=0, columnspan=3, sticky='we', padx=5, pady=2)
+        self.result_text = tk.Text(self, height=10, width=48, font=('Courier', 10),
+                                   state=tk.DISABLED)
+        self.result_text.grid(row=5, column=0, columnspan=3, sticky='nsew', padx=5, pady=2)
+        self.rowconfigure(5, weight=1)
+        self.status_label = tk.Label(self, text="", anchor='w', bg=bg, fg='#888888',
+                                     font=('Arial', 9))
+        self.status_label.grid(row=6, column=0, columnspan=3, sticky='we', padx=5)
+        self.bind('<Destroy>', self.on_destroy, add='+')
+
+    def store(self):
+        name = self.name_var.get().strip()
+        text = self.literal_text.get('1.0', tk.END)
+        self.run(lambda: (name, self.workspace.define(name, text)))
+
+    def load(self):
+        path = filedialog.askopenfilename(
+            parent=self, filetypes=[("Matrices", "*.npy *.csv *.txt"), ("All files", "*")])
+        if path:
+            name = self.name_var.get().strip()
+            self.run(lambda: (name, self.workspace.load(name, path)))
+
+    def evaluate(self):
+        text = self.expression_var.get()
+        angle_mode = self.angle_mode()
+        self.run(lambda: self.workspace.evaluate(text, angle_mode))
+
+    def run(self, job):
+        """Run job on the background thread unless one is already running"""
+        if self.future is not None:
+            self.status_label.config(text="Busy…")
+            return
+        self.started = time.perf_counter()
+        self.status_label.config(text="Computing…")
+        self.future = self.executor.submit(job)
+        self.after(POLL_INTERVAL_MS, self.poll)
+
+    def poll(self):
+        if not self.winfo_exists():
+            return
+        if not self.future.done():
+            self.after(POLL_INTERVAL_MS, self.poll)
+            return
+        future, self.future = self.future, None
+        elapsed = time.perf_counter() - self.started
+        try:
+            name, value = future.result()
+        except (ExpressionError, ArithmeticError, TypeError, ValueError, MemoryError, OSError) as e:
+            self.status_label.config(text=f"Error: {e}")
+            return
+        self.show(f"{name} = {describe(value)}")
+        self.refresh_list()
+        self.status_label.config(text=f"{elapsed * 1000:.1f} ms")
+        if not isinstance(value, np.ndarray) and self.on_scalar is not None:
+            self.on_scalar(value)
+
+    def show(self, text):
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete('1.0', tk.END)
+        self.result_text.insert('1.0', text)
+        self.result_text.config(state=tk.DISABLED)
+
+    def refresh_list(self):
+        self.matrix_list.delete(0, tk.END)
+        for name, matrix in sorted(self.workspace.matrices.items()):
+            shape = '×'.join(str(n) for n in matrix.shape)
+            self.matrix_list.insert(tk.END, f"{name:8} {shape}")
+
+    def on_destroy(self, event):
+        if event.widget is self:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,200 @@
+"""Opt-in latency and error instrumentation.
+
+``metrics`` is a process-wide registry of per-operation latency histograms,
+call counts and error counts.  It is disabled unless the ``CALC_METRICS``
+environment variable is set (or ``metrics.enable()`` is called); while
+disabled an instrumented call costs one attribute check.  Snapshots can be
+rendered as JSON or in the Prometheus text exposition format, and
+``profile_next`` captures a cProfile of the next N worker evaluations.
+"""
+import functools
+import os
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with call and error counts"""
+
+    __slots__ = ('buckets', 'count', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction q of calls finished"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'sum_seconds': self.total,
+            'max_seconds': self.max,
+            'p50_seconds': self.quantile(0.5),
+            'p99_seconds': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(BUCKETS, self.buckets)},
+            'overflow': self.buckets[-1],
+        }
+
+
+class Metrics:
+    """Registry of operation histograms"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.operations = {}
+        self.profile_remaining = 0
+        self.profile_total = 0
+        self.profile_path = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.operations.clear()
+
+    def histogram(self, name):
+        histogram = self.operations.get(name)
+        if histogram is None:
+            histogram = self.operations[name] = Histogram()
+        return histogram
+
+    def observe(self, name, seconds, error=False):
+        """Record one call of an operation"""
+        if not self.enabled:
+            return
+        histogram = self.histogram(name)
+        histogram.observe(seconds)
+        if error:
+            histogram.errors += 1
+
+    def record_error(self, name):
+        """Count an error that was handled without raising"""
+        if self.enabled:
+            self.histogram(name).errors += 1
+
+    def timed(self, name):
+        """Decorator recording the latency of every call while enabled"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    self.observe(name, time.perf_counter() - start, error=True)
+                    raise
+                self.observe(name, time.perf_counter() - start)
+                return result
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        return {name: histogram.as_dict()
+                for name, histogram in sorted(self.operations.items())}
+
+    def to_json(self):
+        import json
+
+        return json.dumps({'timestamp': time.time(), 'operations': self.snapshot()},
+                          indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Render the histograms in the Prometheus text exposition format"""
+        lines = [
+            '# HELP calculator_operation_seconds Latency of calculator operations',
+            '# TYPE calculator_operation_seconds histogram',
+        ]
+        for name, histogram in sorted(self.operations.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f'calculator_operation_seconds_bucket'
+                             f'{{operation="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'calculator_operation_seconds_bucket'
+                         f'{{operation="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'calculator_operation_seconds_sum{{operation="{name}"}} {histogram.total}')
+            lines.append(f'calculator_operation_seconds_count{{operation="{name}"}} {histogram.count}')
+        lines.append('# HELP calculator_operation_errors_total Errors handled by calculator operations')
+        lines.append('# TYPE calculator_operation_errors_total counter')
+        for name, histogram in sorted(self.operations.items()):
+            lines.append(f'calculator_operation_errors_total{{operation="{name}"}} {histogram.errors}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Write a snapshot to path; a .prom suffix selects Prometheus format"""
+        text = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def profile_next(self, count, path):
+        """Capture a cProfile of the next count worker evaluations into path"""
+        self.profile_remaining = self.profile_total = count
+        self.profile_path = path
+
+    def wrap_job(self, func, args):
+        """Route a worker job through the profiler while a capture is armed"""
+        if self.profile_remaining <= 0:
+            return func, args
+        first = self.profile_remaining == self.profile_total
+        self.profile_remaining -= 1
+        last = self.profile_remaining == 0
+        return profile_call, (func, args, self.profile_path, first, last)
+
+
+_profiler = None
+
+
+def profile_call(func, args, path, first, last):
+    """Run func(*args) under a profiler kept across calls in this process
+
+    Stats accumulate from the ``first`` call of a capture and are written to
+    path after each one, so the file holds the whole capture after the last.
+    """
+    global _profiler
+    import cProfile
+
+    if first or _profiler is None:
+        _profiler = cProfile.Profile()
+    profiler = _profiler
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(path)
+        if last:
+            _profiler = None
+
+
+metrics = Metrics(enabled=bool(os.environ.get('CALC_METRICS')))
@@ -0,0 +1,394 @@
+"""Function plotting with vectorized, adaptive sampling.
+
+``FunctionSampler`` evaluates ``f(x)`` through the engine's NumPy path on a
+grid of power-of-two tiles.  A tile at ``level`` spans ``2**level`` units of
+x with ``TILE_SAMPLES`` steps, so every sample position is exact and shared
+between levels: zooming in reuses every other sample of the parent tile,
+zooming out is assembled from the children without evaluating anything, and
+panning only computes the tiles scrolled into view.  Each tile is refined
+by bisecting steps whose values jump, down to ``REFINE_DEPTH`` levels, and
+jumps that survive refinement (the poles of ``tan``) are split with a NaN
+so they are not drawn as vertical lines.
+
+``decimate`` reduces the samples in view to first/min/max/last per pixel
+column, and ``PlotWindow`` draws them on a Tk canvas with drag to pan and
+the mouse wheel to zoom.
+"""
+import math
+import time
+import tkinter as tk
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from calc_engine import evaluate_batch, optimization_info
+
+TILE_SAMPLES = 64  # steps per tile; a power of two keeps sample positions exact
+SAMPLES_PER_PIXEL = 2
+REFINE_DEPTH = 8  # bisections of a step whose values jump
+REFINE_JUMP = 0.2  # jump, as a fraction of a tile's value spread, that is refined
+MAX_REFINE_SAMPLES = 4 * TILE_SAMPLES  # extra samples per tile at most
+MAX_CACHED_TILES = 4096
+FRAME_BUDGET = 0.008  # seconds of sampling per redraw slice
+ZOOM_STEP = 1.25
+MIN_SPAN, MAX_SPAN = 1e-9, 1e12  # x ranges the tile grid can represent
+
+# A tile's grid values plus the merged, sorted grid and refinement samples
+Tile = namedtuple('Tile', 'grid xs ys')
+
+
+class FunctionSampler:
+    """Tile cache of f(x) samples shared by every view of one expression"""
+
+    def __init__(self, expression, angle_mode='DEG'):
+        self.expression = expression
+        self.angle_mode = angle_mode
+        self.tiles = OrderedDict()
+        self.evaluations = 0  # samples computed, for reporting
+        self.tile_cost = None  # seconds per tile, measured
+        # Fail fast on syntax errors and variables other than x
+        self.evaluate(np.zeros(1))
+        self.optimization = optimization_info(expression, angle_mode, vectorized=True)
+
+    def evaluate(self, xs):
+        self.evaluations += len(xs)
+        return evaluate_batch(self.expression, {'x': xs}, self.angle_mode)
+
+    @staticmethod
+    def level_for(span, width):
+        """Tile level giving about SAMPLES_PER_PIXEL grid samples per pixel"""
+        step = span / (max(width, 1) * SAMPLES_PER_PIXEL)
+        return math.floor(math.log2(step * TILE_SAMPLES))
+
+    @staticmethod
+    def grid_x(level, index):
+        step = 2.0 ** level / TILE_SAMPLES
+        return (index * TILE_SAMPLES + np.arange(TILE_SAMPLES + 1)) * step
+
+    def samples(self, x0, x1, width, budget=None):
+        """Return (xs, ys, complete) covering [x0, x1] at pixel resolution
+
+        Missing tiles are computed until ``budget`` seconds are spent; the
+        rest are stood in for by cached tiles one level up or down and
+        ``complete`` is False.
+        """
+        level = self.level_for(x1 - x0, width)
+        size = 2.0 ** level
+        indices = range(math.floor(x0 / size), math.floor(x1 / size) + 1)
+        missing = [index for index in indices if (level, index) not in self.tiles]
+        if missing:
+            count = len(missing)
+            if budget is not None:
+                # Size the batch from the measured cost so one slice fits the budget
+                cost = self.tile_cost
+                count = 4 if cost is None else max(1, int(budget / max(cost, 1e-9)))
+            self.compute_tiles(level, missing[:count])
+
+        parts = []
+        fallbacks = set()
+        for index in indices:
+            tile = self.tiles.get((level, index))
+            if tile is not None:
+                self.tiles.move_to_end((level, index))
+                parts.append(tile)
+                continue
+            for key in ((level + 1, index >> 1), (level - 1, 2 * index), (level - 1, 2 * index + 1)):
+                if key in self.tiles and key not in fallbacks:
+                    fallbacks.add(key)
+                    parts.append(self.tiles[key])
+        if not parts:
+            return np.empty(0), np.empty(0), not missing
+        xs = np.concatenate([tile.xs for tile in parts])
+        ys = np.concatenate([tile.ys for tile in parts])
+        complete = len(missing) == 0 or all((level, index) in self.tiles for index in missing)
+        if fallbacks:
+            order = np.argsort(xs, kind='stable')
+            xs, ys = xs[order], ys[order]
+        return xs, ys, complete
+
+    def compute_tiles(self, level, indices):
+        """Sample and refine tiles, evaluating all their new points in one call"""
+        start = time.perf_counter()
+        half = TILE_SAMPLES // 2
+        grids = []
+        pending_x = []
+        pending = []  # (grid, slice into the evaluated values, positions to fill)
+        offset = 0
+        for index in indices:
+            grid = np.empty(TILE_SAMPLES + 1)
+            left = self.tiles.get((level - 1, 2 * index))
+            right = self.tiles.get((level - 1, 2 * index + 1))
+            parent = self.tiles.get((level + 1, index >> 1))
+            if left is not None and right is not None:
+                grid[:half + 1] = left.grid[::2]
+                grid[half + 1:] = right.grid[2::2]
+                positions = None
+            elif parent is not None:
+                first = half if index & 1 else 0
+                grid[::2] = parent.grid[first:first + half + 1]
+                positions = slice(1, None, 2)
+            else:
+                positions = slice(None)
+            if positions is not None:
+                xs = self.grid_x(level, index)[positions]
+                pending_x.append(xs)
+                pending.append((grid, slice(offset, offset + len(xs)), positions))
+                offset += len(xs)
+            grids.append(grid)
+        if pending_x:
+            values = self.evaluate(np.concatenate(pending_x))
+            for grid, source, positions in pending:
+                grid[positions] = values[source]
+
+        refined = self.refine(level, indices, grids)
+        for index, grid, (xs, ys) in zip(indices, grids, refined):
+            self.tiles[(level, index)] = Tile(grid, xs, ys)
+        while len(self.tiles) > MAX_CACHED_TILES:
+            self.tiles.popitem(last=False)
+        if indices:
+            cost = (time.perf_counter() - start) / len(indices)
+            self.tile_cost = cost if self.tile_cost is None else (self.tile_cost + cost) / 2
+
+    def refine(self, level, indices, grids):
+        """Bisect steps whose values jump, batched across tiles"""
+        count = len(indices)
+        gx = np.stack([self.grid_x(level, index) for index in indices])
+        gy = np.stack(grids)
+        # Spread of each tile's finite values between its 5th and 95th percentiles
+        finite = np.isfinite(gy)
+        ordered = np.sort(np.where(finite, gy, np.inf), axis=1)
+        last = np.maximum(finite.sum(axis=1) - 1, 0)
+        rows = np.arange(count)
+        with np.errstate(invalid='ignore'):
+            spread = ordered[rows, (last * 0.95).astype(int)] - ordered[rows, (last * 0.05).astype(int)]
+        threshold = np.nan_to_num(REFINE_JUMP * spread, posinf=0.0)
+
+        # Steps as flat arrays tagged with their tile
+        tile = np.repeat(np.arange(count), TILE_SAMPLES)
+        a, b = gx[:, :-1].ravel(), gx[:, 1:].ravel()
+        ya, yb = gy[:, :-1].ravel(), gy[:, 1:].ravel()
+        extra_tile, extra_x, extra_y = [], [], []
+        added = np.zeros(count, dtype=np.int64)
+
+        def jumps(ya, yb, tile):
+            with np.errstate(invalid='ignore'):
+                return (np.isfinite(ya) != np.isfinite(yb)) | (np.abs(yb - ya) > threshold[tile])
+
+        for _ in range(REFINE_DEPTH):
+            flagged = jumps(ya, yb, tile) & (added[tile] < MAX_REFINE_SAMPLES)
+            if not flagged.any():
+                break
+            a, b, ya, yb, tile = a[flagged], b[flagged], ya[flagged], yb[flagged], tile[flagged]
+            mid = (a + b) / 2
+            ym = self.evaluate(mid)
+            extra_tile.append(tile)
+            extra_x.append(mid)
+            extra_y.append(ym)
+            added += np.bincount(tile, minlength=count)
+            a, b = np.concatenate((a, mid)), np.concatenate((mid, b))
+            ya, yb = np.concatenate((ya, ym)), np.concatenate((ym, yb))
+            tile = np.concatenate((tile, tile))
+
+        # Jumps between finite values that survive refinement are discontinuities
+        with np.errstate(invalid='ignore'):
+            breaks = np.isfinite(ya) & np.isfinite(yb) & (np.abs(yb - ya) > threshold[tile])
+        if breaks.any() and extra_x:
+            extra_tile.append(tile[breaks])
+            extra_x.append((a[breaks] + b[breaks]) / 2)
+            extra_y.append(np.full(int(breaks.sum()), np.nan))
+
+        if not extra_x:
+            return [(gx[i], gy[i]) for i in range(count)]
+        extra_tile = np.concatenate(extra_tile)
+        extra_x = np.concatenate(extra_x)
+        extra_y = np.concatenate(extra_y)
+        result = []
+        for i in range(count):
+            mine = extra_tile == i
+            if not mine.any():
+                result.append((gx[i], gy[i]))
+                continue
+            xs = np.concatenate((gx[i], extra_x[mine]))
+            ys = np.concatenate((gy[i], extra_y[mine]))
+            order = np.argsort(xs, kind='stable')
+            result.append((xs[order], ys[order]))
+        return result
+
+
+def decimate(xs, ys, x0, x1, width):
+    """Reduce sorted samples to first/min/max/last per pixel column
+
+    Returns pixel-column x positions and values, four per column.  A column
+    containing a NaN stays NaN so discontinuities break the line.
+    """
+    lo = max(int(np.searchsorted(xs, x0)) - 1, 0)
+    hi = min(int(np.searchsorted(xs, x1, side='right')) + 1, len(xs))
+    xs, ys = xs[lo:hi], ys[lo:hi]
+    if len(xs) == 0:
+        return np.empty(0), np.empty(0)
+    columns = np.floor((xs - x0) / (x1 - x0) * width)
+    starts = np.flatnonzero(np.concatenate(([True], columns[1:] != columns[:-1])))
+    ends = np.append(starts[1:], len(xs)) - 1
+    first, last = ys[starts], ys[ends]
+    low = np.minimum.reduceat(ys, starts)
+    high = np.maximum.reduceat(ys, starts)
+    rising = first <= last
+    # Visit the extremes in the order the curve does
+    values = np.stack((first, np.where(rising, low, high), np.where(rising, high, low), last), axis=1)
+    px = np.repeat(columns[starts] + 0.5, 4)
+    return px, values.ravel()
+
+
+class PlotWindow(tk.Toplevel):
+    """Canvas plot of f(x) with drag to pan and wheel to zoom"""
+
+    def __init__(self, master, expression='sin(x)', angle_mode='DEG', colors=None):
+        super().__init__(master)
+        colors = colors or {}
+        self.colors = {
+            'bg': colors.get('bg', '#1e1e1e'),
+            'canvas': colors.get('display_bg', '#2d2d2d'),
+            'fg': colors.get('display_fg', '#ffffff'),
+            'axis': '#666666',
+            'curve': '#00bfff',
+        }
+        self.title("Plot")
+        self.configure(bg=self.colors['bg'])
+        self.angle_mode = angle_mode
+        self.sampler = None
+        self.view = (-10.0, 10.0, -10.0, 10.0)  # x0, x1, y0, y1
+        self.redraw_job = None
+        self.drag = None
+
+        controls = tk.Frame(self, bg=self.colors['bg'])
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        tk.Label(controls, text="f(x) =", bg=self.colors['bg'], fg=self.colors['fg'],
+                 font=('Arial', 11)).pack(side=tk.LEFT)
+        self.expression_var = tk.StringVar(value=expression)
+        entry = tk.Entry(controls, textvariable=self.expression_var, font=('Arial', 11))
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        entry.bind('<Return>', lambda e: self.plot())
+        tk.Button(controls, text="Plot", command=self.plot).pack(side=tk.LEFT)
+        tk.Button(controls, text="Fit", command=self.fit).pack(side=tk.LEFT, padx=(5, 0))
+
+        self.canvas = tk.Canvas(self, width=520, height=360, bg=self.colors['canvas'],
+                                highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.status_label = tk.Label(self, text="", anchor='w', bg=self.colors['bg'],
+                                     fg='#888888', font=('Arial', 9))
+        self.status_label.pack(fill=tk.X, padx=5)
+
+        self.canvas.bind('<Configure>', lambda e: self.request_redraw())
+        self.canvas.bind('<ButtonPress-1>', self.start_drag)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<MouseWheel>', lambda e: self.zoom(e.x, e.y, e.delta > 0))
+        self.canvas.bind('<Button-4>', lambda e: self.zoom(e.x, e.y, True))
+        self.canvas.bind('<Button-5>', lambda e: self.zoom(e.x, e.y, False))
+        self.plot()
+
+    def size(self):
+        return max(self.canvas.winfo_width(), 2), max(self.canvas.winfo_height(), 2)
+
+    def plot(self):
+        """(Re)build the sampler for the entered expression and fit the view"""
+        try:
+            self.sampler = FunctionSampler(self.expression_var.get(), self.angle_mode)
+        except Exception as e:
+            self.sampler = None
+            self.canvas.delete('all')
+            self.status_label.config(text=f"Error: {e}")
+            return
+        self.fit()
+
+    def set_angle_mode(self, angle_mode):
+        if angle_mode != self.angle_mode:
+            self.angle_mode = angle_mode
+            self.plot()
+
+    def fit(self):
+        """Fit the y range to the curve over the current x range"""
+        if self.sampler is None:
+            return
+        x0, x1 = self.view[:2]
+        width = self.size()[0]
+        xs, ys, _ = self.sampler.samples(x0, x1, width)
+        # Per-column values so densely refined poles do not skew the range
+        _, values = decimate(xs, ys, x0, x1, width)
+        finite = values[np.isfinite(values)]
+        if len(finite):
+            low, high = np.percentile(finite, (2, 98))
+        else:
+            low = high = 0.0
+        pad = (high - low) * 0.1 or 1.0
+        self.view = (x0, x1, float(low - pad), float(high + pad))
+        self.request_redraw()
+
+    def start_drag(self, event):
+        self.drag = (event.x, event.y, self.view)
+
+    def on_drag(self, event):
+        if self.drag is None:
+            return
+        start_x, start_y, (x0, x1, y0, y1) = self.drag
+        width, height = self.size()
+        dx = (event.x - start_x) / width * (x1 - x0)
+        dy = (event.y - start_y) / height * (y1 - y0)
+        self.view = (x0 - dx, x1 - dx, y0 + dy, y1 + dy)
+        self.request_redraw()
+
+    def zoom(self, px, py, zoom_in):
+        """Zoom about the pointer"""
+        x0, x1, y0, y1 = self.view
+        width, height = self.size()
+        factor = 1 / ZOOM_STEP if zoom_in else ZOOM_STEP
+        if not MIN_SPAN <= (x1 - x0) * factor <= MAX_SPAN:
+            return
+        cx = x0 + px / width * (x1 - x0)
+        cy = y1 - py / height * (y1 - y0)
+        self.view = (cx + (x0 - cx) * factor, cx + (x1 - cx) * factor,
+                     cy + (y0 - cy) * factor, cy + (y1 - cy) * factor)
+        self.request_redraw()
+
+    def request_redraw(self):
+        if self.redraw_job is None:
+            self.redraw_job = self.after_idle(self.redraw)
+
+    def redraw(self):
+        """Draw what is sampled within the frame budget and continue later"""
+        self.redraw_job = None
+        if self.sampler is None:
+            return
+        start = time.perf_counter()
+        x0, x1, y0, y1 = self.view
+        width, height = self.size()
+        try:
+            xs, ys, complete = self.sampler.samples(x0, x1, width, FRAME_BUDGET)
+        except Exception as e:
+            self.status_label.config(text=f"Error: {e}")
+            return
+        px, values = decimate(xs, ys, x0, x1, width)
+        py = np.clip((y1 - values) / (y1 - y0) * height, -height, 2 * height)
+
+        canvas = self.canvas
+        canvas.delete('all')
+        if x0 < 0 < x1:
+            ax = -x0 / (x1 - x0) * width
+            canvas.create_line(ax, 0, ax, height, fill=self.colors['axis'])
+        if y0 < 0 < y1:
+            ay = y1 / (y1 - y0) * height
+            canvas.create_line(0, ay, width, ay, fill=self.colors['axis'])
+        finite = np.isfinite(py)
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], finite, [False])).astype(np.int8)))
+        for begin, end in zip(edges[::2], edges[1::2]):
+            if end - begin >= 2:
+                coords = np.column_stack((px[begin:end], py[begin:end])).ravel().tolist()
+                canvas.create_line(*coords, fill=self.colors['curve'], width=2)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        optimization = self.sampler.optimization
+        self.status_label.config(
+            text=f"x: [{x0:.4g}, {x1:.4g}]  y: [{y0:.4g}, {y1:.4g}]  "
+                 f"{self.angle_mode}  {elapsed:.1f} ms  {self.sampler.evaluations} samples  "
+                 f"{optimization.nodes_before}→{optimization.nodes_after} nodes")
+        if not complete:
+            self.redraw_job = self.after(1, self.redraw)
@@ -0,0 +1,284 @@
+"""Incremental evaluation for the live result preview.
+
+``IncrementalEvaluator`` keeps the token list of the expression being typed
+together with the operator-precedence parser state reached after every
+token.  The parser reduces eagerly, so its value stack holds the computed
+values of finished subexpressions.  When the text changes only the edited
+tail is re-tokenized and fed from the saved state in front of it, which
+makes each keystroke cost proportional to the edit rather than to the whole
+expression.  Stacks are immutable linked pairs, so saving a state is O(1).
+
+Edits are fed as the appended or deleted piece, into the evaluator's own
+``ExpressionBuffer``, so neither side joins the whole text per keystroke.
+"""
+from calc_buffer import ExpressionBuffer
+from calc_engine import (BINARY_OPERATORS, INLINE_FACTORIAL_LIMIT, UNARY_OPERATORS,
+                         ExpressionError, bounded_pow, iter_tokens, scalar_functions)
+
+# Integer powers above this many bits are not previewed, so typing 9**9**9
+# cannot stall the UI thread (factorials are bounded the same way)
+MAX_PREVIEW_BITS = 100000
+
+# Binding strength of operators: (precedence, right associative)
+_BINARY_PRECEDENCE = {
+    '+': (1, False), '-': (1, False),
+    '*': (2, False), '/': (2, False), '//': (2, False), '%': (2, False),
+    '**': (4, True),
+}
+_UNARY_PRECEDENCE = 3
+
+# What the parser expects next
+OPERAND, OPERATOR, CALL = range(3)
+
+_OPEN = ('open', None)
+_ARGUMENTS = 'args'  # a call's open parenthesis, holding its argument count
+
+
+class PreviewError:
+    """Stand-in value for a subexpression that failed to evaluate"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _safe_pow(base, exponent):
+    return bounded_pow(base, exponent, MAX_PREVIEW_BITS)
+
+
+def _apply(func, *args):
+    for arg in args:
+        if isinstance(arg, PreviewError):
+            return arg
+    try:
+        return func(*args)
+    except Exception as e:
+        return PreviewError(e)
+
+
+def _reduce_top(values, ops, nargs=1):
+    """Apply the operator on top of ops, returning the new stacks
+
+    A call takes its ``nargs`` arguments from the top of values.
+    """
+    (kind, op), ops = ops
+    if kind == 'unary':
+        operand, values = values
+        return (_apply(UNARY_OPERATORS[op], operand), values), ops
+    if kind == 'call':
+        args = []
+        for _ in range(nargs):
+            arg, values = values
+            args.append(arg)
+        return (_apply(op, *reversed(args)), values), ops
+    right, values = values
+    left, values = values
+    func = _safe_pow if op == '**' else BINARY_OPERATORS[op]
+    return (_apply(func, left, right), values), ops
+
+
+def _reduce_for(values, ops, precedence, right_assoc):
+    """Reduce operators that bind at least as tightly as an incoming one"""
+    while ops is not None:
+        kind, op = ops[0]
+        if kind == 'binary':
+            top = _BINARY_PRECEDENCE[op][0]
+        elif kind == 'unary':
+            top = _UNARY_PRECEDENCE
+        else:
+            break
+        if top > precedence or (top == precedence and not right_assoc):
+            values, ops = _reduce_top(values, ops)
+        else:
+            break
+    return values, ops
+
+
+def _close(values, ops):
+    """Reduce back to the innermost open parenthesis and remove it
+
+    Returns the new stacks, or None if no parenthesis is open.
+    """
+    while ops is not None and ops[0] is not _OPEN and ops[0][0] != _ARGUMENTS:
+        values, ops = _reduce_top(values, ops)
+    if ops is None:
+        return None
+    (kind, nargs), ops = ops
+    if kind == _ARGUMENTS:
+        values, ops = _reduce_top(values, ops, nargs)
+    return values, ops
+
+
+def step(state, token, functions, variables):
+    """Return the parser state after feeding one token, or None if invalid"""
+    values, ops, expect = state
+    kind, value = token
+    if expect == CALL:
+        if token == ('op', '('):
+            return values, ((_ARGUMENTS, 1), ops), OPERAND
+        return None
+    if expect == OPERAND:
+        if kind == 'num':
+            return (value, values), ops, OPERATOR
+        if kind == 'name' and value in variables:
+            return (variables[value], values), ops, OPERATOR
+        if kind == 'name' and value in functions:
+            return values, (('call', functions[value]), ops), CALL
+        if kind == 'op' and value in UNARY_OPERATORS:
+            return values, (('unary', value), ops), OPERAND
+        if token == ('op', '('):
+            return values, (_OPEN, ops), OPERAND
+        return None
+    if kind == 'op' and value in _BINARY_PRECEDENCE:
+        values, ops = _reduce_for(values, ops, *_BINARY_PRECEDENCE[value])
+        return values, (('binary', value), ops), OPERAND
+    if token == ('op', ')'):
+        closed = _close(values, ops)
+        return None if closed is None else (*closed, OPERATOR)
+    if token == ('op', ','):
+        while ops is not None and ops[0] is not _OPEN and ops[0][0] != _ARGUMENTS:
+            values, ops = _reduce_top(values, ops)
+        if ops is None or ops[0] is _OPEN:
+            return None
+        return values, ((_ARGUMENTS, ops[0][1] + 1), ops[1]), OPERAND
+    return None
+
+
+def finish(state):
+    """Value of a complete state, closing any parentheses still open"""
+    values, ops, _ = state
+    while ops is not None:
+        if ops[0] is _OPEN or ops[0][0] == _ARGUMENTS:
+            values, ops = _close(values, ops)
+        else:
+            values, ops = _reduce_top(values, ops)
+    return values[0]
+
+
+class IncrementalEvaluator:
+    """Re-evaluates an expression as it is edited, reusing unchanged work
+
+    ``variables`` maps names to values, such as a worksheet's live
+    ``values``; call ``variables_changed`` after they change.
+    """
+
+    def __init__(self, angle_mode='DEG', variables=None):
+        self.angle_mode = angle_mode
+        self.functions = scalar_functions(angle_mode, INLINE_FACTORIAL_LIMIT)
+        self.variables = variables if variables is not None else {}
+        self.reset()
+
+    def reset(self):
+        self.buffer = ExpressionBuffer()
+        self.edited = None  # earliest position edited since the last refresh
+        self.starts = []  # source position of each token
+        self.states = [(None, None, OPERAND)]  # state before each token, then the final one
+        self.pending = False  # True while refresh() stopped short of the end
+
+    @property
+    def text(self):
+        return str(self.buffer)
+
+    def set_angle_mode(self, angle_mode):
+        """Switch angle mode; cached trigonometric values become stale"""
+        if angle_mode != self.angle_mode:
+            self.angle_mode = angle_mode
+            self.functions = scalar_functions(angle_mode, INLINE_FACTORIAL_LIMIT)
+            self.edited = 0
+            self.refresh()
+
+    def variables_changed(self):
+        """Mark cached values stale; the next refresh() re-reads the variables"""
+        self.edited = 0
+
+    def _mark(self, position):
+        if self.edited is None or position < self.edited:
+            self.edited = position
+
+    def append(self, text):
+        """Record text added at the end; refresh() evaluates it"""
+        self._mark(len(self.buffer))
+        self.buffer.append(text)
+
+    def delete(self, count=1):
+        """Record count characters removed from the end"""
+        self.buffer.delete(count)
+        self._mark(len(self.buffer))
+
+    def replace(self, text):
+        """Record a replacement of the whole text"""
+        old = self.text
+        if text.startswith(old):
+            common = len(old)
+        elif old.startswith(text):
+            common = len(text)
+        else:
+            common = 0
+            while text[common] == old[common]:
+                common += 1
+        self._mark(common)
+        self.buffer.set(text)
+
+    def _restart_index(self, common):
+        """Index of the first token that an edit at position common may change"""
+        # The token just before the edit can merge with new text (``1`` + ``2``,
+        # ``*`` + ``*``, ``e`` + ``3``), so step back over two whole source
+        # tokens; an ``e`` operator spans several tokens at one position
+        index = len(self.starts)
+        boundaries = 0
+        while index > 0 and (self.starts[index - 1] >= common or boundaries < 2):
+            index -= 1
+            if self.starts[index] < common and (
+                    index == 0 or self.starts[index - 1] != self.starts[index]):
+                boundaries += 1
+        return index
+
+    def update(self, text, max_tokens=None):
+        """Replace the text and return its value, as ``replace`` then ``refresh``"""
+        self.replace(text)
+        return self.refresh(max_tokens)
+
+    def refresh(self, max_tokens=None):
+        """Evaluate the recorded edits and return the expression's value
+
+        Returns None when the expression has no previewable value.  With
+        ``max_tokens`` at most that many tokens are processed and ``pending``
+        is set if the end was not reached; calling again resumes where this
+        call stopped, so a huge paste can be previewed across several idle
+        callbacks.
+        """
+        common = len(self.buffer) if self.edited is None else self.edited
+        index = self._restart_index(common)
+        start = self.starts[index] if index < len(self.starts) else 0
+        del self.starts[index:]
+        del self.states[index + 1:]
+        self.edited = None
+        self.pending = False
+        state = self.states[index]
+        try:
+            tail = self.buffer.tail(len(self.buffer) - start)
+            for count, (position, kind, value) in enumerate(iter_tokens(tail, start)):
+                if max_tokens is not None and count >= max_tokens:
+                    self.pending = True
+                    return None
+                if state is not None:
+                    state = step(state, (kind, value), self.functions, self.variables)
+                self.starts.append(position)
+                self.states.append(state)
+        except ExpressionError:
+            # Keep the valid tokens; the next edit re-reads the bad tail
+            return None
+        return self.value()
+    def value(self):
+        """Value of the expression, ignoring a trailing incomplete operator"""
+        if self.states[-1] is None:
+            return None
+        for index in range(len(self.states) - 1, -1, -1):
+            state = self.states[index]
+            at_boundary = (index == 0 or index == len(self.starts)
+                           or self.starts[index] != self.starts[index - 1])
+            if state[2] == OPERATOR and at_boundary:
+                result = finish(state)
+                return None if isinstance(result, PreviewError) else result
+        return None
@@ -0,0 +1,395 @@
+"""Asyncio HTTP/JSON evaluation service.
+
+Serves the calculator's semantics (``×``/``÷``, ``mod``, the ``e`` exponent
+operator, DEG/RAD trigonometry, exact factorials) to other
+programs over HTTP/1.1 with keep-alive connections::
+
+    POST /evaluate        {"expression": "sin(30) + 10 mod 3", "angle_mode": "DEG"}
+    POST /evaluate/batch  {"expressions": ["2+3", "factorial(5)"], "angle_mode": "RAD"}
+    GET  /health
+
+Evaluations run in a pool of ``EvaluationWorker`` processes, so a runaway
+expression never stalls the event loop.  Every request has a wall-clock
+budget covering its wait for a worker and the evaluation itself; workers
+still busy when it runs out are killed and the client gets a 504.  Once
+``--max-pending`` requests are in flight new ones are answered with 503
+straight away instead of queueing without bound.  SIGTERM, like Ctrl+C,
+stops the server and shuts its workers down.
+
+Usage::
+
+    python calc_server.py --port 8080 -j 4 --timeout 2
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import sys
+import time
+
+from calc_engine import evaluate, format_result, round_result
+from calc_metrics import metrics
+from calc_worker import DEFAULT_MEMORY_LIMIT, OK, TIMEOUT, EvaluationWorker
+
+DEFAULT_PORT = 8080
+DEFAULT_TIMEOUT = 5.0  # seconds per request
+DEFAULT_MAX_PENDING = 64  # requests in flight before answering 503
+KEEP_ALIVE_TIMEOUT = 15.0  # seconds an idle connection is kept open
+MAX_BODY_SIZE = 1024 * 1024
+MAX_HEADERS = 100
+MAX_BATCH_SIZE = 10000
+BATCH_CHUNK_SIZE = 256  # expressions sent to one worker at a time
+MAX_JSON_INT_BITS = 1024  # larger integer results are sent as display text only
+POLL_INTERVAL = 0.005  # seconds, for event loops without add_reader
+SHUTDOWN_TIMEOUT = 1.0  # seconds to wait for open connections when stopping
+ANGLE_MODES = ('DEG', 'RAD')
+
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class HTTPError(Exception):
+    """An error answered with the given HTTP status"""
+
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers
+
+
+def _json_value(value):
+    """The numeric result as JSON; non-finite, complex and huge results become null"""
+    if isinstance(value, int):
+        return value if value.bit_length() <= MAX_JSON_INT_BITS else None
+    if isinstance(value, float) and math.isfinite(value):
+        return value
+    return None
+
+
+def evaluate_record(expression, angle_mode='DEG'):
+    """Evaluate one expression into a JSON-ready result record"""
+    try:
+        value = round_result(evaluate(expression, angle_mode))
+        display = format_result(value)
+    except ZeroDivisionError:
+        return {'expression': expression, 'error': "Cannot divide by zero"}
+    except Exception as e:
+        return {'expression': expression, 'error': "Error", 'detail': str(e) or type(e).__name__}
+    return {'expression': expression, 'result': _json_value(value), 'display': display}
+
+
+def evaluate_records(expressions, angle_mode='DEG'):
+    """Evaluate a chunk of expressions into result records"""
+    return [evaluate_record(expression, angle_mode) for expression in expressions]
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class WorkerPool:
+    """Evaluation worker processes shared by the request handlers"""
+
+    def __init__(self, size, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.workers = [EvaluationWorker(memory_limit=memory_limit) for _ in range(size)]
+        self.idle = None
+
+    def start(self):
+        """Start every worker; must be called from the running event loop"""
+        self.idle = asyncio.Queue()
+        for worker in self.workers:
+            worker.start()
+            self.idle.put_nowait(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    async def run(self, func, *args):
+        """Run func(*args) on the next idle worker and return its outcome
+
+        Cancelling the call kills the worker if the job is still running;
+        it is restarted on its next job.
+        """
+        worker = await self.idle.get()
+        try:
+            worker.timeout = math.inf  # the request's own deadline applies
+            worker.submit(func, *args)
+            return await self._outcome(worker)
+        except BaseException:
+            worker.cancel()
+            raise
+        finally:
+            self.idle.put_nowait(worker)
+
+    async def _outcome(self, worker):
+        loop = asyncio.get_running_loop()
+        while True:
+            fd = worker.fileno()
+            ready = loop.create_future()
+            try:
+                loop.add_reader(fd, _wake, ready)
+            except NotImplementedError:
+                # Proactor event loops (Windows) cannot watch pipes
+                await asyncio.sleep(POLL_INTERVAL)
+            else:
+                try:
+                    await ready
+                finally:
+                    loop.remove_reader(fd)
+            outcome = worker.poll()
+            if outcome is not None:
+                return outcome
+
+
+async def read_request(reader):
+    """Read one request as (method, path, body, keep_alive), or None at EOF"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, sep, value = line.decode('latin-1').partition(':')
+        if not sep or len(headers) >= MAX_HEADERS:
+            raise HTTPError(400, "Malformed headers")
+        headers[name.strip().lower()] = value.strip()
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(411, "Chunked bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(413, f"Request bodies are limited to {MAX_BODY_SIZE} bytes")
+    body = await reader.readexactly(length) if length else b''
+
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.1':
+        keep_alive = connection != 'close'
+    else:
+        keep_alive = connection == 'keep-alive'
+    return method, target.split('?', 1)[0], body, keep_alive
+
+
+def render_response(status, payload, keep_alive, headers=()):
+    """Serialize a JSON response"""
+    body = json.dumps(payload).encode('utf-8')
+    lines = [
+        f'HTTP/1.1 {status} {_REASONS.get(status, "")}',
+        'Content-Type: application/json',
+        f'Content-Length: {len(body)}',
+        'Connection: ' + ('keep-alive' if keep_alive else 'close'),
+    ]
+    lines.extend(f'{name}: {value}' for name, value in headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+def _parse_body(body):
+    try:
+        request = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Body is not valid JSON")
+    if not isinstance(request, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    angle_mode = request.get('angle_mode', 'DEG')
+    if not isinstance(angle_mode, str) or angle_mode.upper() not in ANGLE_MODES:
+        raise HTTPError(400, "angle_mode must be DEG or RAD")
+    return request, angle_mode.upper()
+
+
+def _records(outcome, expressions):
+    """Result records from a worker outcome for a chunk of expressions"""
+    status, value = outcome
+    if status == OK:
+        return value
+    if status == TIMEOUT:
+        raise HTTPError(504, "Evaluation timed out")
+    # The worker died, e.g. by exceeding its memory budget
+    detail = str(value) or type(value).__name__
+    return [{'expression': expression, 'error': "Error", 'detail': detail}
+            for expression in expressions]
+
+
+class EvaluationServer:
+    """HTTP front end dispatching evaluations to a worker pool"""
+
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT,
+                 max_pending=DEFAULT_MAX_PENDING, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.pool = WorkerPool(workers or os.cpu_count() or 1, memory_limit)
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0
+        self.server = None
+        self.routes = {
+            '/evaluate': ('POST', self.evaluate, 'server.evaluate'),
+            '/evaluate/batch': ('POST', self.evaluate_batch, 'server.evaluate_batch'),
+            '/health': ('GET', self.health, 'server.health'),
+        }
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.pool.start()
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def close(self):
+        """Stop listening and shut the workers down"""
+        if self.server is not None:
+            self.server.close()
+        self.pool.close()
+        if self.server is not None:
+            try:
+                await asyncio.wait_for(self.server.wait_closed(), SHUTDOWN_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Idle keep-alive connections; they are dropped on exit
+                pass
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until it closes or idles out"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    writer.write(render_response(e.status, {'error': str(e)}, False, e.headers))
+                    await writer.drain()
+                    return
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    # Idle, truncated, or a line longer than the stream limit
+                    return
+                if request is None:
+                    return
+                method, path, body, keep_alive = request
+                start = time.perf_counter()
+                name = 'server.unknown'
+                try:
+                    route = self.routes.get(path)
+                    if route is None:
+                        raise HTTPError(404, f"No such endpoint: {path}")
+                    allowed, handler, name = route
+                    if method != allowed:
+                        raise HTTPError(405, f"Use {allowed}", (('Allow', allowed),))
+                    status, payload, headers = 200, await handler(body), ()
+                except HTTPError as e:
+                    status, payload, headers = e.status, {'error': str(e)}, e.headers
+                writer.write(render_response(status, payload, keep_alive, headers))
+                await writer.drain()
+                metrics.observe(name, time.perf_counter() - start, error=status >= 500)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _run(self, jobs):
+        """Run (func, args) jobs on the pool under the request's budget"""
+        if self.pending >= self.max_pending:
+            raise HTTPError(503, "Server is busy", (('Retry-After', '1'),))
+        self.pending += 1
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(self.pool.run(func, *args) for func, args in jobs)),
+                self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, f"Evaluation exceeded {self.timeout:g}s")
+        finally:
+            self.pending -= 1
+
+    async def evaluate(self, body):
+        request, angle_mode = _parse_body(body)
+        expression = request.get('expression')
+        if not isinstance(expression, str):
+            raise HTTPError(400, "expression must be a string")
+        outcome, = await self._run([(evaluate_records, ([expression], angle_mode))])
+        return _records(outcome, [expression])[0]
+
+    async def evaluate_batch(self, body):
+        request, angle_mode = _parse_body(body)
+        expressions = request.get('expressions')
+        if not isinstance(expressions, list) or \
+                not all(isinstance(expression, str) for expression in expressions):
+            raise HTTPError(400, "expressions must be a list of strings")
+        if len(expressions) > MAX_BATCH_SIZE:
+            raise HTTPError(413, f"Batches are limited to {MAX_BATCH_SIZE} expressions")
+        chunks = [expressions[i:i + BATCH_CHUNK_SIZE]
+                  for i in range(0, len(expressions), BATCH_CHUNK_SIZE)]
+        outcomes = await self._run([(evaluate_records, (chunk, angle_mode)) for chunk in chunks])
+        results = []
+        for outcome, chunk in zip(outcomes, chunks):
+            results.extend(_records(outcome, chunk))
+        return {'results': results}
+
+    async def health(self, body):
+        return {'status': 'ok', 'workers': len(self.pool.workers), 'pending': self.pending}
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, **options):
+    """Run an EvaluationServer until cancelled or sent SIGTERM"""
+    server = EvaluationServer(**options)
+    stopped = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    except (NotImplementedError, AttributeError):
+        # Windows event loops have no signal handlers; Ctrl+C still works
+        pass
+    await server.start(host, port)
+    print(f"Serving on http://{host}:{server.port}", file=sys.stderr, flush=True)
+    serving = asyncio.ensure_future(server.server.serve_forever())
+    try:
+        await stopped.wait()
+    finally:
+        serving.cancel()
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve calculator evaluations over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help="port to listen on; 0 picks a free one (default %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="seconds allowed per request (default %(default)s)")
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help="requests in flight before answering 503 (default %(default)s)")
+    parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // 2**20,
+                        help="per-worker memory budget in MiB (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, timeout=args.timeout,
+                          max_pending=args.max_pending, memory_limit=args.memory_limit * 2**20))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""Streaming statistics over large numeric datasets.
+
+A ``Summary`` folds chunks of numbers into count, sum, mean, variance,
+extremes and a quantile sketch in a single pass and constant memory.  Each
+chunk's mean and sum of squared deviations are combined with the running
+ones using the pairwise form of Welford's update, and the sum is
+compensated (Kahan-Babuška), so neither drifts however many values are
+seen.  Summaries of disjoint data merge exactly, which is how a file is
+split across processes.
+
+Input is read from plain text (numbers separated by whitespace, commas or
+semicolons), from ``.npy`` files or from raw little-endian float64 files
+(``.f64``/``.bin``).  Files are memory-mapped and read a block at a time;
+binary columns reach disk speed, text is limited by number parsing and
+scales with ``-j``.
+
+Usage::
+
+    python calc_stats.py data.txt -j 8
+    python calc_stats.py column.npy --quantiles 0.5 0.99 --json
+    seq 1 1000000 | python calc_stats.py
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from calc_engine import ExpressionError
+
+SKETCH_ACCURACY = 0.01  # relative error of the quantile estimates
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+BLOCK_BYTES = 8 << 20  # text read per parse
+CHUNK_VALUES = 1 << 20  # binary values folded in per update
+MIN_PARTITION_BYTES = 32 << 20  # smaller files are not worth a process pool
+BINARY_SUFFIXES = ('.f64', '.bin')
+
+_SEPARATORS = bytes.maketrans(b',;', b'  ')
+_SEPARATOR_RE = re.compile(rb'[\s,;]')
+_MIN_LOG = math.log(5e-324)  # smallest subnormal
+_MAX_LOG = math.log(sys.float_info.max)
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch with mergeable bucket counts
+
+    Positive and negative magnitudes are counted in logarithmic buckets
+    ``(γ^(i-1), γ^i]`` with ``γ = (1+α)/(1-α)``, so every quantile estimate
+    is within a relative error α of a value at that rank.  The buckets
+    cover the whole float64 range; merging adds counts.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.offset = math.ceil(-_MIN_LOG / self.log_gamma) + 1
+        size = self.offset + math.ceil(_MAX_LOG / self.log_gamma) + 1
+        self.positive = np.zeros(size, dtype=np.int64)
+        self.negative = np.zeros(size, dtype=np.int64)
+        self.zeros = 0
+
+    @property
+    def count(self):
+        return int(self.positive.sum() + self.negative.sum()) + self.zeros
+
+    def update(self, values):
+        """Count an array of finite values"""
+        positive = values[values > 0]
+        negative = -values[values < 0]
+        self.zeros += len(values) - len(positive) - len(negative)
+        for buckets, magnitudes in ((self.positive, positive), (self.negative, negative)):
+            if len(magnitudes):
+                index = np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64)
+                buckets += np.bincount(index + self.offset, minlength=len(buckets))
+
+    def merge(self, other):
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches of different accuracy")
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zeros += other.zeros
+        return self
+
+    def _value(self, bucket):
+        """Estimate for a bucket, within α of anything counted in it"""
+        exponent = min((bucket - self.offset) * self.log_gamma, _MAX_LOG)
+        return 2 * math.exp(exponent) / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Estimate the value at quantile q in [0, 1], or NaN when empty"""
+        count = self.count
+        if not count:
+            return math.nan
+        rank = q * (count - 1)
+        negative = np.cumsum(self.negative[::-1])  # most negative first
+        if rank < negative[-1]:
+            bucket = len(self.negative) - 1 - int(np.searchsorted(negative, rank, side='right'))
+            return -self._value(bucket)
+        rank -= negative[-1]
+        if rank < self.zeros:
+            return 0.0
+        rank -= self.zeros
+        positive = np.cumsum(self.positive)
+        return self._value(int(np.searchsorted(positive, rank, side='right')))
+
+
+class Summary:
+    """Single-pass, mergeable statistics of a stream of numbers
+
+    NaN and infinite values are counted in ``skipped`` and otherwise
+    ignored.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.skipped = 0
+        self._total = 0.0
+        self._compensation = 0.0
+        self.sketch = QuantileSketch(accuracy)
+
+    def update(self, values):
+        """Fold an array (or iterable) of numbers into the summary"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        finite = np.isfinite(values)
+        if not finite.all():
+            self.skipped += int(len(values) - np.count_nonzero(finite))
+            values = values[finite]
+        if not len(values):
+            return self
+        mean = float(values.mean())
+        deviations = values - mean
+        self._combine(len(values), mean, float(np.dot(deviations, deviations)),
+                      float(values.min()), float(values.max()))
+        self._add(float(values.sum()))
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        """Fold in the summary of other, disjoint data"""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.minimum, other.maximum)
+            self._add(other._total)
+            self._add(other._compensation)
+        self.skipped += other.skipped
+        self.sketch.merge(other.sketch)
+        return self
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def _add(self, value):
+        total = self._total + value
+        if abs(self._total) >= abs(value):
+            self._compensation += (self._total - total) + value
+        else:
+            self._compensation += (value - total) + self._total
+        self._total = total
+
+    @property
+    def sum(self):
+        return self._total + self._compensation
+
+    def variance(self, ddof=1):
+        """Sample variance by default; ddof=0 for the population variance"""
+        return self.m2 / (self.count - ddof) if self.count > ddof else math.nan
+
+    def stddev(self, ddof=1):
+        return math.sqrt(self.variance(ddof))
+
+    def quantile(self, q):
+        if not 0 <= q <= 1:
+            raise ValueError("Quantiles must be between 0 and 1")
+        if q == 0:
+            return self.minimum if self.count else math.nan
+        if q == 1:
+            return self.maximum if self.count else math.nan
+        return min(max(self.sketch.quantile(q), self.minimum), self.maximum)
+
+    def as_dict(self, quantiles=DEFAULT_QUANTILES):
+        result = {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.mean if self.count else math.nan,
+            'stddev': self.stddev(),
+            'variance': self.variance(),
+            'min': self.minimum if self.count else math.nan,
+            'max': self.maximum if self.count else math.nan,
+        }
+        for q in quantiles:
+            result[f"p{q * 100:g}"] = self.quantile(q)
+        if self.skipped:
+            result['skipped'] = self.skipped
+        return result
+
+
+def format_summary(summary, quantiles=DEFAULT_QUANTILES):
+    """Aligned ``name  value`` lines for display"""
+    lines = []
+    for name, value in summary.as_dict(quantiles).items():
+        text = str(value) if isinstance(value, int) else f"{value:.12g}"
+        lines.append(f"{name:<10}{text}")
+    return "\n".join(lines)
+
+
+def parse_numbers(text):
+    """Parse numbers separated by whitespace, commas or semicolons"""
+    if isinstance(text, str):
+        text = text.encode()
+    tokens = bytes(text).translate(_SEPARATORS).split()
+    try:
+        return np.fromiter(map(float, tokens), dtype=np.float64, count=len(tokens))
+    except ValueError:
+        bad = next(token for token in tokens if not _is_number(token))
+        raise ExpressionError(f"Not a number: {bad.decode(errors='replace')!r}") from None
+
+
+def _is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def is_binary(path):
+    return path.endswith('.npy') or path.endswith(BINARY_SUFFIXES)
+
+
+def open_column(path):
+    """Memory-map a .npy or raw float64 file as a flat array"""
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r').reshape(-1)
+    if not os.path.getsize(path):
+        return np.empty(0)
+    return np.memmap(path, dtype='<f8', mode='r')
+
+
+def iter_text_chunks(path, start=0, end=None, block_bytes=BLOCK_BYTES):
+    """Yield arrays parsed from the numbers of a text file that start in [start, end)
+
+    Blocks are cut at a separator, not only at newlines, so a dataset
+    written on one line is read a block at a time too.  Ranges that tile
+    the file therefore read every number exactly once, wherever they cut.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = size if end is None else min(end, size)
+            if start > 0 and not _SEPARATOR_RE.match(data, start - 1):
+                separator = _SEPARATOR_RE.search(data, start)
+                start = size if separator is None else separator.end()
+            position = start
+            while position < end:
+                separator = _SEPARATOR_RE.search(data, min(position + block_bytes, end) - 1)
+                stop = size if separator is None else separator.end()
+                yield parse_numbers(data[position:stop])
+                position = stop
+
+
+def iter_stream_chunks(stream, block_bytes=BLOCK_BYTES):
+    """Yield arrays parsed from a binary stream such as stdin
+
+    Blocks are cut after their last newline or, in a block without one,
+    after their last comma, semicolon or blank.
+    """
+    rest = b''
+    while True:
+        block = stream.read(block_bytes)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        if not cut:
+            cut = max(block.rfind(separator) for separator in (b',', b';', b' ', b'\t', b'\r')) + 1
+        rest = block[cut:]
+        yield parse_numbers(block[:cut])
+    if rest:
+        yield parse_numbers(rest)
+
+
+def summarize_text(text, accuracy=SKETCH_ACCURACY):
+    """Summarize a pasted list of numbers"""
+    return Summary(accuracy).update(parse_numbers(text))
+
+
+def summarize_range(path, start, end, accuracy=SKETCH_ACCURACY):
+    """Summarize bytes [start, end) of a text file or values [start, end) of a column"""
+    summary = Summary(accuracy)
+    if is_binary(path):
+        column = open_column(path)
+        for i in range(start, end, CHUNK_VALUES):
+            summary.update(column[i:min(i + CHUNK_VALUES, end)])
+    else:
+        for values in iter_text_chunks(path, start, end):
+            summary.update(values)
+    return summary
+
+
+def summarize_file(path, workers=None, accuracy=SKETCH_ACCURACY):
+    """Summarize a file, splitting it across worker processes when large"""
+    if is_binary(path):
+        size = len(open_column(path))
+        min_partition = MIN_PARTITION_BYTES // 8
+    else:
+        size = os.path.getsize(path)
+        min_partition = MIN_PARTITION_BYTES
+    workers = workers or os.cpu_count() or 1
+    parts = max(1, min(workers, size // min_partition))
+    if parts == 1:
+        return summarize_range(path, 0, size, accuracy)
+    bounds = [size * i // parts for i in range(parts + 1)]
+    summary = Summary(accuracy)
+    with ProcessPoolExecutor(max_workers=parts) as pool:
+        for partial in pool.map(summarize_range, [path] * parts, bounds[:-1], bounds[1:],
+                                [accuracy] * parts):
+            summary.merge(partial)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summary statistics of a column of numbers.")
+    parser.add_argument('path', nargs='?', default='-',
+                        help="text, .npy or raw float64 (.f64/.bin) file; '-' reads stdin")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="processes to split a large file across (default: all CPUs)")
+    parser.add_argument('-q', '--quantiles', type=float, nargs='+', default=DEFAULT_QUANTILES,
+                        help="quantiles to estimate, between 0 and 1")
+    parser.add_argument('--accuracy', type=float, default=SKETCH_ACCURACY,
+                        help="relative error of the quantile estimates")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.path == '-':
+            summary = Summary(args.accuracy)
+            for values in iter_stream_chunks(sys.stdin.buffer):
+                summary.update(values)
+        else:
+            summary = summarize_file(args.path, args.workers, args.accuracy)
+    except (ExpressionError, ValueError, OSError) as e:
+        print(f"calc_stats: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(summary.as_dict(args.quantiles), indent=2))
+    else:
+        print(format_summary(summary, args.quantiles))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Statistics window for the calculator.
+
+Kept apart from ``calc_stats`` so its command-line mode never loads Tk.
+"""
+import os
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog
+
+from calc_engine import ExpressionError
+from calc_stats import format_summary, summarize_file, summarize_text
+
+POLL_INTERVAL_MS = 20
+
+
+class StatsWindow(tk.Toplevel):
+    """Summarize pasted numbers or a data file on a background thread"""
+
+    def __init__(self, master, on_result=None, colors=None):
+        super().__init__(master)
+        colors = colors or {}
+        bg = colors.get('bg', '#1e1e1e')
+        self.title("Statistics")
+        self.configure(bg=bg)
+        self.columnconfigure(0, weight=1)
+        self.on_result = on_result
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+
+        self.data_text = tk.Text(self, height=6, width=48, font=('Courier', 10))
+        self.data_text.insert('1.0', "1, 2, 3, 4, 5")
+        self.data_text.grid(row=0, column=0, sticky='we', padx=5, pady=(5, 2))
+        buttons = tk.Frame(self, bg=bg)
+        buttons.grid(row=1, column=0, sticky='w', padx=5)
+        tk.Button(buttons, text="Summarize", command=self.summarize).pack(side=tk.LEFT)
+        tk.Button(buttons, text="Load file…", command=self.load).pack(side=tk.LEFT, padx=5)
+
+        self.result_text = tk.Text(self, height=13, width=48, font=('Courier', 10),
+                                   state=tk.DISABLED)
+        self.result_text.grid(row=2, column=0, sticky='nsew', padx=5, pady=2)
+        self.rowconfigure(2, weight=1)
+        self.status_label = tk.Label(self, text="", anchor='w', bg=bg, fg='#888888',
+                                     font=('Arial', 9))
+        self.status_label.grid(row=3, column=0, sticky='we', padx=5)
+        self.bind('<Destroy>', self.on_destroy, add='+')
+
+    def summarize(self):
+        text = self.data_text.get('1.0', tk.END)
+        self.run(lambda: summarize_text(text), "pasted data")
+
+    def load(self):
+        path = filedialog.askopenfilename(
+            parent=self, filetypes=[("Data", "*.txt *.csv *.npy *.f64 *.bin"), ("All files", "*")])
+        if path:
+            self.run(lambda: summarize_file(path), os.path.basename(path))
+
+    def run(self, job, source):
+        """Run job on the background thread unless one is already running"""
+        if self.future is not None:
+            self.status_label.config(text="Busy…")
+            return
+        self.started = time.perf_counter()
+        self.source = source
+        self.status_label.config(text=f"Reading {source}…")
+        self.future = self.executor.submit(job)
+        self.after(POLL_INTERVAL_MS, self.poll)
+
+    def poll(self):
+        if not self.winfo_exists():
+            return
+        if not self.future.done():
+            self.after(POLL_INTERVAL_MS, self.poll)
+            return
+        future, self.future = self.future, None
+        elapsed = time.perf_counter() - self.started
+        try:
+            summary = future.result()
+        except (ExpressionError, ValueError, MemoryError, OSError) as e:
+            self.status_label.config(text=f"Error: {e}")
+            return
+        self.result_text.config(state=tk.NORMAL)
+        self.result_text.delete('1.0', tk.END)
+        self.result_text.insert('1.0', format_summary(summary))
+        self.result_text.config(state=tk.DISABLED)
+        self.status_label.config(text=f"{self.source}: {summary.count} values in {elapsed:.2f} s")
+        if summary.count and self.on_result is not None:
+            self.on_result(summary.mean)
+
+    def on_destroy(self, event):
+        if event.widget is self:
+            self.executor.shutdown(wait=False)
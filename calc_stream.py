@@ -0,0 +1,141 @@
+"""Headless streaming evaluation of expression files.
+
+Reads one expression per line from a file or stdin and writes one result per
+line, in input order, as soon as each chunk is ready.  Chunks are evaluated
+by a pool of worker processes with a bounded number of chunks in flight, so
+memory stays constant no matter how large the input is.
+
+A single line such as ``9**9**9`` must not stall the stream, and a timeout
+cannot interrupt one huge integer power, so integer powers wider than
+``MAX_POWER_BITS`` are refused as "Error" up front.  Pool workers also run
+under the evaluation worker's address-space budget.
+
+Usage::
+
+    python calc_stream.py expressions.txt -j 8 > results.txt
+    cat expressions.txt | python calc_stream.py --angle-mode RAD
+"""
+import argparse
+import functools
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from calc_engine import (BINARY_OPERATORS, DEFAULT_CACHE_SIZE, bounded_pow, compile_node,
+                         format_result, parse, scalar_functions)
+from calc_worker import DEFAULT_MEMORY_LIMIT, limit_memory
+
+DEFAULT_CHUNK_SIZE = 1024
+MAX_POWER_BITS = 1000000  # about 300,000 digits, computed in milliseconds
+
+_OPERATORS = dict(BINARY_OPERATORS)
+_OPERATORS['**'] = lambda base, exponent: bounded_pow(base, exponent, MAX_POWER_BITS)
+
+
+@functools.lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def _compile(expression, angle_mode):
+    return compile_node(parse(expression), scalar_functions(angle_mode), _OPERATORS)
+
+
+def evaluate_line(expression, angle_mode='DEG'):
+    """Evaluate one expression and format it as the calculator display would"""
+    try:
+        return format_result(_compile(expression, angle_mode)({}))
+    except ZeroDivisionError:
+        return "Cannot divide by zero"
+    except Exception:
+        return "Error"
+
+
+def evaluate_lines(lines, angle_mode='DEG', echo=False):
+    """Evaluate a chunk of input lines, returning the output lines"""
+    results = []
+    for line in lines:
+        expression = line.strip()
+        if not expression:
+            results.append("")
+            continue
+        result = evaluate_line(expression, angle_mode)
+        results.append(f"{expression} = {result}" if echo else result)
+    return results
+
+
+def iter_chunks(lines, chunk_size):
+    """Group an iterable of lines into lists of at most chunk_size"""
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream(lines, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, angle_mode='DEG',
+           echo=False):
+    """Yield output lines for the input lines, preserving order
+
+    With ``workers`` of 1 everything runs in-process; otherwise chunks are
+    dispatched to a process pool keeping at most two chunks per worker
+    queued, which bounds memory and lets output start immediately.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = iter_chunks(lines, chunk_size)
+    if workers == 1:
+        for chunk in chunks:
+            yield from evaluate_lines(chunk, angle_mode, echo)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=limit_memory,
+                             initargs=(DEFAULT_MEMORY_LIMIT,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(evaluate_lines, chunk, angle_mode, echo))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate calculator expressions line by line")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="expression file, or - for stdin (default)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="result file, or - for stdout (default)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="lines per dispatched chunk")
+    parser.add_argument('--angle-mode', choices=['DEG', 'RAD'], default='DEG')
+    parser.add_argument('--echo', action='store_true',
+                        help="write 'expression = result' like the history list")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        lines = stream(source, args.workers, args.chunk_size, args.angle_mode, args.echo)
+        for index, line in enumerate(lines, 1):
+            target.write(line)
+            target.write('\n')
+            if index % args.chunk_size == 0:
+                target.flush()
+        target.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
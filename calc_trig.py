@@ -0,0 +1,359 @@
+"""Trigonometry in degrees, and fast table-driven sine and cosine.
+
+Degrees are reduced exactly: ``x mod 360`` and ``x - 90·q`` are exact in
+floating point, so only the final remainder of at most 45° is converted to
+radians.  ``sin(180)`` is therefore exactly 0 and ``cos(1e22)`` is as
+accurate as ``cos(1e22 mod 360)``, where rounding through
+``math.radians`` first would lose both.
+
+``TableTrig`` trades accuracy for speed in bulk evaluation.  It splits an
+angle into the nearest of ``TABLE_SIZE`` points per turn plus a remainder
+r with ``|r| <= π/TABLE_SIZE``, and combines the tabulated sine and cosine
+with Taylor series for sin r and cos r.  It uses the fewest terms that
+meet the requested absolute error bound.  Values are processed in
+cache-sized blocks.  Cosine is the sine table read a quarter turn ahead,
+so it costs no extra rounding.  Only sine and cosine get tables: NumPy's
+``tan``, ``log10`` and ``log`` are already vectorized with SIMD, and a
+table version of them measured slower.  ``accuracy_report`` compares
+both paths against ``math``::
+
+    python calc_trig.py --tolerance 1e-6 --angle-mode DEG
+"""
+import argparse
+import functools
+import math
+import sys
+import time
+
+TABLE_SIZE = 256  # points per turn, a power of two
+MIN_TOLERANCE = 1e-13  # smaller bounds use the exact path
+BLOCK_VALUES = 1 << 14  # values per pass, so temporaries stay in cache
+REPORT_SIZE = 1 << 20
+REFERENCE_SIZE = 20000  # values checked against math, one at a time
+RAD_TABLE_LIMIT = 1e5  # larger radian arguments use np.sin for full reduction
+DEG_REDUCE_LIMIT = 1e14  # below this x - 90·q is exact without taking x mod 360 first
+_ROUNDING = 1e-15  # allowance for rounding in the table evaluation
+# 2π = _TWO_PI_HI + _TWO_PI_LO to about 66 bits; k·_TWO_PI_HI/N is exact for |k| < 2**44
+_TWO_PI_HI = 6.28125
+_TWO_PI_LO = 0.0019353071795864769253
+_UNDEFINED_TAN = "tan is undefined at odd multiples of 90°"
+
+
+def _reduce_degrees(x):
+    """(quadrant, r) with x ≡ 90·quadrant + r (mod 360), |r| <= 45, r in radians"""
+    if isinstance(x, int):
+        x %= 360
+    elif not math.isfinite(x):
+        return 0, x
+    else:
+        x = math.fmod(x, 360.0)
+    quadrant = round(x / 90)
+    return quadrant % 4, math.radians(x - 90 * quadrant)
+
+
+def sin_degrees(x):
+    quadrant, r = _reduce_degrees(x)
+    result = math.cos(r) if quadrant & 1 else math.sin(r)
+    # Adding 0.0 turns -0.0 into 0.0
+    return (-result if quadrant & 2 else result) + 0.0
+
+
+def cos_degrees(x):
+    quadrant, r = _reduce_degrees(x)
+    result = math.sin(r) if quadrant & 1 else math.cos(r)
+    return (-result if (quadrant + 1) & 2 else result) + 0.0
+
+
+def tan_degrees(x):
+    quadrant, r = _reduce_degrees(x)
+    result = math.tan(r)
+    if quadrant & 1:
+        if not result:
+            raise ValueError(_UNDEFINED_TAN)
+        return -1 / result
+    return result + 0.0
+
+
+DEGREE_FUNCTIONS = {'sin': sin_degrees, 'cos': cos_degrees, 'tan': tan_degrees}
+
+
+def _reduce_large(x, limit):
+    """x with elements of magnitude >= limit taken mod 360 (np.fmod is slow, so only those)"""
+    import numpy as np
+
+    if not x.size or -limit < x.min() and x.max() < limit:
+        return x  # the common case, without allocating a mask
+    large = (x >= limit) | (x <= -limit) | np.isnan(x)
+    if large.any():
+        x = np.array(x)
+        with np.errstate(invalid='ignore'):  # inf becomes NaN
+            x[large] = np.fmod(x[large], 360.0)
+    return x
+
+
+def _degrees_array(x, function, shift=0):
+    """Element-wise sin (function='sin', shift=1 for cos) or tan of degrees
+
+    Works a cache-sized block at a time, which more than pays for the
+    extra passes of the exact reduction.
+    """
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float64)
+    flat = _reduce_large(x.reshape(-1), DEG_REDUCE_LIMIT)
+    out = np.empty_like(flat)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for start in range(0, flat.size, BLOCK_VALUES):
+            values = flat[start:start + BLOCK_VALUES]
+            result = out[start:start + BLOCK_VALUES]
+            # x = 90·q + r exactly, then r in radians
+            r = values * (1 / 90)
+            np.rint(r, out=r)
+            quadrant = r.astype(np.int64)
+            r *= -90
+            r += values
+            r *= math.pi / 180
+            if function == 'tan':
+                np.tan(r, out=result)
+                np.divide(-1, result, out=result, where=(quadrant & 1).astype(bool))
+                # -1/±0 at odd multiples of 90°: undefined, like the scalar tan
+                np.copyto(result, np.nan, where=np.isinf(result))
+                continue
+            quadrant += shift
+            # cos r is taken as sin(r + π/2): |r| <= π/4, so the rounding of
+            # the sum is below an ulp of the result and 0 and ±1 stay exact
+            r += (quadrant & 1) * (math.pi / 2)
+            np.sin(r, out=result)
+            # 0 - y rather than -y, so that sin(180) is 0.0 and not -0.0
+            np.subtract(0.0, result, out=result, where=(quadrant & 2).astype(bool))
+    return out.reshape(x.shape)
+
+
+def sin_degrees_array(x):
+    return _degrees_array(x, 'sin')
+
+
+def cos_degrees_array(x):
+    return _degrees_array(x, 'sin', shift=1)
+
+
+def tan_degrees_array(x):
+    """Element-wise tan of degrees; NaN at odd multiples of 90, where tan_degrees raises"""
+    return _degrees_array(x, 'tan')
+
+
+def _taylor_terms(h, tolerance, first):
+    """Fewest Taylor terms of sin (first=1) or cos (first=0) bounded by tolerance on |r| <= h
+
+    Returns the coefficients and the truncation error bound.
+    """
+    coefficients = []
+    power = first
+    while True:
+        coefficients.append((-1) ** (power // 2) / math.factorial(power))
+        power += 2
+        error = h ** power / math.factorial(power)
+        if error <= tolerance:
+            return coefficients, error
+
+
+class TableTrig:
+    """sin and cos of arrays from a table plus Taylor corrections, to an absolute error bound"""
+
+    def __init__(self, angle_mode='RAD', tolerance=1e-6, size=TABLE_SIZE):
+        import numpy as np
+
+        if not MIN_TOLERANCE <= tolerance < 1:
+            raise ValueError(f"tolerance must be between {MIN_TOLERANCE:g} and 1")
+        self.angle_mode = angle_mode
+        self.tolerance = tolerance
+        self.size = size
+        h = math.pi / size
+        budget = (tolerance - _ROUNDING) / 2
+        sin_coefficients, sin_error = _taylor_terms(h, budget, 1)
+        cos_coefficients, cos_error = _taylor_terms(h, budget, 0)
+        self.error_bound = sin_error + cos_error + _ROUNDING
+        # In DEG mode the remainder stays in degrees; the series absorb π/180
+        scale = math.pi / 180 if angle_mode == 'DEG' else 1.0
+        self.sin_coefficients = [c * scale ** (2 * i + 1) for i, c in enumerate(sin_coefficients)]
+        self.cos_coefficients = [c * scale ** (2 * i) for i, c in enumerate(cos_coefficients)]
+        # Exactly reduced table values: 0, ±1 and ±0.5 come out exact
+        step = 360 / size
+        sines = np.array([sin_degrees(k * step) for k in range(size)])
+        cosines = np.array([cos_degrees(k * step) for k in range(size)])
+        # cos x = sin(x + quarter turn): the same tables, rotated
+        quarter = size // 4
+        self._tables = {
+            'sin': (sines, cosines),
+            'cos': (np.roll(sines, -quarter), np.roll(cosines, -quarter)),
+        }
+
+    def sin(self, x):
+        return self._evaluate(x, 'sin')
+
+    def cos(self, x):
+        return self._evaluate(x, 'cos')
+
+    def _evaluate(self, x, function):
+        import numpy as np
+
+        x = np.asarray(x, dtype=np.float64)
+        flat = x.reshape(-1)
+        out = np.empty_like(flat)
+        sines, cosines = self._tables[function]
+        degrees = self.angle_mode == 'DEG'
+        size = self.size
+        mask = size - 1
+        with np.errstate(invalid='ignore'):
+            for start in range(0, flat.size, BLOCK_VALUES):
+                values = flat[start:start + BLOCK_VALUES]
+                result = out[start:start + BLOCK_VALUES]
+                if degrees:
+                    k = values * (size / 360)
+                    np.rint(k, out=k)
+                    r = k * -(360 / size)
+                    r += values  # exact
+                else:
+                    k = values * (size / (2 * math.pi))
+                    np.rint(k, out=k)
+                    r = k * -(_TWO_PI_HI / size)
+                    r += values
+                    r -= k * (_TWO_PI_LO / size)
+                # Two's complement: the low bits are k mod size for negative k too
+                index = k.astype(np.intp)
+                index &= mask
+                # sin(a + r) = sin a · cos r + cos a · sin r
+                r2 = r * r
+                np.multiply(sines.take(index), _series(self.cos_coefficients, r2), out=result)
+                sin_r = _series(self.sin_coefficients, r2)
+                sin_r *= r
+                sin_r *= cosines.take(index)
+                result += sin_r
+            # The table reduction is inexact for huge arguments; use the exact path
+            limit = DEG_REDUCE_LIMIT if degrees else RAD_TABLE_LIMIT
+            if flat.size and not (-limit < flat.min() and flat.max() < limit):
+                large = (flat >= limit) | (flat <= -limit)
+                if degrees:
+                    exact = sin_degrees_array if function == 'sin' else cos_degrees_array
+                else:
+                    exact = getattr(np, function)
+                out[large] = exact(flat[large])
+        return out.reshape(x.shape)
+
+
+def _series(coefficients, r2):
+    """c0 + c1·r2 + c2·r2² + ..., or the constant c0 when that is all there is"""
+    if len(coefficients) == 1:
+        return coefficients[0]
+    result = r2 * coefficients[-1]
+    for coefficient in reversed(coefficients[1:-1]):
+        result += coefficient
+        result *= r2
+    result += coefficients[0]
+    return result
+
+
+@functools.lru_cache(maxsize=16)
+def table_trig(angle_mode, tolerance):
+    """A shared TableTrig for an angle mode and error bound"""
+    return TableTrig(angle_mode, tolerance)
+
+
+def _samples(name, angle_mode, size):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    if name in ('log', 'ln'):
+        return 10 ** rng.uniform(-10, 10, size)
+    turns = rng.uniform(-4, 4, size)
+    return turns * (360 if angle_mode == 'DEG' else 2 * math.pi)
+
+
+def _per_value(func, values, repeat=3):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(values)
+        best = min(best, time.perf_counter() - started)
+    return best / values.size * 1e9
+
+
+def accuracy_report(tolerance, angle_mode='DEG', size=REPORT_SIZE):
+    """Error and speed of the fast functions against the exact ones
+
+    Errors are the largest differences from ``math`` over
+    ``REFERENCE_SIZE`` sample values, absolute below 1 and relative above
+    (and always relative for logarithms).  ``bound`` is the guaranteed
+    error of the table functions.  Times are nanoseconds per value over
+    ``size`` values.
+    """
+    import numpy as np
+
+    from calc_engine import scalar_functions, vector_functions
+
+    reference = scalar_functions(angle_mode)
+    exact = vector_functions(angle_mode)
+    fast = vector_functions(angle_mode, tolerance)
+    bound = table_trig(angle_mode, tolerance).error_bound
+    rows = []
+    for name in ('sin', 'cos', 'tan', 'log', 'ln'):
+        values = _samples(name, angle_mode, size)
+        checked = values[:REFERENCE_SIZE]
+        expected = np.fromiter(map(_or_inf(reference[name]), checked.tolist()), np.float64,
+                               len(checked))
+        finite = np.isfinite(expected)
+        expected = expected[finite]
+        error = np.abs(fast[name](checked)[finite] - expected)
+        scale = np.abs(expected) if name in ('log', 'ln') else np.maximum(np.abs(expected), 1)
+        tabulated = name in ('sin', 'cos')
+        rows.append({
+            'function': name,
+            'method': 'table' if tabulated else 'numpy',
+            'max_error': float((error / scale).max()),
+            'bound': bound if tabulated else None,
+            'exact_ns': _per_value(exact[name], values),
+            'fast_ns': _per_value(fast[name], values),
+        })
+    return rows
+
+
+def _or_inf(func):
+    def call(x):
+        try:
+            return func(x)
+        except (ValueError, ZeroDivisionError):
+            return math.inf
+    return call
+
+
+def format_report(rows, tolerance, angle_mode):
+    lines = [f"fast math, tolerance {tolerance:g}, {angle_mode}",
+             f"{'function':<9} {'method':<7} {'max error':>10} {'bound':>10} "
+             f"{'exact ns':>9} {'fast ns':>9} {'speedup':>8}"]
+    for row in rows:
+        bound = f"{row['bound']:.1e}" if row['bound'] is not None else "-"
+        lines.append(f"{row['function']:<9} {row['method']:<7} {row['max_error']:>10.2e} "
+                     f"{bound:>10} {row['exact_ns']:>9.1f} {row['fast_ns']:>9.1f} "
+                     f"{row['exact_ns'] / row['fast_ns']:>7.2f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Accuracy and speed of fast-math functions against exact ones.")
+    parser.add_argument('--tolerance', type=float, default=1e-6,
+                        help="absolute error bound for sin and cos")
+    parser.add_argument('--angle-mode', choices=('DEG', 'RAD'), default='DEG')
+    parser.add_argument('--size', type=int, default=REPORT_SIZE, help="values timed per function")
+    args = parser.parse_args(argv)
+    try:
+        rows = accuracy_report(args.tolerance, args.angle_mode, args.size)
+    except ValueError as e:
+        print(f"calc_trig: {e}", file=sys.stderr)
+        return 1
+    print(format_report(rows, args.tolerance, args.angle_mode))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
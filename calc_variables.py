@@ -0,0 +1,345 @@
+"""Reactive named variables.
+
+A ``Worksheet`` keeps definitions such as ``a = 3`` and ``b = a*sin(a)`` in
+a dependency graph.  Every definition carries a height one greater than
+those of the names it uses, so processing dirty definitions lowest height
+first is a topological order.  Redefining a variable recomputes it, and a
+dependent is recomputed only when one of its inputs actually changed value;
+propagation stops at any definition whose value comes out the same.  An
+edit therefore costs time in proportion to what changed, not to the size
+of the worksheet.
+
+Definitions are evaluated on the calling thread, so integer powers and
+factorials are bounded and a typo like ``9**9**9`` fails fast instead of
+hanging.
+
+``VariablesWindow`` lists the worksheet and rewrites only the rows whose
+values changed after each edit.
+"""
+import bisect
+import heapq
+import re
+import tkinter as tk
+from collections import defaultdict
+
+from calc_engine import (BINARY_OPERATORS, INLINE_FACTORIAL_LIMIT, BinOp, Call, ExpressionError,
+                         Num, UnaryOp, bounded_pow, compile_node, format_result, parse,
+                         scalar_functions, variables)
+
+MAX_POWER_BITS = 100000
+
+_ASSIGNMENT_RE = re.compile(r'\s*([A-Za-z_]\w*)\s*=\s*(.+)$', re.S)
+_NAME_RE = re.compile(r'[A-Za-z_]\w*$')
+_RESERVED_RE = re.compile(r'((e\d*)+|mod)$')  # tokenized as operators
+_ANGLE_FUNCTIONS = frozenset(('sin', 'cos', 'tan'))
+
+_OPERATORS = dict(BINARY_OPERATORS)
+_OPERATORS['**'] = lambda base, exponent: bounded_pow(base, exponent, MAX_POWER_BITS)
+
+
+def parse_assignment(text):
+    """Split ``name = expression`` into (name, expression), or return None"""
+    match = _ASSIGNMENT_RE.match(text)
+    return (match.group(1), match.group(2).strip()) if match else None
+
+
+def _uses_angle(node):
+    """Whether an AST calls a function that depends on the angle mode"""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        kind = type(node)
+        if kind is Call:
+            if node.name in _ANGLE_FUNCTIONS:
+                return True
+            stack.extend(node.args)
+        elif kind is BinOp:
+            stack.extend((node.left, node.right))
+        elif kind is UnaryOp:
+            stack.append(node.operand)
+    return False
+
+
+class Definition:
+    """One named value and the expression it is computed from"""
+
+    __slots__ = ('name', 'source', 'tree', 'depends', 'uses_angle', 'fn', 'height',
+                 'value', 'error')
+
+    def __init__(self, name, source, tree):
+        self.name = name
+        self.source = source
+        self.tree = tree
+        self.depends = frozenset(variables(tree))
+        self.uses_angle = _uses_angle(tree)
+        self.fn = None
+        self.height = 1
+        self.value = None
+        self.error = None
+
+
+class Worksheet:
+    """Named definitions that recompute incrementally when their inputs change"""
+
+    def __init__(self, angle_mode='DEG'):
+        self.angle_mode = angle_mode
+        self.functions = scalar_functions(angle_mode, INLINE_FACTORIAL_LIMIT)
+        self.definitions = {}
+        self.dependents = defaultdict(set)  # name -> definitions using it
+        self.values = {}  # name -> value of every definition without an error
+        self.recomputed = 0  # definitions evaluated, for reporting
+
+    def __contains__(self, name):
+        return name in self.definitions
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def value(self, name, default=None):
+        return self.values.get(name, default)
+
+    def error(self, name):
+        definition = self.definitions.get(name)
+        return definition.error if definition is not None else None
+
+    def source(self, name):
+        return self.definitions[name].source
+
+    def define(self, name, source):
+        """Define or redefine name; return the names whose values changed"""
+        self._check_name(name)
+        tree = parse(source)
+        definition = Definition(name, source.strip(), tree)
+        if name in definition.depends or self._reaches(definition.depends, name):
+            raise ExpressionError(f"Circular definition of {name!r}")
+        definition.fn = compile_node(tree, self.functions, _OPERATORS)
+        return self._install(definition)
+
+    def set(self, name, value):
+        """Store a constant, as used by memory registers"""
+        self._check_name(name)
+        definition = Definition(name, repr(value), Num(value))
+        definition.fn = lambda env: value
+        return self._install(definition)
+
+    def remove(self, name):
+        """Delete a definition; its dependents become errors"""
+        definition = self.definitions.pop(name, None)
+        if definition is None:
+            return []
+        for dependency in definition.depends:
+            self.dependents[dependency].discard(name)
+        self.values.pop(name, None)
+        return [name] + self._propagate(set(self.dependents.get(name, ())))
+
+    def set_angle_mode(self, angle_mode):
+        """Switch angle mode, recomputing only definitions that use trigonometry"""
+        if angle_mode == self.angle_mode:
+            return []
+        self.angle_mode = angle_mode
+        self.functions = scalar_functions(angle_mode, INLINE_FACTORIAL_LIMIT)
+        roots = set()
+        for definition in self.definitions.values():
+            if definition.uses_angle:
+                definition.fn = compile_node(definition.tree, self.functions, _OPERATORS)
+                roots.add(definition.name)
+        return self._propagate(roots)
+
+    def _check_name(self, name):
+        if not _NAME_RE.match(name) or _RESERVED_RE.match(name) or name in self.functions:
+            raise ExpressionError(f"{name!r} cannot be used as a variable name")
+
+    def _reaches(self, names, target):
+        """Whether target is among names or anything they depend on"""
+        seen = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name == target:
+                return True
+            if name in seen:
+                continue
+            seen.add(name)
+            definition = self.definitions.get(name)
+            if definition is not None:
+                stack.extend(definition.depends)
+        return False
+
+    def _install(self, definition):
+        name = definition.name
+        old = self.definitions.get(name)
+        if old is not None:
+            for dependency in old.depends - definition.depends:
+                self.dependents[dependency].discard(name)
+            # Compared with the new value to decide whether dependents recompute
+            definition.value, definition.error = old.value, old.error
+        for dependency in definition.depends:
+            self.dependents[dependency].add(name)
+        self.definitions[name] = definition
+        self._update_heights(definition)
+        return self._propagate({name}, force=True)
+
+    def _update_heights(self, definition):
+        """Restore height(dependent) > height(dependency) below definition"""
+        definitions = self.definitions
+        definition.height = 1 + max(
+            (definitions[d].height for d in definition.depends if d in definitions), default=0)
+        stack = [definition]
+        while stack:
+            current = stack.pop()
+            for name in self.dependents.get(current.name, ()):
+                dependent = definitions.get(name)
+                if dependent is not None and dependent.height <= current.height:
+                    dependent.height = current.height + 1
+                    stack.append(dependent)
+
+    def _propagate(self, roots, force=False):
+        """Recompute roots and, lowest height first, dependents of changed values
+
+        With ``force`` the roots are reported as changed even if their values
+        are not (they were just redefined), but their dependents are still
+        only recomputed when a value changed.  Returns the changed names.
+        """
+        definitions = self.definitions
+        heap = []
+        queued = set()
+        for name in roots:
+            definition = definitions.get(name)
+            if definition is not None:
+                queued.add(name)
+                heapq.heappush(heap, (definition.height, name))
+        changed = []
+        while heap:
+            _, name = heapq.heappop(heap)
+            definition = definitions[name]
+            old = (definition.value, definition.error)
+            self._evaluate(definition)
+            # NaN compares unequal to itself and so always counts as a change
+            if (definition.value, definition.error) == old:
+                if force and name in roots:
+                    changed.append(name)
+                continue
+            changed.append(name)
+            for dependent in self.dependents.get(name, ()):
+                if dependent not in queued and dependent in definitions:
+                    queued.add(dependent)
+                    heapq.heappush(heap, (definitions[dependent].height, dependent))
+        return changed
+
+    def _evaluate(self, definition):
+        self.recomputed += 1
+        name = definition.name
+        for dependency in definition.depends:
+            if dependency not in self.values:
+                problem = "is undefined" if dependency not in self.definitions else "has an error"
+                return self._fail(definition, f"{dependency} {problem}")
+        try:
+            value = definition.fn(self.values)
+        except ZeroDivisionError:
+            return self._fail(definition, "Cannot divide by zero")
+        except Exception as e:
+            return self._fail(definition, str(e) or type(e).__name__)
+        definition.value = value
+        definition.error = None
+        self.values[name] = value
+
+    def _fail(self, definition, error):
+        definition.value = None
+        definition.error = error
+        self.values.pop(definition.name, None)
+
+
+def describe(worksheet, name):
+    """One listing row: the definition and its value or error"""
+    source = worksheet.source(name)
+    error = worksheet.error(name)
+    value = f"Error: {error}" if error else format_result(worksheet.value(name))
+    if source == value or source == repr(worksheet.value(name)):
+        return f"{name} = {value}"
+    return f"{name} = {source}  →  {value}"
+
+
+class VariablesWindow(tk.Toplevel):
+    """Define variables and watch their values update"""
+
+    def __init__(self, master, worksheet, on_insert=None, on_change=None, colors=None):
+        super().__init__(master)
+        colors = colors or {}
+        bg = colors.get('bg', '#1e1e1e')
+        fg = colors.get('display_fg', '#ffffff')
+        self.title("Variables")
+        self.configure(bg=bg)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+        self.worksheet = worksheet
+        self.on_insert = on_insert
+        self.on_change = on_change
+        self.names = []  # listed names, sorted like the rows
+
+        self.definition_var = tk.StringVar(value="")
+        entry = tk.Entry(self, textvariable=self.definition_var, font=('Arial', 10), width=40)
+        entry.grid(row=0, column=0, sticky='we', padx=5, pady=5)
+        entry.bind('<Return>', lambda e: self.define())
+        tk.Button(self, text="Define", command=self.define).grid(row=0, column=1, padx=5, pady=5)
+
+        self.variable_list = tk.Listbox(self, height=12, font=('Courier', 10))
+        self.variable_list.grid(row=1, column=0, columnspan=2, sticky='nsew', padx=5)
+        self.variable_list.bind('<<ListboxSelect>>', self.on_select)
+        self.variable_list.bind('<Double-Button-1>', self.insert_selected)
+        self.variable_list.bind('<Delete>', self.remove_selected)
+
+        self.status_label = tk.Label(self, text="name = expression; double-click inserts, Delete removes",
+                                     anchor='w', bg=bg, fg='#888888', font=('Arial', 9))
+        self.status_label.grid(row=2, column=0, columnspan=2, sticky='we', padx=5, pady=(0, 5))
+        self.refresh(list(worksheet.definitions))
+        entry.focus_set()
+
+    def define(self):
+        assignment = parse_assignment(self.definition_var.get())
+        if assignment is None:
+            self.status_label.config(text="Expected name = expression")
+            return
+        try:
+            changed = self.worksheet.define(*assignment)
+        except (ExpressionError, ArithmeticError) as e:
+            self.status_label.config(text=f"Error: {e}")
+            return
+        self.definition_var.set("")
+        self.status_label.config(text=f"{len(changed)} updated")
+        self.refresh(changed)
+        if self.on_change is not None:
+            self.on_change(changed)
+
+    def selected(self):
+        selection = self.variable_list.curselection()
+        return self.names[selection[0]] if selection else None
+
+    def on_select(self, event=None):
+        name = self.selected()
+        if name is not None:
+            self.definition_var.set(f"{name} = {self.worksheet.source(name)}")
+
+    def insert_selected(self, event=None):
+        name = self.selected()
+        if name is not None and self.on_insert is not None:
+            self.on_insert(name)
+
+    def remove_selected(self, event=None):
+        name = self.selected()
+        if name is not None:
+            changed = self.worksheet.remove(name)
+            self.refresh(changed)
+            if self.on_change is not None:
+                self.on_change(changed)
+
+    def refresh(self, changed):
+        """Rewrite, add or drop the rows for the changed names only"""
+        for name in changed:
+            index = bisect.bisect_left(self.names, name)
+            listed = index < len(self.names) and self.names[index] == name
+            if listed:
+                self.variable_list.delete(index)
+                del self.names[index]
+            if name in self.worksheet:
+                self.names.insert(index, name)
+                self.variable_list.insert(index, describe(self.worksheet, name))
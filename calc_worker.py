@@ -0,0 +1,191 @@
+"""Off-thread evaluation in a cancellable worker process.
+
+The GUI submits one job at a time and polls for its outcome from the Tk
+event loop, so a runaway evaluation such as ``9**9**9`` never blocks the
+window.  Each job runs under a wall-clock budget enforced by the parent and
+an address-space budget enforced inside the child; exceeding either, or
+cancelling, terminates the worker, which is restarted on the next submit.
+
+A worker never outlives the process that started it: on Linux the kernel
+kills it when its parent exits, and everywhere a watchdog thread exits it
+once it has been reparented.
+"""
+import os
+import sys
+import time
+
+DEFAULT_TIMEOUT = 5.0  # seconds
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024  # bytes on top of the startup size
+WATCHDOG_INTERVAL = 1.0  # seconds between checks that the parent is alive
+_PR_SET_PDEATHSIG = 1
+
+# Job outcome statuses
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+
+
+def limit_memory(budget):
+    """Cap the child's address space at its current size plus budget"""
+    try:
+        import resource
+
+        with open('/proc/self/statm') as statm:
+            current = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        limit = current + budget
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ImportError, OSError, ValueError):
+        # No /proc or rlimit support on this platform; rely on the timeout
+        pass
+
+
+def _watch_parent(parent_pid):
+    while True:
+        time.sleep(WATCHDOG_INTERVAL)
+        if os.getppid() != parent_pid:
+            os._exit(1)
+
+
+def exit_with_parent(kill_signal=True):
+    """End this process when its parent exits, even without a goodbye
+
+    ``kill_signal`` asks Linux to SIGKILL us when the parent goes, which
+    works even mid-job; it is tied to the parent thread that started us,
+    so it is only requested for workers started from the main thread.
+    """
+    import threading
+
+    parent_pid = os.getppid()
+    if kill_signal and sys.platform.startswith('linux'):
+        try:
+            import ctypes
+            import signal
+
+            ctypes.CDLL(None, use_errno=True).prctl(_PR_SET_PDEATHSIG, signal.SIGKILL)
+        except (ImportError, OSError, AttributeError):
+            pass
+    # Portable, but cannot run while a job holds the GIL in one long C call
+    threading.Thread(target=_watch_parent, args=(parent_pid,), daemon=True).start()
+
+
+def _serve(conn, parent_conn, memory_limit, kill_signal):
+    """Worker loop: run (func, args) jobs and send back their outcome"""
+    # A forked child inherits the parent's end of the pipe; closing it means
+    # recv() sees EOF once the parent closes its end or exits
+    parent_conn.close()
+    exit_with_parent(kill_signal)
+    if memory_limit:
+        limit_memory(memory_limit)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        func, args = job
+        try:
+            outcome = (OK, func(*args))
+        except BaseException as e:
+            outcome = (ERROR, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send((ERROR, RuntimeError(repr(e))))
+
+
+class EvaluationWorker:
+    """A single worker process that runs one job at a time"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._process = None
+        self._conn = None
+        self._deadline = None
+
+    @property
+    def busy(self):
+        return self._deadline is not None
+
+    def start(self):
+        """Start the worker process if it is not already running"""
+        if self._process is not None and self._process.is_alive():
+            return
+        # Imported here so the GUI does not pay for it before the first job
+        import multiprocessing
+        import threading
+
+        parent_conn, child_conn = multiprocessing.Pipe()
+        main_thread = threading.current_thread() is threading.main_thread()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(child_conn, parent_conn, self.memory_limit, main_thread),
+            daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def submit(self, func, *args):
+        """Send func(*args) to the worker; func must be picklable"""
+        if self.busy:
+            raise RuntimeError("A job is already running")
+        self.start()
+        self._conn.send((func, args))
+        self._deadline = time.monotonic() + self.timeout
+
+    def fileno(self):
+        """File descriptor that becomes readable when the job's outcome arrives"""
+        return self._conn.fileno()
+
+    def poll(self, wait=0):
+        """Return the (status, value) outcome of the running job, or None
+
+        Waits up to ``wait`` seconds for the result.  A job that has run past
+        its deadline is killed and reported as ``TIMEOUT``.
+        """
+        if not self.busy:
+            return None
+        try:
+            ready = self._conn.poll(wait)
+            if ready:
+                outcome = self._conn.recv()
+                self._deadline = None
+                return outcome
+        except (EOFError, OSError):
+            # The worker died, most likely from exceeding its memory budget
+            self._kill()
+            return (ERROR, MemoryError("Worker process exited"))
+        if time.monotonic() >= self._deadline:
+            self._kill()
+            return (TIMEOUT, None)
+        return None
+
+    def cancel(self):
+        """Abort the running job, if any"""
+        if self.busy:
+            self._kill()
+
+    def close(self):
+        """Shut the worker process down"""
+        if self._process is not None and self._process.is_alive() and not self.busy:
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._process.join(1)
+        self._kill()
+
+    def _kill(self):
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+        self._deadline = None
@@ -1,22 +1,49 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import math
-import numpy as np
-from collections import deque
+import operator
+import os
+import time
+from functools import partial
+from calc_buffer import ExpressionBuffer
+from calc_engine import ExpressionEngine, evaluate, factorial, format_result, round_result
+from calc_history import HISTORY_DIR, HistoryStore
+from calc_keypad import COMMAND_TABLE, COMMANDS, KEYPAD_LAYOUT, command_for_key
+from calc_metrics import metrics
+from calc_preview import IncrementalEvaluator
+from calc_trig import DEGREE_FUNCTIONS
+from calc_variables import VariablesWindow, Worksheet
+from calc_worker import EvaluationWorker, OK, TIMEOUT
+
+# Bind tag carrying the shared button hover handlers
+HOVER_TAG = 'CalculatorHover'
+
+# Worker result polling
+POLL_INTERVAL_MS = 20
+QUICK_WAIT = 0.05  # seconds to wait before showing the computing state
+
+# Live preview debounce
+PREVIEW_DELAY_MS = 30
+PREVIEW_SLICE_TOKENS = 5000  # tokens previewed per idle slice after a paste
+PREVIEW_MAX_CHARS = 30
+
+# Evaluations captured by one profiling request (Shift+F12)
+PROFILE_EVALUATIONS = 10
+
+# History dropdown paging
+HISTORY_PAGE_SIZE = 25
+OLDER_ENTRIES = "▼ Older…"
+MEMORY_REGISTER = 'M'
 
 class ScientificCalculator:
-    def __init__(self, root):
+    def __init__(self, root, history_dir=None):
         self.root = root
         self.root.title("Advanced Scientific Calculator")
         self.root.geometry("500x700")
         self.root.resizable(False, False)
         
         # Variables
-        self.current_expression = ""
-        self.total_expression = ""
-        self.history = deque(maxlen=10)
-        self.memory = 0
-        self.angle_mode = "DEG"  # DEG or RAD
+        self.setup_state(history_dir)
         
         # Configure style
         self.setup_styles()
@@ -27,6 +54,37 @@ class ScientificCalculator:
         # Bind keyboard events
         self.bind_keyboard()
         
+    def setup_state(self, history_dir=None):
+        """Create the calculator state that does not depend on widgets"""
+        self.buffer = ExpressionBuffer()
+        self.redraw_job = None
+        self.total_expression = ""
+        self.history = self.open_history(history_dir)
+        self.history_search = None
+        self.history_pages = 1
+        self.angle_mode = "DEG"  # DEG or RAD
+        self.worksheet = Worksheet(self.angle_mode)  # named variables; memory is register M
+        self.worksheet.set(MEMORY_REGISTER, 0)
+        self.engine = ExpressionEngine()
+        self.worker = EvaluationWorker()
+        self.pending_job = None
+        self.preview = IncrementalEvaluator(self.angle_mode, self.worksheet.values)
+        self.preview_job = None
+        self.plot_window = None
+        self.calculus_window = None
+        self.matrix_window = None
+        self.variables_window = None
+        self.stats_window = None
+        
+        # Command table entries bound to this calculator's methods
+        self.actions = {command.label: partial(getattr(self, command.method), *command.args)
+                        for command in COMMAND_TABLE}
+        self.keys_down = set()
+        self.last_key_release = None
+        self.recording = None  # commands of the macro being recorded
+        self.recording_state = None
+        self.macro_player = None
+        
     def setup_styles(self):
         """Configure modern styling"""
         self.root.configure(bg='#1e1e1e')
@@ -47,7 +105,7 @@ class ScientificCalculator:
         }
         
     def create_widgets(self):
-        """Create all calculator widgets"""
+        """Create the display now and the remaining widgets when idle"""
         # Main frame
         main_frame = tk.Frame(self.root, bg=self.colors['bg'])
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -58,11 +116,20 @@ class ScientificCalculator:
         # Mode and memory display
         self.create_status_bar(main_frame)
         
-        # History dropdown
-        self.create_history_dropdown(main_frame)
+        # Empty frames hold the packing order so the first frame can be drawn
+        # before the history dropdown and keypad are built
+        history_frame = tk.Frame(main_frame, bg=self.colors['bg'])
+        history_frame.pack(fill=tk.X, pady=(0, 10))
+        button_frame = tk.Frame(main_frame, bg=self.colors['bg'])
+        button_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # One shared hover binding instead of two lambdas per button
+        self.root.bind_class(HOVER_TAG, '<Enter>', self.on_button_enter)
+        self.root.bind_class(HOVER_TAG, '<Leave>', self.on_button_leave)
         
-        # Buttons frame
-        self.create_buttons(main_frame)
+        self.keypad_ready = False
+        self.root.after_idle(self.create_history_dropdown, history_frame)
+        self.root.after_idle(self.create_buttons, button_frame)
         
     def create_display(self, parent):
         """Create calculator display"""
@@ -121,11 +188,78 @@ class ScientificCalculator:
         )
         self.memory_label.pack(side=tk.LEFT, padx=20)
         
-    def create_history_dropdown(self, parent):
-        """Create history dropdown"""
-        history_frame = tk.Frame(parent, bg=self.colors['bg'])
-        history_frame.pack(fill=tk.X, pady=(0, 10))
+        # Macro recording indicator
+        self.macro_label = tk.Label(
+            status_frame,
+            text="",
+            bg=self.colors['bg'],
+            fg='#ff4444',
+            font=('Arial', 10, 'bold')
+        )
+        self.macro_label.pack(side=tk.LEFT, padx=5)
+        
+        # Opens the function plot window
+        plot_label = tk.Label(
+            status_frame,
+            text="📈 Plot",
+            bg=self.colors['bg'],
+            fg=self.colors['display_fg'],
+            font=('Arial', 10, 'bold'),
+            cursor='hand2'
+        )
+        plot_label.pack(side=tk.RIGHT, padx=5)
+        plot_label.bind('<Button-1>', self.open_plot)
+        
+        # Opens the integrate/differentiate/solve window
+        calculus_label = tk.Label(
+            status_frame,
+            text="∫ Calculus",
+            bg=self.colors['bg'],
+            fg=self.colors['display_fg'],
+            font=('Arial', 10, 'bold'),
+            cursor='hand2'
+        )
+        calculus_label.pack(side=tk.RIGHT, padx=5)
+        calculus_label.bind('<Button-1>', self.open_calculus)
+        
+        # Opens the matrix workspace
+        matrix_label = tk.Label(
+            status_frame,
+            text="▦ Matrix",
+            bg=self.colors['bg'],
+            fg=self.colors['display_fg'],
+            font=('Arial', 10, 'bold'),
+            cursor='hand2'
+        )
+        matrix_label.pack(side=tk.RIGHT, padx=5)
+        matrix_label.bind('<Button-1>', self.open_matrix)
         
+        # Opens the named variables worksheet
+        variables_label = tk.Label(
+            status_frame,
+            text="≔ Vars",
+            bg=self.colors['bg'],
+            fg=self.colors['display_fg'],
+            font=('Arial', 10, 'bold'),
+            cursor='hand2'
+        )
+        variables_label.pack(side=tk.RIGHT, padx=5)
+        variables_label.bind('<Button-1>', self.open_variables)
+        
+        # Opens the statistics window
+        stats_label = tk.Label(
+            status_frame,
+            text="σ Stats",
+            bg=self.colors['bg'],
+            fg=self.colors['display_fg'],
+            font=('Arial', 10, 'bold'),
+            cursor='hand2'
+        )
+        stats_label.pack(side=tk.RIGHT, padx=5)
+        stats_label.bind('<Button-1>', self.open_stats)
+        
+    def create_history_dropdown(self, history_frame):
+        """Create history dropdown"""
         tk.Label(
             history_frame,
             text="History:",
@@ -139,61 +273,48 @@ class ScientificCalculator:
             history_frame,
             textvariable=self.history_var,
             state='readonly',
-            width=40,
-            font=('Arial', 10)
+            width=28,
+            font=('Arial', 10),
+            postcommand=self.load_history_page
         )
         self.history_dropdown.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.history_dropdown.bind('<<ComboboxSelected>>', self.load_from_history)
         
-    def create_buttons(self, parent):
-        """Create calculator buttons"""
-        button_frame = tk.Frame(parent, bg=self.colors['bg'])
-        button_frame.pack(fill=tk.BOTH, expand=True)
+        # Search filter applied to the history dropdown
+        self.history_filter_var = tk.StringVar()
+        self.history_filter_var.trace_add('write', self.filter_history)
+        history_filter = tk.Entry(
+            history_frame,
+            textvariable=self.history_filter_var,
+            width=10,
+            bg=self.colors['display_bg'],
+            fg=self.colors['display_fg'],
+            insertbackground=self.colors['display_fg'],
+            font=('Arial', 10)
+        )
+        history_filter.pack(side=tk.LEFT, padx=5)
+        # Keep typed filter text away from the calculator's root key bindings
+        history_filter.bindtags((history_filter, 'Entry', 'all'))
         
-        # Button layout
-        buttons = [
-            # Row 0 - Scientific functions
-            [('sin', 'func'), ('cos', 'func'), ('tan', 'func'), ('log', 'func'), ('ln', 'func')],
-            # Row 1 - More functions
-            [('x²', 'func'), ('√', 'func'), ('xⁿ', 'func'), ('1/x', 'func'), ('|x|', 'func')],
-            # Row 2 - Memory and mode
-            [('MC', 'memory'), ('MR', 'memory'), ('M+', 'memory'), ('M-', 'memory'), ('DEG/RAD', 'memory')],
-            # Row 3 - Constants and parentheses
-            [('π', 'func'), ('e', 'func'), ('(', 'op'), (')', 'op'), ('!', 'func')],
-            # Row 4 - Clear and basic ops
-            [('CE', 'clear'), ('C', 'clear'), ('⌫', 'clear'), ('÷', 'op'), ('%', 'op')],
-            # Row 5 - Numbers 7-9 and multiply
-            [('7', 'num'), ('8', 'num'), ('9', 'num'), ('×', 'op'), ('exp', 'func')],
-            # Row 6 - Numbers 4-6 and subtract
-            [('4', 'num'), ('5', 'num'), ('6', 'num'), ('-', 'op'), ('mod', 'func')],
-            # Row 7 - Numbers 1-3 and add
-            [('1', 'num'), ('2', 'num'), ('3', 'num'), ('+', 'op'), ('±', 'func')],
-            # Row 8 - 0, decimal and equals
-            [('0', 'num'), ('00', 'num'), ('.', 'num'), ('=', 'equal'), ('Ans', 'func')]
-        ]
-        
-        # Create buttons
-        for row_num, row in enumerate(buttons):
-            for col_num, (text, btn_type) in enumerate(row):
-                self.create_button(button_frame, text, btn_type, row_num, col_num)
-                
+    def create_buttons(self, button_frame):
+        """Create calculator buttons, one row per idle callback"""
+        self.create_button_row(button_frame, KEYPAD_LAYOUT, 0)
+        
+    def create_button_row(self, button_frame, buttons, row_num):
+        """Create one keypad row and schedule the next"""
+        for col_num, text in enumerate(buttons[row_num]):
+            self.create_button(button_frame, text, COMMANDS[text].kind, row_num, col_num)
+        if row_num + 1 < len(buttons):
+            self.root.after_idle(self.create_button_row, button_frame, buttons, row_num + 1)
+        else:
+            self.keypad_ready = True
+            # Fork the evaluation worker now rather than on the first '='
+            self.root.after_idle(self.worker.start)
+            
     def create_button(self, parent, text, btn_type, row, col):
         """Create individual button"""
-        # Determine button color based on type
-        if btn_type == 'num':
-            bg = self.colors['num_btn']
-        elif btn_type == 'op':
-            bg = self.colors['op_btn']
-        elif btn_type == 'func':
-            bg = self.colors['func_btn']
-        elif btn_type == 'equal':
-            bg = self.colors['equal_btn']
-        elif btn_type == 'clear':
-            bg = self.colors['clear_btn']
-        elif btn_type == 'memory':
-            bg = self.colors['memory_btn']
-        else:
-            bg = self.colors['num_btn']
+        # Button color by command kind
+        bg = self.colors.get(f'{btn_type}_btn', self.colors['num_btn'])
             
         btn = tk.Button(
             parent,
@@ -206,86 +327,84 @@ class ScientificCalculator:
             pady=5,
             activebackground=self.colors['btn_hover'],
             activeforeground=self.colors['btn_fg'],
-            command=lambda t=text: self.button_click(t)
+            command=partial(self.button_click, text)
         )
         
         # Configure grid
-        if text == '=':
-            btn.grid(row=row, column=col, sticky='nsew', padx=2, pady=2)
-        else:
-            btn.grid(row=row, column=col, sticky='nsew', padx=2, pady=2)
+        btn.grid(row=row, column=col, sticky='nsew', padx=2, pady=2)
             
         # Configure grid weights
         parent.grid_rowconfigure(row, weight=1)
         parent.grid_columnconfigure(col, weight=1)
         
-        # Hover effect
-        btn.bind('<Enter>', lambda e, b=btn: b.config(bg=self.colors['btn_hover']))
-        btn.bind('<Leave>', lambda e, b=btn, c=bg: b.config(bg=c))
+        # Hover effect through the shared class binding
+        btn.base_bg = bg
+        btn.bindtags(btn.bindtags() + (HOVER_TAG,))
+        
+    def on_button_enter(self, event):
+        """Highlight the button under the pointer"""
+        event.widget.config(bg=self.colors['btn_hover'])
+        
+    def on_button_leave(self, event):
+        """Restore a button's own color when the pointer leaves"""
+        event.widget.config(bg=event.widget.base_bg)
         
+    @metrics.timed('button_click')
     def button_click(self, value):
-        """Handle button clicks"""
+        """Run the command for a button label"""
+        command = COMMANDS.get(value)
+        if command is None:
+            return
+        # Only clearing (which cancels) is allowed while a job is running
+        if self.pending_job is not None and value != 'C':
+            return
+        if self.recording is not None:
+            self.recording.append(value)
+        # Draw coalesced keystrokes before a handler writes the display itself
+        if not command.buffered:
+            self.flush_display()
+        self.run_command(value, 'button_click')
+        
+    def run_command(self, label, operation):
+        """Run a command's action, showing "Error" if it raises"""
         try:
-            if value in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '.', '00']:
-                self.append_number(value)
-            elif value in ['+', '-', '×', '÷', '%']:
-                self.append_operator(value)
-            elif value == '=':
-                self.calculate()
-            elif value == 'C':
-                self.clear_all()
-            elif value == 'CE':
-                self.clear_entry()
-            elif value == '⌫':
-                self.backspace()
-            elif value == '(':
-                self.append_number('(')
-            elif value == ')':
-                self.append_number(')')
-            elif value in ['sin', 'cos', 'tan', 'log', 'ln']:
-                self.scientific_function(value)
-            elif value == 'x²':
-                self.power_function(2)
-            elif value == '√':
-                self.sqrt_function()
-            elif value == 'xⁿ':
-                self.append_operator('**')
-            elif value == '1/x':
-                self.reciprocal()
-            elif value == '|x|':
-                self.absolute()
-            elif value == 'π':
-                self.append_number(str(math.pi))
-            elif value == 'e':
-                self.append_number(str(math.e))
-            elif value == '!':
-                self.factorial()
-            elif value == '±':
-                self.negate()
-            elif value == 'exp':
-                self.append_operator('e')
-            elif value == 'mod':
-                self.append_operator(' mod ')
-            elif value == 'DEG/RAD':
-                self.toggle_angle_mode()
-            elif value == 'MC':
-                self.memory_clear()
-            elif value == 'MR':
-                self.memory_recall()
-            elif value == 'M+':
-                self.memory_add()
-            elif value == 'M-':
-                self.memory_subtract()
-            elif value == 'Ans':
-                self.use_last_answer()
-                
-        except Exception as e:
-            self.display_label.config(text="Error")
+            self.actions[label]()
+        except Exception:
+            self.show_error(operation)
             
+    def on_key_press(self, event):
+        """Route every key press through the command table"""
+        label = command_for_key(event.keysym, event.state)
+        # Held keys repeat as press events; X11 also sends a release with
+        # the same timestamp before each one
+        repeat = (event.keysym in self.keys_down
+                  or self.last_key_release == (event.keysym, event.time))
+        self.keys_down.add(event.keysym)
+        if label is None:
+            return None
+        command = COMMANDS[label]
+        if repeat and not command.repeat:
+            return "break"
+        if command.kind == 'shortcut':
+            self.run_command(label, 'shortcut')
+        else:
+            self.button_click(label)
+        return "break"
+        
+    def on_key_release(self, event):
+        self.keys_down.discard(event.keysym)
+        self.last_key_release = (event.keysym, event.time)
+        
+    def on_focus_out(self, event):
+        """Forget held keys whose release will go to another window"""
+        self.keys_down.clear()
+        
     def append_number(self, value):
         """Append number or decimal to expression"""
-        self.current_expression += str(value)
-        self.update_display()
+        self.buffer.append(str(value))
+        self.preview.append(str(value))
+        self.request_redraw()
+        self.schedule_preview()
         
     def append_operator(self, value):
         """Append operator to expression"""
@@ -294,8 +413,32 @@ class ScientificCalculator:
         elif value == '÷':
             value = '/'
             
-        self.current_expression += str(value)
-        self.update_display()
+        self.buffer.append(str(value))
+        self.preview.append(str(value))
+        self.request_redraw()
+        self.schedule_preview()
+        
+    def schedule_preview(self):
+        """Debounce the live preview to one update after a burst of keys"""
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.update_preview)
+        
+    def update_preview(self):
+        """Show the value of the expression typed so far"""
+        self.preview_job = None
+        value = self.preview.refresh(PREVIEW_SLICE_TOKENS)
+        if self.preview.pending:
+            # Continue a long expression in the next slice so the UI stays live
+            self.preview_job = self.root.after(1, self.update_preview)
+            return
+        if value is None:
+            self.expression_label.config(text="")
+        else:
+            text = format_result(value)
+            if len(text) > PREVIEW_MAX_CHARS:
+                text = text[:PREVIEW_MAX_CHARS] + "..."
+            self.expression_label.config(text=f"= {text}")
         
     def scientific_function(self, func):
         """Apply scientific function"""
@@ -304,11 +447,10 @@ class ScientificCalculator:
             if current:
                 angle = float(current)
                 
-                # Convert angle if in degree mode
-                if self.angle_mode == "DEG" and func in ['sin', 'cos', 'tan']:
-                    angle = math.radians(angle)
-                    
-                if func == 'sin':
+                # Degrees are reduced exactly rather than rounded through math.radians
+                if self.angle_mode == "DEG" and func in DEGREE_FUNCTIONS:
+                    result = DEGREE_FUNCTIONS[func](angle)
+                elif func == 'sin':
                     result = math.sin(angle)
                 elif func == 'cos':
                     result = math.cos(angle)
@@ -321,19 +463,17 @@ class ScientificCalculator:
                     
                 self.current_expression = str(result)
                 self.update_display()
-        except:
-            self.display_label.config(text="Error")
+        except Exception:
+            self.show_error('scientific_function')
             
     def power_function(self, power):
         """Calculate power"""
         try:
             current = self.get_current_number()
             if current:
-                result = float(current) ** power
-                self.current_expression = str(result)
-                self.update_display()
-        except:
-            self.display_label.config(text="Error")
+                self.run_in_worker(operator.pow, (float(current), power), self.show_result)
+        except Exception:
+            self.show_error('power_function')
             
     def sqrt_function(self):
         """Calculate square root"""
@@ -343,8 +483,8 @@ class ScientificCalculator:
                 result = math.sqrt(float(current))
                 self.current_expression = str(result)
                 self.update_display()
-        except:
-            self.display_label.config(text="Error")
+        except Exception:
+            self.show_error('sqrt_function')
             
     def reciprocal(self):
         """Calculate reciprocal"""
@@ -354,8 +494,8 @@ class ScientificCalculator:
                 result = 1 / float(current)
                 self.current_expression = str(result)
                 self.update_display()
-        except:
-            self.display_label.config(text="Error")
+        except Exception:
+            self.show_error('reciprocal')
             
     def absolute(self):
         """Calculate absolute value"""
@@ -365,21 +505,19 @@ class ScientificCalculator:
                 result = abs(float(current))
                 self.current_expression = str(result)
                 self.update_display()
-        except:
-            self.display_label.config(text="Error")
+        except Exception:
+            self.show_error('absolute')
             
     def factorial(self):
         """Calculate factorial"""
         try:
             current = self.get_current_number()
             if current:
-                n = int(float(current))
-                if n >= 0 and n <= 170:  # Prevent overflow
-                    result = math.factorial(n)
-                    self.current_expression = str(result)
-                    self.update_display()
-        except:
-            self.display_label.config(text="Error")
+                n = int(current) if current.isdigit() else float(current)
+                # Exact up to MAX_EXACT_FACTORIAL, gamma for fractions
+                self.run_in_worker(factorial, (n,), self.show_result)
+        except Exception:
+            self.show_error('factorial')
             
     def negate(self):
         """Negate current number"""
@@ -389,13 +527,207 @@ class ScientificCalculator:
                 result = -float(current)
                 self.current_expression = str(result)
                 self.update_display()
-        except:
-            self.display_label.config(text="Error")
+        except Exception:
+            self.show_error('negate')
             
     def toggle_angle_mode(self):
         """Toggle between DEG and RAD mode"""
         self.angle_mode = "RAD" if self.angle_mode == "DEG" else "DEG"
         self.angle_label.config(text=f"Mode: {self.angle_mode}")
+        self.preview.set_angle_mode(self.angle_mode)
+        if self.plot_window is not None:
+            self.plot_window.set_angle_mode(self.angle_mode)
+        self.refresh_variables(self.worksheet.set_angle_mode(self.angle_mode))
+        
+    def open_plot(self, event=None):
+        """Open the f(x) plot window, or raise it if already open"""
+        if self.plot_window is not None and self.plot_window.winfo_exists():
+            self.plot_window.lift()
+            return
+        # Imported here so NumPy is only loaded once a plot is opened
+        from calc_plot import PlotWindow
+        
+        expression = self.current_expression if 'x' in self.current_expression else 'sin(x)'
+        self.plot_window = PlotWindow(self.root, expression, self.angle_mode, self.colors)
+        self.plot_window.bind('<Destroy>', self.on_plot_closed, add='+')
+        
+    def on_plot_closed(self, event):
+        if event.widget is self.plot_window:
+            self.plot_window = None
+        
+    def open_matrix(self, event=None):
+        """Open the matrix workspace, or raise it if already open"""
+        if self.matrix_window is not None and self.matrix_window.winfo_exists():
+            self.matrix_window.lift()
+            return
+        # Imported here so NumPy is only loaded once matrices are used
+        from calc_matrix import MatrixWindow
+        
+        self.matrix_window = MatrixWindow(
+            self.root,
+            angle_mode=lambda: self.angle_mode,
+            on_scalar=lambda value: self.show_result(OK, round_result(value)),
+            colors=self.colors
+        )
+        
+    def open_stats(self, event=None):
+        """Open the statistics window, or raise it if already open"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        # Imported here so NumPy is only loaded once statistics are used
+        from calc_stats_window import StatsWindow
+        
+        self.stats_window = StatsWindow(
+            self.root,
+            on_result=lambda mean: self.show_result(OK, round_result(mean)),
+            colors=self.colors
+        )
+        
+    def open_variables(self, event=None):
+        """Open the variables worksheet, or raise it if already open"""
+        if self.variables_window is not None and self.variables_window.winfo_exists():
+            self.variables_window.lift()
+            return
+        self.variables_window = VariablesWindow(
+            self.root,
+            self.worksheet,
+            on_insert=self.append_variable,
+            on_change=self.on_variables_changed,
+            colors=self.colors
+        )
+        
+    def append_variable(self, name):
+        """Insert a variable name into the expression"""
+        self.buffer.append(name)
+        self.preview.append(name)
+        self.request_redraw()
+        self.schedule_preview()
+        
+    def on_variables_changed(self, changed):
+        """Keep the memory indicator and preview in step with edits made in the worksheet"""
+        if MEMORY_REGISTER in changed:
+            self.memory_label.config(text=f"M: {self.memory:.4g}")
+        self.preview_variables(changed)
+        
+    def refresh_variables(self, changed):
+        """Update the rows of an open variables window and the live preview"""
+        if changed and self.variables_window is not None and self.variables_window.winfo_exists():
+            self.variables_window.refresh(changed)
+        self.preview_variables(changed)
+        
+    def preview_variables(self, changed):
+        """Preview the expression being typed again once variables have changed"""
+        if not changed:
+            return
+        self.preview.variables_changed()
+        # A finished calculation keeps its expression line
+        if not self.total_expression or self.expression_label.cget('text') != self.total_expression:
+            self.schedule_preview()
+        
+    def open_calculus(self, event=None):
+        """Open the integrate/differentiate/solve window, or raise it if already open"""
+        if self.calculus_window is not None and self.calculus_window.winfo_exists():
+            self.calculus_window.lift()
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Calculus")
+        window.configure(bg=self.colors['bg'])
+        window.columnconfigure(1, weight=1)
+        self.calculus_window = window
+        
+        fields = (
+            ('f(x) =', 'expression', 'sin(x)'),
+            ('a / x₀', 'a', '0'),
+            ('b', 'b', '1'),
+            ('tolerance', 'tol', '1e-10'),
+        )
+        self.calculus_vars = {}
+        for row, (label, key, default) in enumerate(fields):
+            tk.Label(
+                window,
+                text=label,
+                bg=self.colors['bg'],
+                fg=self.colors['display_fg'],
+                font=('Arial', 10)
+            ).grid(row=row, column=0, sticky='e', padx=5, pady=2)
+            var = tk.StringVar(value=default)
+            tk.Entry(window, textvariable=var, font=('Arial', 10), width=32).grid(
+                row=row, column=1, columnspan=3, sticky='we', padx=5, pady=2)
+            self.calculus_vars[key] = var
+        
+        operations = (('∫ dx  [a, b]', 'integrate'), ('d/dx  at x₀', 'derivative'), ('Solve  [a, b]', 'solve'))
+        for column, (text, operation) in enumerate(operations, start=1):
+            tk.Button(
+                window,
+                text=text,
+                command=lambda op=operation: self.run_calculus(op)
+            ).grid(row=len(fields), column=column, sticky='we', padx=5, pady=5)
+        
+        self.calculus_result = tk.Label(
+            window,
+            text="",
+            anchor='w',
+            justify=tk.LEFT,
+            bg=self.colors['bg'],
+            fg=self.colors['display_fg'],
+            font=('Arial', 10)
+        )
+        self.calculus_result.grid(row=len(fields) + 1, column=0, columnspan=4, sticky='we', padx=5, pady=(0, 5))
+        
+    def run_calculus(self, operation):
+        """Integrate, differentiate or solve f(x) in the worker"""
+        if self.pending_job is not None:
+            return
+        # Imported here so NumPy is only loaded once calculus is used
+        import calc_calculus
+        
+        expression = self.calculus_vars['expression'].get()
+        try:
+            a = float(self.calculus_vars['a'].get())
+            b = float(self.calculus_vars['b'].get())
+            tol = float(self.calculus_vars['tol'].get())
+        except ValueError:
+            self.calculus_result.config(text="Bounds and tolerance must be numbers")
+            return
+        if operation == 'integrate':
+            func, args = calc_calculus.integrate, (expression, a, b, tol, self.angle_mode)
+        elif operation == 'derivative':
+            func, args = calc_calculus.derivative, (expression, a, self.angle_mode)
+        else:
+            func, args = calc_calculus.solve, (expression, a, b, tol, self.angle_mode)
+        self.calculus_result.config(text="Computing…")
+        self.run_in_worker(func, args,
+                           lambda status, result: self.finish_calculus(operation, status, result))
+        
+    def finish_calculus(self, operation, status, result):
+        """Show a calculus result in its window and on the display"""
+        if status == OK:
+            if operation == 'solve':
+                value = result.roots[0] if result.roots else None
+                text = "Roots: " + (", ".join(f"{root:.12g}" for root in result.roots) or "none found")
+            else:
+                value = result.value
+                symbol = "∫" if operation == 'integrate' else "f′"
+                text = f"{symbol} = {result.value:.15g} ± {result.error:.2g}"
+            text += f"\n{result.evaluations} evaluations, {self.angle_mode}"
+            if value is not None:
+                self.show_result(OK, round_result(value))
+        elif status == TIMEOUT:
+            text = "Timed out"
+        else:
+            metrics.record_error(operation)
+            text = f"Error: {result}"
+        self.calculus_result.config(text=text)
+        
+    @property
+    def memory(self):
+        """The memory register, kept in the worksheet so expressions can use M"""
+        return self.worksheet.value(MEMORY_REGISTER, 0)
+        
+    @memory.setter
+    def memory(self, value):
+        self.refresh_variables(self.worksheet.set(MEMORY_REGISTER, value))
         
     def memory_clear(self):
         """Clear memory"""
@@ -414,8 +746,8 @@ class ScientificCalculator:
             if current:
                 self.memory += float(current)
                 self.memory_label.config(text=f"M: {self.memory:.4g}")
-        except:
-            pass
+        except Exception:
+            metrics.record_error('memory_add')
             
     def memory_subtract(self):
         """Subtract current value from memory"""
@@ -424,8 +756,8 @@ class ScientificCalculator:
             if current:
                 self.memory -= float(current)
                 self.memory_label.config(text=f"M: {self.memory:.4g}")
-        except:
-            pass
+        except Exception:
+            metrics.record_error('memory_subtract')
             
     def use_last_answer(self):
         """Use last calculation answer"""
@@ -436,13 +768,8 @@ class ScientificCalculator:
             
     def get_current_number(self):
         """Extract current number from expression"""
-        try:
-            # Try to evaluate the entire expression
-            if self.current_expression:
-                return self.current_expression
-            return "0"
-        except:
-            return "0"
+        # Reading the buffer cannot fail, so there is nothing to catch
+        return self.current_expression or "0"
             
     def calculate(self):
         """Calculate the expression"""
@@ -453,19 +780,23 @@ class ScientificCalculator:
             # Store original expression
             self.total_expression = self.current_expression
             
-            # Replace symbols for evaluation
-            expression = self.current_expression
-            expression = expression.replace('×', '*')
-            expression = expression.replace('÷', '/')
-            expression = expression.replace('mod', '%')
-            expression = expression.replace('e', '*10**')
+            # Evaluate in the worker process through its compiled expression cache
+            self.calculate_started = time.perf_counter()
+            self.run_in_worker(
+                evaluate, (self.current_expression, self.angle_mode, dict(self.worksheet.values)),
+                self.finish_calculate)
             
-            # Evaluate expression
-            result = eval(expression)
+        except Exception:
+            self.show_error('calculate')
+            self.current_expression = ""
             
+    def finish_calculate(self, status, result):
+        """Show the outcome of an evaluation started by calculate()"""
+        metrics.observe('calculate', time.perf_counter() - self.calculate_started,
+                        error=status != OK)
+        if status == OK:
             # Round to avoid floating point issues
-            if isinstance(result, float):
-                result = round(result, 10)
+            result = format_result(result)
                 
             # Add to history
             history_entry = f"{self.total_expression} = {result}"
@@ -474,18 +805,79 @@ class ScientificCalculator:
             
             # Update display
             self.expression_label.config(text=self.total_expression)
-            self.current_expression = str(result)
+            self.current_expression = result
             self.update_display()
-            
-        except ZeroDivisionError:
+        elif status == TIMEOUT:
+            self.display_label.config(text="Timed out")
+            self.current_expression = ""
+        elif isinstance(result, ZeroDivisionError):
             self.display_label.config(text="Cannot divide by zero")
             self.current_expression = ""
-        except Exception as e:
+        else:
             self.display_label.config(text="Error")
             self.current_expression = ""
             
+    def show_error(self, operation):
+        """Show a generic error and count it against the failed operation"""
+        metrics.record_error(operation)
+        self.display_label.config(text="Error")
+            
+    def show_result(self, status, result):
+        """Replace the current expression with a worker result"""
+        if status == OK:
+            self.current_expression = format_result(result)
+            self.update_display()
+        elif status == TIMEOUT:
+            self.display_label.config(text="Timed out")
+        else:
+            self.display_label.config(text="Error")
+            
+    def run_in_worker(self, func, args, on_done):
+        """Run func(*args) off the Tk thread and pass (status, value) to on_done"""
+        job, job_args = metrics.wrap_job(func, args)
+        self.worker.submit(job, *job_args)
+        self.pending_job = on_done
+        
+        # Fast results are shown directly without flashing the computing state
+        outcome = self.worker.poll(QUICK_WAIT)
+        if outcome is not None:
+            self.finish_job(outcome)
+            return
+        self.display_label.config(text="Computing…")
+        self.root.after(POLL_INTERVAL_MS, self.poll_worker)
+        
+    def poll_worker(self):
+        """Check the worker for a result from the Tk event loop"""
+        if self.pending_job is None:
+            return
+        outcome = self.worker.poll()
+        if outcome is None:
+            self.root.after(POLL_INTERVAL_MS, self.poll_worker)
+        else:
+            self.finish_job(outcome)
+            
+    def finish_job(self, outcome):
+        """Hand a worker outcome to the callback that requested it"""
+        on_done = self.pending_job
+        self.pending_job = None
+        on_done(*outcome)
+        
+    def cancel_evaluation(self):
+        """Cancel the running worker job"""
+        self.worker.cancel()
+        self.pending_job = None
+            
+    def evaluate_batch(self, expression, **variables):
+        """Evaluate an expression element-wise over NumPy arrays of variables"""
+        return self.engine.evaluate_batch(expression, variables, self.angle_mode)
+            
     def clear_all(self):
-        """Clear all"""
+        """Clear all, cancelling any running evaluation"""
+        if self.pending_job is not None:
+            self.cancel_evaluation()
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+            self.preview_job = None
         self.current_expression = ""
         self.total_expression = ""
         self.expression_label.config(text="")
@@ -498,60 +890,188 @@ class ScientificCalculator:
         
     def backspace(self):
         """Remove last character"""
-        self.current_expression = self.current_expression[:-1]
-        if not self.current_expression:
-            self.display_label.config(text="0")
-        else:
-            self.update_display()
+        self.buffer.delete(1)
+        self.preview.delete(1)
+        self.request_redraw()
+        self.schedule_preview()
+            
+    @property
+    def current_expression(self):
+        """The expression being edited, as text"""
+        return str(self.buffer)
+        
+    @current_expression.setter
+    def current_expression(self, value):
+        self.buffer.set(value)
+        self.preview.replace(str(value))
+        
+    def paste(self, event=None):
+        """Append clipboard text to the expression in a single edit"""
+        if self.pending_job is not None:
+            return "break"
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return "break"
+        self.paste_text(text)
+        return "break"
+        
+    def paste_text(self, text):
+        """Append text to the expression, collapsing whitespace"""
+        text = ' '.join(text.split())
+        if text:
+            if self.recording is not None:
+                self.recording.append(('Paste', text))
+            self.flush_display()
+            self.buffer.append(text)
+            self.preview.append(text)
+            self.request_redraw()
+            self.schedule_preview()
+        
+    def request_redraw(self):
+        """Redraw the display once the current burst of events is handled"""
+        if self.redraw_job is None:
+            self.redraw_job = self.root.after_idle(self.redraw_display)
+            
+    def redraw_display(self):
+        """Idle callback drawing the coalesced display update"""
+        self.redraw_job = None
+        self.update_display()
+        
+    def flush_display(self):
+        """Draw a pending coalesced update now"""
+        if self.redraw_job is not None:
+            self.root.after_cancel(self.redraw_job)
+            self.redraw_display()
             
+    @metrics.timed('update_display')
     def update_display(self):
         """Update the display"""
-        if self.current_expression:
+        if self.buffer:
             # Limit display length
-            display_text = self.current_expression
+            display_text = self.buffer.head(21)
             if len(display_text) > 20:
                 display_text = display_text[:20] + "..."
             self.display_label.config(text=display_text)
         else:
             self.display_label.config(text="0")
             
+    def open_history(self, directory=None):
+        """Open the persistent history, falling back to a temporary one"""
+        try:
+            return HistoryStore(directory or HISTORY_DIR)
+        except OSError:
+            import tempfile
+            return HistoryStore(tempfile.mkdtemp(prefix='calculator-history-'))
+            
+    @metrics.timed('update_history_dropdown')
     def update_history_dropdown(self):
-        """Update history dropdown"""
-        history_list = list(self.history)
-        history_list.reverse()
-        self.history_dropdown['values'] = history_list
+        """Invalidate the history dropdown; rows are loaded when it opens"""
+        self.history_search = None
+        self.history_pages = 1
+        
+    def filter_history(self, *args):
+        """Narrow the history dropdown to entries containing the filter text"""
+        query = self.history_filter_var.get()
+        if self.history_search is None:
+            self.history_search = self.history.search(query)
+        else:
+            self.history_search = self.history_search.refine(query)
+        self.history_pages = 1
+        self.load_history_page()
+        
+    def load_history_page(self):
+        """Load only the visible pages of matching history into the dropdown"""
+        if self.history_search is None:
+            self.history_search = self.history.search(self.history_filter_var.get())
+        count = HISTORY_PAGE_SIZE * self.history_pages
+        values = self.history_search.page(0, count + 1)
+        if len(values) > count:
+            values = values[:count] + [OLDER_ENTRIES]
+        self.history_dropdown['values'] = values
         
     def load_from_history(self, event):
         """Load calculation from history"""
         selected = self.history_var.get()
-        if selected:
+        if selected == OLDER_ENTRIES:
+            self.history_pages += 1
+            self.history_var.set("")
+            self.load_history_page()
+        elif selected:
             parts = selected.split('=')
             if len(parts) == 2:
                 self.current_expression = parts[0].strip()
                 self.update_display()
                 
+    def dump_metrics(self, event=None):
+        """Write JSON and Prometheus metrics snapshots next to the history"""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        for suffix in ('json', 'prom'):
+            metrics.dump(os.path.join(self.history.directory, f'metrics-{stamp}.{suffix}'))
+            
+    def profile_evaluations(self, event=None):
+        """Capture a cProfile of the next worker evaluations"""
+        metrics.profile_next(
+            PROFILE_EVALUATIONS, os.path.join(self.history.directory, 'profile.prof'))
+            
+    def toggle_recording(self, event=None):
+        """Start recording a macro, or stop and save the one being recorded"""
+        import calc_macro
+        
+        if self.recording is None:
+            self.recording = []
+            self.recording_state = calc_macro.capture_state(self)
+            self.macro_label.config(text="● REC")
+            return
+        events, self.recording = self.recording, None
+        self.macro_label.config(text="")
+        if not events:
+            return
+        path = filedialog.asksaveasfilename(
+            parent=self.root, defaultextension='.calcmacro',
+            filetypes=[("Macros", "*.calcmacro *.calcmacro.gz"), ("All files", "*")])
+        if path:
+            try:
+                calc_macro.save_macro(path, self.recording_state, events)
+            except OSError as e:
+                messagebox.showerror("Macro", str(e), parent=self.root)
+                
+    def replay_macro(self, event=None):
+        """Replay a macro file into the window, or stop the running replay"""
+        import calc_macro
+        
+        if self.macro_player is not None:
+            self.macro_player.cancel()
+            self.macro_player = None
+            self.macro_label.config(text="")
+            return
+        path = filedialog.askopenfilename(
+            parent=self.root, filetypes=[("Macros", "*.calcmacro *.calcmacro.gz"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            state, events = calc_macro.load_macro(path)
+            calc_macro.apply_state(self, state)
+        except (ValueError, ArithmeticError, OSError) as e:
+            messagebox.showerror("Macro", str(e), parent=self.root)
+            return
+        self.macro_label.config(text="▶ Replay")
+        self.macro_player = calc_macro.MacroPlayer(self, events, self.finish_replay)
+        self.macro_player.start()
+        
+    def finish_replay(self, report):
+        """Show the outcome and timings of a finished replay"""
+        import calc_macro
+        
+        self.macro_player = None
+        self.macro_label.config(text="● REC" if self.recording is not None else "")
+        messagebox.showinfo("Macro", calc_macro.format_report(report), parent=self.root)
+            
     def bind_keyboard(self):
-        """Bind keyboard shortcuts"""
-        self.root.bind('<Key-0>', lambda e: self.button_click('0'))
-        self.root.bind('<Key-1>', lambda e: self.button_click('1'))
-        self.root.bind('<Key-2>', lambda e: self.button_click('2'))
-        self.root.bind('<Key-3>', lambda e: self.button_click('3'))
-        self.root.bind('<Key-4>', lambda e: self.button_click('4'))
-        self.root.bind('<Key-5>', lambda e: self.button_click('5'))
-        self.root.bind('<Key-6>', lambda e: self.button_click('6'))
-        self.root.bind('<Key-7>', lambda e: self.button_click('7'))
-        self.root.bind('<Key-8>', lambda e: self.button_click('8'))
-        self.root.bind('<Key-9>', lambda e: self.button_click('9'))
-        self.root.bind('<period>', lambda e: self.button_click('.'))
-        self.root.bind('<plus>', lambda e: self.button_click('+'))
-        self.root.bind('<minus>', lambda e: self.button_click('-'))
-        self.root.bind('<asterisk>', lambda e: self.button_click('×'))
-        self.root.bind('<slash>', lambda e: self.button_click('÷'))
-        self.root.bind('<Return>', lambda e: self.button_click('='))
-        self.root.bind('<BackSpace>', lambda e: self.button_click('⌫'))
-        self.root.bind('<Escape>', lambda e: self.button_click('C'))
-        self.root.bind('<parenleft>', lambda e: self.button_click('('))
-        self.root.bind('<parenright>', lambda e: self.button_click(')'))
+        """Bind every key to the command table router"""
+        self.root.bind('<KeyPress>', self.on_key_press)
+        self.root.bind('<KeyRelease>', self.on_key_release)
+        self.root.bind('<FocusOut>', self.on_focus_out)
 
 
 def main():
@@ -0,0 +1,53 @@
+"""Vectorized batch evaluation against the scalar engine."""
+import numpy as np
+import pytest
+
+from calc_engine import ExpressionError, compile_expression, evaluate, evaluate_batch
+
+
+@pytest.mark.parametrize('expression', [
+    "x**2 + 3*x - 1",
+    "sin(x) + cos(x)",
+    "sqrt(abs(x)) / (1 + x**2)",
+    "x mod 7",
+    "2e1 * x",
+])
+def test_matches_scalar_evaluation(expression):
+    xs = np.linspace(-50, 50, 41)
+    result = evaluate_batch(expression, {'x': xs})
+    expected = [evaluate(expression, env={'x': float(x)}) for x in xs]
+    assert result.dtype == np.float64
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_broadcasts_variables_and_constants():
+    result = evaluate_batch("x * y", {'x': [[1], [2]], 'y': [10, 20, 30]})
+    assert result.tolist() == [[10, 20, 30], [20, 40, 60]]
+    assert evaluate_batch("2+3", {'x': np.zeros(4)}).tolist() == [5, 5, 5, 5]
+
+
+def test_errors_become_nan_and_inf():
+    assert evaluate_batch("1/x", {'x': [0.0, 2.0]}).tolist() == [np.inf, 0.5]
+    result = evaluate_batch("sqrt(x)", {'x': [-1.0, 4.0]})
+    assert np.isnan(result[0]) and result[1] == 2.0
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ("1/0 + x", [np.inf, np.inf, np.inf]),
+    ("x*10**400", [-np.inf, np.nan, np.inf]),
+    ("5 mod 0 + x", [np.nan, np.nan, np.nan]),
+    ("sqrt(-1) * x + (x+1)*(x+1)", [np.nan, np.nan, np.nan]),
+])
+def test_constant_subtrees_follow_numpy(expression, expected):
+    x = np.array([-1.0, 0.0, 2.0])
+    result = evaluate_batch(expression, {'x': x})
+    np.testing.assert_array_equal(result, expected)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for optimize in (False, True):
+            compiled = compile_expression(expression, vectorized=True, optimize=optimize)
+            np.testing.assert_array_equal(compiled({'x': x}), expected)
+
+
+def test_missing_variables_are_reported():
+    with pytest.raises(ExpressionError, match="y"):
+        evaluate_batch("x + y", {'x': [1, 2]})
@@ -0,0 +1,33 @@
+import random
+
+from calc_buffer import CHUNK_SIZE, ExpressionBuffer
+
+
+def test_edits_match_a_plain_string():
+    rng = random.Random(3)
+    buffer = ExpressionBuffer("12+")
+    text = "12+"
+    for _ in range(5000):
+        if rng.random() < 0.7:
+            piece = rng.choice(["1", "+", "sin(", "x" * rng.randint(1, 2 * CHUNK_SIZE)])
+            buffer.append(piece)
+            text += piece
+        else:
+            count = rng.randint(1, CHUNK_SIZE + 10)
+            buffer.delete(count)
+            text = text[:-count]
+        assert len(buffer) == len(text)
+        assert buffer.head(21) == text[:21]
+    assert str(buffer) == text
+    assert bool(buffer) == bool(text)
+
+
+def test_set_and_delete_past_start():
+    buffer = ExpressionBuffer()
+    assert str(buffer) == "" and not buffer
+    buffer.set(12.5)
+    assert str(buffer) == "12.5"
+    buffer.delete(10)
+    assert str(buffer) == "" and len(buffer) == 0
+    buffer.append("")
+    assert str(buffer) == ""
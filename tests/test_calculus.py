@@ -0,0 +1,61 @@
+"""Integration, differentiation and root finding against closed forms."""
+import math
+
+import pytest
+
+from calc_calculus import CalculusEngine, derivative, integrate, solve
+from calc_engine import ExpressionError
+
+
+@pytest.mark.parametrize('expression, a, b, expected', [
+    ("x**2", 0, 3, 9.0),
+    ("sin(x)", 0, math.pi, 2.0),
+    ("1/x", 1, math.e, 1.0),
+    ("sqrt(x)", 0, 1, 2 / 3),
+    ("abs(x)", -1, 2, 2.5),
+    ("x**2", 3, 0, -9.0),
+    ("x", 2, 2, 0.0),
+])
+def test_integrate(expression, a, b, expected):
+    estimate = integrate(expression, a, b, angle_mode='RAD')
+    assert estimate.value == pytest.approx(expected, rel=1e-9, abs=1e-9)
+    assert estimate.error <= 1e-8
+
+
+def test_integrate_refuses_poles_and_infinite_bounds():
+    with pytest.raises(ExpressionError):
+        integrate("1/x", -1, 1)
+    with pytest.raises(ExpressionError):
+        integrate("x", 0, math.inf)
+
+
+@pytest.mark.parametrize('expression, x, expected', [
+    ("x**3", 2, 12.0),
+    ("sin(x)", 0, 1.0),
+    ("ln(x)", 0.01, 100.0),
+    ("ln(x)", 1e-6, 1e6),
+    ("sqrt(x)", 4, 0.25),
+])
+def test_derivative(expression, x, expected):
+    assert derivative(expression, x, 'RAD').value == pytest.approx(expected, rel=1e-8)
+
+
+def test_derivative_in_degrees():
+    assert derivative("sin(x)", 0, 'DEG').value == pytest.approx(math.pi / 180, rel=1e-8)
+
+
+def test_solve_finds_every_sign_change():
+    roots = solve("x**3 - x", -2, 2).roots
+    assert roots == pytest.approx((-1.0, 0.0, 1.0), abs=1e-10)
+    assert solve("sin(x)", 1, 10, angle_mode='RAD').roots == pytest.approx(
+        (math.pi, 2 * math.pi, 3 * math.pi), abs=1e-10)
+    assert solve("x**2 + 1", -5, 5).roots == ()
+
+
+def test_results_are_cached_and_other_variables_rejected():
+    engine = CalculusEngine()
+    first = engine.integrate("x**2", 0, 1)
+    assert engine.integrate("x**2", 0, 1) is first
+    assert engine.cache_info().misses == 1
+    with pytest.raises(ExpressionError):
+        engine.derivative("x*y", 1)
@@ -0,0 +1,77 @@
+"""Column evaluation against evaluate_batch over the same arrays."""
+import math
+
+import numpy as np
+import pytest
+
+from calc_columns import column_layout, evaluate_columns, main
+from calc_engine import ExpressionError, evaluate_batch
+
+
+@pytest.fixture
+def columns(tmp_path):
+    rng = np.random.default_rng(3)
+    x = rng.normal(size=10000)
+    y = rng.uniform(1, 5, size=10000)
+    np.save(tmp_path / "x.npy", x)
+    y.astype('<f8').tofile(tmp_path / "y.f64")
+    np.save(tmp_path / "n.npy", np.arange(199000, 200000, dtype=np.int64))
+    return tmp_path, x, y
+
+
+@pytest.mark.parametrize('output', ["r.npy", "r.f64"])
+def test_matches_evaluate_batch_across_windows(columns, output):
+    path, x, y = columns
+    expression = "sqrt(x**2 + y**2) * sin(x*30) / y"
+    out = str(path / output)
+    rows = evaluate_columns(expression, {'x': str(path / "x.npy"), 'y': str(path / "y.f64")},
+                            out, workers=3, block_rows=1000, window_rows=3000)
+    assert rows == len(x)
+    result = np.load(out) if output.endswith('.npy') else np.fromfile(out, dtype='<f8')
+    np.testing.assert_array_equal(result, evaluate_batch(expression, {'x': x, 'y': y}))
+
+
+def test_constants_integer_columns_and_nan(columns):
+    path, x, _ = columns
+    out = str(path / "r.npy")
+    evaluate_columns("ln(x) + k", {'x': str(path / "x.npy"), 'k': 2}, out)
+    with np.errstate(invalid='ignore'):
+        np.testing.assert_array_equal(np.load(out), np.log(x) + 2)
+    evaluate_columns("nCr(n, 2)", {'n': str(path / "n.npy")}, out)
+    assert np.load(out).tolist() == [float(math.comb(n, 2)) for n in range(199000, 200000)]
+
+
+@pytest.mark.parametrize('expression', ["n*n", "n**-1", "n mod 0", "n/k + nCr(n, 2)"])
+def test_integer_columns_are_evaluated_in_float64(tmp_path, expression):
+    n = np.array([4000000000, -7, 0, 3, 2 ** 40], dtype=np.int64)
+    np.save(tmp_path / "n.npy", n)
+    out = str(tmp_path / "r.npy")
+    evaluate_columns(expression, {'n': str(tmp_path / "n.npy"), 'k': 2}, out, block_rows=2)
+    np.testing.assert_array_equal(np.load(out), evaluate_batch(expression, {'n': n, 'k': 2}))
+
+
+def test_errors(columns):
+    path, _, _ = columns
+    (path / "short.f64").write_bytes(np.zeros(5).tobytes())
+    (path / "odd.bin").write_bytes(b"\0" * 12)
+    with pytest.raises(ExpressionError, match="different lengths"):
+        evaluate_columns("x + s", {'x': str(path / "x.npy"), 's': str(path / "short.f64")},
+                         str(path / "r.npy"))
+    with pytest.raises(ExpressionError, match="both an input and the output"):
+        evaluate_columns("x*2", {'x': str(path / "x.npy")}, str(path / "x.npy"))
+    with pytest.raises(ExpressionError, match="Missing values for y"):
+        evaluate_columns("x + y", {'x': str(path / "x.npy")}, str(path / "r.npy"))
+    with pytest.raises(ExpressionError, match="multiple of 8"):
+        column_layout(str(path / "odd.bin"))
+    np.save(path / "text.npy", np.array(["a", "b"]))
+    with pytest.raises(ExpressionError, match="not a numeric column"):
+        column_layout(str(path / "text.npy"))
+
+
+def test_main(columns, capsys):
+    path, x, _ = columns
+    out = str(path / "r.npy")
+    assert main(["x*2", f"x={path / 'x.npy'}", "-o", out]) == 0
+    np.testing.assert_array_equal(np.load(out), x * 2)
+    assert main(["x*2", f"x={path / 'missing.npy'}", "-o", out]) == 1
+    assert "calc_columns:" in capsys.readouterr().err
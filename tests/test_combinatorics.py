@@ -0,0 +1,79 @@
+"""Exact combinatorics against math, and the float array variants."""
+import math
+
+import numpy as np
+import pytest
+
+from calc_combinatorics import (comb, comb_array, factorial, factorial_array, gamma_array,
+                                lgamma_array, perm, perm_array, primes_up_to, scientific_text)
+from calc_headless import HeadlessCalculator
+
+
+@pytest.mark.parametrize('n', [0, 1, 5, 255, 256, 257, 1000, 4097, 20000])
+def test_factorial_is_exact(n):
+    assert factorial(n) == math.factorial(n)
+
+
+@pytest.mark.parametrize('n, r', [(0, 0), (5, 2), (5, 7), (300, 150), (1000, 3), (5000, 2400),
+                                  (100000, 99990)])
+def test_comb_and_perm_are_exact(n, r):
+    assert comb(n, r) == math.comb(n, r)
+    assert perm(n, r) == math.perm(n, r)
+
+
+def test_invalid_arguments():
+    for bad in (-1, 2.5):
+        with pytest.raises(ValueError):
+            factorial(bad)
+        with pytest.raises(ValueError):
+            comb(5, bad)
+    assert factorial(5.0) == 120
+
+
+def test_primes_and_scientific_text():
+    assert primes_up_to(30) == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert primes_up_to(10) == [2, 3, 5, 7]
+    assert scientific_text(10 ** 40) == "1.000000000e40"
+    assert scientific_text(-factorial(100)) == "-9.332621544e157"
+
+
+def test_arrays_are_exact_below_2_53():
+    n, r = np.meshgrid(np.arange(70.0), np.arange(-1.0, 72.0))
+    combs = comb_array(n, r)
+    perms = perm_array(n, r)
+    for a, b, c, p in zip(n.ravel(), r.ravel(), combs.ravel(), perms.ravel()):
+        if b < 0:
+            assert np.isnan(c) and np.isnan(p)
+            continue
+        exact_c, exact_p = math.comb(int(a), int(b)), math.perm(int(a), int(b))
+        assert c == float(exact_c) if exact_c < 2 ** 53 else c == pytest.approx(exact_c, rel=1e-12)
+        assert p == float(exact_p) if exact_p < 2 ** 53 else p == pytest.approx(exact_p, rel=1e-12)
+    assert comb_array(50, 25) == 126410606437752
+    i = np.arange(199990.0, 200000.0)
+    assert comb_array(i, 2).tolist() == [float(math.comb(int(k), 2)) for k in i]
+    assert comb_array(1e300, 1) == 1e300
+    assert np.isnan(comb_array(2.5, 1))
+
+
+def test_gamma_arrays():
+    x = np.array([0.5, 1, 5, 10.5, 171, -0.5, -2.5, 30.25])
+    expected = [math.gamma(v) for v in x]
+    np.testing.assert_allclose(gamma_array(x), expected, rtol=1e-13)
+    np.testing.assert_allclose(lgamma_array(x), [math.lgamma(v) for v in x], rtol=1e-13, atol=1e-14)
+    assert gamma_array(np.arange(1.0, 20.0)).tolist() == [float(math.factorial(k)) for k in range(19)]
+    assert np.isnan(gamma_array(-3.0)) and np.isinf(gamma_array(172.0))
+    assert np.isinf(lgamma_array(0.0)) and factorial_array(4.0) == 24
+
+
+def test_large_factorial_display_evaluates_to_itself():
+    calculator = HeadlessCalculator()
+    try:
+        for label in ('3', '0', '0', '!'):
+            calculator.button_click(label)
+        shown = calculator.display_label.cget('text')
+        assert shown == scientific_text(math.factorial(300)) == "3.060575122e614"
+        calculator.button_click('=')
+        assert calculator.display_label.cget('text') == shown
+        assert calculator.history[-1] == f"{shown} = {shown}"
+    finally:
+        calculator.close()
@@ -0,0 +1,166 @@
+"""Engine semantics against the original eval-based calculate()."""
+import math
+
+import pytest
+
+import calc_engine
+from calc_engine import (CacheInfo, ExpressionEngine, ExpressionError, LRUCache, compile_expression,
+                         compile_shared, evaluate, format_result, normalize, optimization_info,
+                         optimize_tree, parse, tokenize)
+
+
+def baseline(expression):
+    """What calculate() displayed before the engine replaced eval()"""
+    expression = expression.replace('×', '*')
+    expression = expression.replace('÷', '/')
+    expression = expression.replace('mod', '%')
+    expression = expression.replace('e', '*10**')
+    result = eval(expression)
+    if isinstance(result, float):
+        result = round(result, 10)
+    return str(result)
+
+
+@pytest.mark.parametrize('expression', [
+    "2+3",
+    "3×4÷2",
+    "12.5-7.25",
+    "5÷2",
+    "0.1+0.2",
+    ".5+1",
+    "2e3",
+    "2e-3",
+    "1.5e-3*4",
+    "3e2e1",
+    "10 mod 3",
+    "-7 mod 3",
+    "7.5 mod 2",
+    "7%3",
+    "-7%3",
+    "10//3",
+    "2**10",
+    "2**-1",
+    "-2**2+7",
+    "2**3**2",
+    "(1+2)*(3+4)/5",
+    "((1+2)*3-4)/5 mod 7",
+    "--3+-+2",
+    "3.141592653589793*2",
+    "2.718281828459045**2",
+])
+def test_matches_baseline(expression):
+    assert format_result(evaluate(expression)) == baseline(expression)
+
+
+@pytest.mark.parametrize('expression', ["1/0", "1÷0", "5 mod 0", "5%0", "3//0", "0**-1"])
+def test_division_by_zero(expression):
+    with pytest.raises(ZeroDivisionError):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize('expression', ["", "   ", "2+", "(1+2", "1+2)", "2 $ 3", "abc",
+                                        "foo(2)", "3 4", "*2", "sin(", "sin(1,)"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ExpressionError):
+        evaluate(expression)
+
+
+def test_no_eval_of_python_names():
+    with pytest.raises(ExpressionError):
+        evaluate("__import__('os')")
+
+
+def test_trigonometry_follows_angle_mode():
+    assert evaluate("sin(30)") == pytest.approx(0.5)
+    assert evaluate("sin(180)") == 0
+    assert evaluate("sin(pi_half)", 'RAD', {'pi_half': math.pi / 2}) == 1
+    assert evaluate("cos(0)", 'RAD') == 1
+
+
+def test_variables():
+    assert evaluate("a*b + 1", env={'a': 2, 'b': 3}) == 7
+    with pytest.raises(ExpressionError, match="Unknown variable"):
+        evaluate("a + 1")
+
+
+def test_normalize_and_tokenize():
+    assert normalize(" 3 ×  4÷2 ") == "3 * 4/2"
+    assert tokenize("2e3") == [('num', 2), ('op', '*'), ('num', 10), ('op', '**'), ('num', 3)]
+    assert tokenize("7 mod 2") == [('num', 7), ('op', '%'), ('num', 2)]
+
+
+def test_long_sum_does_not_recurse():
+    assert evaluate("+".join(["1"] * 100000)) == 100000
+    assert parse("1+2").op == '+'
+
+
+def test_format_result():
+    assert format_result(0.1 + 0.2) == "0.3"
+    assert format_result(10 ** 40) == "1.000000000e40"
+    assert format_result(12) == "12"
+
+
+def test_lru_cache_eviction_and_counters():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.put('c', 3)
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b') is None
+    assert cache.info() == CacheInfo(hits=1, misses=1, maxsize=2, currsize=2)
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+def test_engine_cache_is_keyed_by_normalized_text_and_mode():
+    engine = ExpressionEngine(cache_size=8)
+    engine.compile("3×4")
+    engine.compile(" 3 *  4 ")
+    engine.compile("3 * 4")
+    engine.compile("3×4", 'RAD')
+    info = engine.cache_info()
+    assert (info.misses, info.currsize) == (3, 3)
+
+
+def test_optimization_info_is_available_on_first_use():
+    info = optimization_info("2*3 + x*(1+1)*7", 'DEG')
+    assert info is not None and info.folded == 2 and info.nodes_after < info.nodes_before
+
+
+def test_cache_hits_do_not_reparse(monkeypatch):
+    engine = ExpressionEngine()
+    compiled = engine.compile("sin(30)*x + 1")
+    monkeypatch.setattr(calc_engine, 'tokenize', None)
+    assert engine.compile("sin(30)*x  + 1") is compiled
+    assert engine.evaluate("sin(30)*x + 1", env={'x': 4}) == 3.0
+
+
+@pytest.mark.parametrize('expression', [
+    "(x+1)*(x+1) + sin(x+1)/(x+1)",
+    "2**10 - x mod 3 + 3e2*x",
+    "sqrt(x*x) + sqrt(x*x)*2 - abs(-x)",
+    "factorial(5)/factorial(3) + nCr(6, 2)*x",
+    "1/0 + x",
+    "x - -0.0 + 1.0 - 1",
+])
+def test_folding_and_sharing_keep_results(expression):
+    plain = compile_expression(expression)
+    optimized = compile_expression(expression, optimize=True)
+    for x in (-2.5, 0, 3, 7.25):
+        try:
+            expected = plain({'x': x})
+        except ZeroDivisionError:
+            with pytest.raises(ZeroDivisionError):
+                optimized({'x': x})
+            continue
+        assert optimized({'x': x}) == expected
+
+
+def test_shared_subtrees_are_evaluated_once():
+    calls = []
+    functions = dict(calc_engine.scalar_functions(), sin=lambda v: calls.append(v) or v)
+    tree, info = optimize_tree(parse("sin(x*2) + sin(x*2)**2 + sin(2*x)"))
+    assert info.shared == 1
+    assert compile_shared(tree, functions)({'x': 1.5}) == 3 + 9 + 3
+    assert calls == [3.0, 3.0]
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from calc_history import INDEX_NAME, LOG_NAME, HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_append_index_and_recent(store):
+    for i in range(10):
+        store.append(f"{i}+{i} = {2 * i}")
+    assert len(store) == 10
+    assert store[0] == "0+0 = 0"
+    assert store[-1] == "9+9 = 18"
+    assert store.recent(0, 3) == ["9+9 = 18", "8+8 = 16", "7+7 = 14"]
+    assert store.recent(8, 5) == ["1+1 = 2", "0+0 = 0"]
+    with pytest.raises(IndexError):
+        store[10]
+
+
+def test_newlines_and_unicode(store):
+    store.append("3×4\n÷2 = 6")
+    assert store[0] == "3×4 ÷2 = 6"
+
+
+def test_reopen_keeps_entries(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append("1+1 = 2")
+    store.append("2+2 = 4")
+    store.close()
+    reopened = HistoryStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.recent() == ["2+2 = 4", "1+1 = 2"]
+    reopened.close()
+
+
+def test_recovers_from_interrupted_append(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append("1+1 = 2")
+    store.close()
+    # A complete line that never reached the index, then a torn one
+    with open(os.path.join(tmp_path, LOG_NAME), 'ab') as log:
+        log.write(b"2+2 = 4\n3+3 =")
+    with open(os.path.join(tmp_path, INDEX_NAME), 'ab') as index:
+        index.write(b"\x01\x02")
+    store = HistoryStore(str(tmp_path))
+    assert store.recent() == ["2+2 = 4", "1+1 = 2"]
+    store.append("4+4 = 8")
+    assert store[-1] == "4+4 = 8"
+    store.close()
+
+
+def test_two_stores_on_one_directory(tmp_path):
+    first = HistoryStore(str(tmp_path))
+    second = HistoryStore(str(tmp_path))
+    first.append("zero = 0")
+    second.append("two = 2")
+    first.append("one = 1")
+    for store in (first, second):
+        assert len(store) == 3
+        assert store.recent() == ["one = 1", "two = 2", "zero = 0"]
+    assert HistoryStore(str(tmp_path)).recent() == ["one = 1", "two = 2", "zero = 0"]
+    first.close()
+    second.close()
+
+
+def test_search_and_refine(store):
+    for entry in ["sin(30) = 0.5", "2+2 = 4", "sin(90) = 1.0", "cos(0) = 1.0", "22+1 = 23"]:
+        store.append(entry)
+    search = store.search("sin")
+    assert search.page(0, 10) == ["sin(90) = 1.0", "sin(30) = 0.5"]
+    narrowed = search.refine("sin(3")
+    assert narrowed.page(0, 10) == ["sin(30) = 0.5"]
+    assert store.search("1.0").page(0, 1) == ["cos(0) = 1.0"]
+    assert store.search("2", prefix=True).page(0, 10) == ["22+1 = 23", "2+2 = 4"]
+    assert store.search("").page(1, 2) == ["cos(0) = 1.0", "sin(90) = 1.0"]
+    assert store.search("missing").page(0, 10) == []
@@ -0,0 +1,89 @@
+"""The command table, key lookup and the calculator's single dispatch path."""
+from types import SimpleNamespace
+
+import pytest
+
+from calc_headless import HeadlessCalculator
+from calc_keypad import (COMMAND_TABLE, COMMANDS, CONTROL_MASK, KEY_BINDINGS, KEYPAD_LAYOUT,
+                         SHIFT_MASK, command_for_key)
+from scientific_calculator import ScientificCalculator
+
+
+def test_table_is_consistent():
+    assert len(COMMANDS) == len(COMMAND_TABLE)
+    keys = [key for command in COMMAND_TABLE for key in command.keys]
+    assert len(keys) == len(set(keys)) == len(KEY_BINDINGS)
+    labels = [label for row in KEYPAD_LAYOUT for label in row]
+    assert len(labels) == len(set(labels))
+    buttons = {command.label for command in COMMAND_TABLE if command.kind != 'shortcut'}
+    assert set(labels) == buttons
+    for command in COMMAND_TABLE:
+        assert callable(getattr(ScientificCalculator, command.method))
+
+
+def test_command_for_key_with_modifiers():
+    assert command_for_key('7') == '7'
+    assert command_for_key('KP_7') == '7'
+    assert command_for_key('Return') == '='
+    assert command_for_key('e') == 'exp'
+    assert command_for_key('E', SHIFT_MASK) == 'e'
+    assert command_for_key('F12') == 'Metrics'
+    assert command_for_key('F12', SHIFT_MASK) == 'Profile'
+    assert command_for_key('v', CONTROL_MASK) == 'Paste'
+    assert command_for_key('V', CONTROL_MASK | SHIFT_MASK) == 'Paste'
+    assert command_for_key('r', CONTROL_MASK) == 'MR'
+    assert command_for_key('r') == '√'
+    assert command_for_key('x') is None
+    assert command_for_key('q', CONTROL_MASK) is None
+    assert command_for_key('Tab') is None
+
+
+def key(keysym, state=0, time=0):
+    return SimpleNamespace(keysym=keysym, state=state, time=time)
+
+
+@pytest.fixture
+def calculator():
+    calculator = HeadlessCalculator()
+    yield calculator
+    calculator.close()
+
+
+def test_keys_and_buttons_share_one_path(calculator):
+    for keysym in ('1', 'plus', 'KP_2', 'asterisk', '3', 'Return'):
+        assert calculator.on_key_press(key(keysym)) == "break"
+        calculator.on_key_release(key(keysym))
+    assert calculator.display_label.cget('text') == "7"
+    assert calculator.on_key_press(key('Tab')) is None
+
+
+def test_held_keys_repeat_only_editing_commands(calculator):
+    for time in range(3):
+        calculator.on_key_press(key('5', time=time))
+    assert calculator.current_expression == "555"
+    # ± is negated once however long F9 is held
+    for time in range(3):
+        calculator.on_key_press(key('F9', time=time))
+    assert calculator.current_expression == "-555.0"
+
+
+def test_failing_shortcut_shows_error(calculator, monkeypatch):
+    def broken():
+        raise RuntimeError("no display")
+    monkeypatch.setitem(calculator.actions, 'Plot', broken)
+    assert calculator.on_key_press(key('p', CONTROL_MASK)) == "break"
+    assert calculator.display_label.cget('text') == "Error"
+    monkeypatch.setitem(calculator.actions, 'sin', broken)
+    calculator.button_click('sin')
+    assert calculator.display_label.cget('text') == "Error"
+
+
+def test_memory_register_starts_at_zero(calculator):
+    calculator.paste_text("M+1")
+    calculator.button_click('=')
+    assert calculator.display_label.cget('text') == "1"
+    for label in ('C', '5', 'M+', 'C'):
+        calculator.button_click(label)
+    calculator.paste_text("M*2")
+    calculator.button_click('=')
+    assert calculator.display_label.cget('text') == "10.0"
@@ -0,0 +1,77 @@
+"""Macro files and headless replay."""
+import gzip
+import json
+
+import pytest
+
+from calc_headless import HeadlessCalculator
+from calc_macro import (PASTE, MacroError, apply_state, capture_state, load_macro, main, replay,
+                        save_macro)
+
+EVENTS = ['1', '+', '2', '=', 'C', (PASTE, 'sin(30)*2'), '=', 'M+', 'DEG/RAD', 'C', '9', '×', '2', '=']
+
+
+@pytest.fixture
+def calculator():
+    calculator = HeadlessCalculator()
+    yield calculator
+    calculator.close()
+
+
+@pytest.mark.parametrize('name', ["session.calcmacro", "session.calcmacro.gz"])
+def test_save_and_load_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    state = {'angle_mode': 'DEG', 'expression': '', 'memory': 0,
+             'variables': {'a': '3'}, 'history': ['1+1 = 2']}
+    save_macro(path, state, EVENTS)
+    loaded_state, events = load_macro(path)
+    assert events == EVENTS
+    assert loaded_state == dict(state, format='calc-macro', version=1)
+    if name.endswith('.gz'):
+        with gzip.open(path, 'rt') as f:
+            assert json.loads(f.readline())['format'] == 'calc-macro'
+
+
+@pytest.mark.parametrize('content, message', [
+    ("not json\n", "not a macro file"),
+    ('{"format": "other"}\n', "not a macro file"),
+    ('{"format": "calc-macro", "version": 99}\n', "unsupported macro version"),
+    ('{"format": "calc-macro", "version": 1}\n1\nfrobnicate\n', ":3: unknown command"),
+    ('{"format": "calc-macro", "version": 1}\nPlot\n', "unknown command 'Plot'"),
+])
+def test_invalid_files(tmp_path, content, message):
+    path = tmp_path / "bad.calcmacro"
+    path.write_text(content)
+    with pytest.raises(MacroError, match=message):
+        load_macro(str(path))
+
+
+def test_headless_replay_final_state(calculator):
+    report = replay(calculator, EVENTS)
+    state = report['state']
+    assert state['history'] == ['1+2 = 3', 'sin(30)*2 = 1.0', '9*2 = 18']
+    assert state['display'] == "18" and state['memory'] == 1.0
+    assert state['angle_mode'] == 'RAD'
+    assert report['events'] == len(EVENTS) == len(report['event_seconds'])
+    assert report['commands']['=']['count'] == 3
+
+
+def test_state_capture_and_restore(calculator):
+    calculator.paste_text("2+")
+    calculator.refresh_variables(calculator.worksheet.define('k', "4"))
+    state = capture_state(calculator)
+    other = HeadlessCalculator()
+    try:
+        apply_state(other, state)
+        assert capture_state(other) == dict(state, history=[])
+    finally:
+        other.close()
+
+
+def test_main_replays_a_file(tmp_path, capsys):
+    path = str(tmp_path / "session.calcmacro")
+    save_macro(path, {'angle_mode': 'DEG', 'variables': {}, 'history': []}, ['6', '×', '7', '='])
+    assert main([path, '--json']) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report['state']['display'] == "42"
+    assert main([str(tmp_path / "missing.calcmacro")]) == 1
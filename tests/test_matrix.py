@@ -0,0 +1,81 @@
+"""Matrix literals and workspace evaluation; the window is not tested."""
+import numpy as np
+import pytest
+
+from calc_engine import ExpressionError
+from calc_matrix import MatrixWorkspace, describe, load_matrix, parse_matrix
+
+
+def test_parse_matrix_forms():
+    expected = [[1.0, 2.0], [3.0, 4.0]]
+    assert parse_matrix("[1, 2; 3, 4]").tolist() == expected
+    assert parse_matrix("[[1, 2], [3, 4]]").tolist() == expected
+    assert parse_matrix("1 2\n3 4").tolist() == expected
+    assert parse_matrix("[1 2 3]").tolist() == [1.0, 2.0, 3.0]
+    for text in ("[]", "[1, 2; 3]", "[1, x]"):
+        with pytest.raises(ExpressionError):
+            parse_matrix(text)
+
+
+def test_load_matrix(tmp_path):
+    np.save(tmp_path / "a.npy", np.eye(2))
+    (tmp_path / "b.csv").write_text("1,2\n3,4\n")
+    assert load_matrix(str(tmp_path / "a.npy")).tolist() == [[1, 0], [0, 1]]
+    assert load_matrix(str(tmp_path / "b.csv")).tolist() == [[1, 2], [3, 4]]
+
+
+@pytest.fixture
+def workspace():
+    workspace = MatrixWorkspace()
+    workspace.define('A', "[2, 1; 1, 3]")
+    workspace.define('b', "[1, 2]")
+    return workspace
+
+
+def test_linear_algebra(workspace):
+    name, x = workspace.evaluate("x = solve(A, b)")
+    assert name == 'x'
+    np.testing.assert_allclose(workspace.evaluate("dot(A, x)")[1], [1, 2])
+    assert workspace.evaluate("det(A)") == ('ans', pytest.approx(5.0))
+    np.testing.assert_allclose(workspace.evaluate("dot(A, inv(A))")[1], np.eye(2), atol=1e-12)
+    np.testing.assert_allclose(workspace.evaluate("eig(A)")[1], np.linalg.eigvalsh([[2, 1], [1, 3]]))
+    assert workspace.evaluate("transpose(A) - A")[1].tolist() == [[0, 0], [0, 0]]
+    assert workspace.evaluate("zeros(2, 3)")[1].shape == (2, 3)
+
+
+def test_elementwise_never_overwrites_stored_matrices(workspace):
+    before = workspace.matrices['A'].copy()
+    workspace.evaluate("C = sqrt(A)")
+    workspace.evaluate("D = sqrt(abs(A * 2))")
+    assert workspace.matrices['A'].tolist() == before.tolist()
+    np.testing.assert_allclose(workspace.matrices['D'], np.sqrt(before * 2))
+
+
+def test_errors(workspace):
+    workspace.define('S', "[1, 2; 2, 4]")
+    with pytest.raises(ExpressionError):
+        workspace.evaluate("inv(S)")
+    with pytest.raises(ExpressionError, match="Unknown matrices"):
+        workspace.evaluate("A + Z")
+    for name in ("e", "e2", "mod", "sin", "2x"):
+        with pytest.raises(ExpressionError):
+            workspace.store(name, [1])
+
+
+def test_describe_summarizes_large_arrays():
+    assert describe(3.5) == "3.5"
+    text = describe(np.arange(1000.0))
+    assert text.startswith("1000 float64\n") and "..." in text
+
+
+def test_trigonometry_in_degrees_is_exact(workspace):
+    workspace.define('T', "[180, 360, 1e22]")
+    sines = workspace.evaluate("sin(T)")[1]
+    assert sines[:2].tolist() == [0.0, 0.0]
+    assert sines[2] == pytest.approx(-0.9848077530122081, abs=1e-15)
+    assert workspace.evaluate("cos(T*0.5)")[1][:2].tolist() == [0.0, -1.0]
+    assert np.isnan(workspace.evaluate("tan(T*0.5)")[1][0])
+    assert workspace.evaluate("sin(30)") == ('ans', pytest.approx(0.5))
+    np.testing.assert_allclose(workspace.evaluate("sin(T)", 'RAD')[1][:2], np.sin([180, 360]))
+    workspace.store('Z', np.array([1 + 1j, 2]))
+    np.testing.assert_allclose(workspace.evaluate("sin(Z)")[1], np.sin(np.array([1 + 1j, 2]) * np.pi / 180))
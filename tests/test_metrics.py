@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from calc_metrics import BUCKETS, Histogram, Metrics, profile_call
+
+
+def test_histogram_counts_and_quantiles():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) is None
+    for seconds in [0.00002] * 98 + [0.3, 20.0]:
+        histogram.observe(seconds)
+    assert histogram.count == 100
+    assert histogram.quantile(0.5) == 0.000025
+    assert histogram.quantile(0.99) == 0.5
+    assert histogram.quantile(1.0) == 20.0
+    assert histogram.buckets[-1] == 1  # beyond the last bound
+    assert histogram.max == 20.0
+    assert len(histogram.as_dict()['buckets']) == len(BUCKETS)
+
+
+def test_timed_records_only_while_enabled():
+    metrics = Metrics()
+
+    @metrics.timed('op')
+    def op(fail=False):
+        if fail:
+            raise ValueError
+        return 42
+
+    assert op() == 42
+    assert metrics.operations == {}
+    metrics.enable()
+    op()
+    with pytest.raises(ValueError):
+        op(fail=True)
+    metrics.record_error('op')
+    histogram = metrics.operations['op']
+    assert (histogram.count, histogram.errors) == (2, 2)
+
+
+def test_dump_json_and_prometheus(tmp_path):
+    metrics = Metrics(enabled=True)
+    metrics.observe('calculate', 0.003)
+    metrics.observe('calculate', 0.2, error=True)
+    metrics.dump(str(tmp_path / 'm.json'))
+    snapshot = json.loads((tmp_path / 'm.json').read_text())
+    assert snapshot['operations']['calculate']['count'] == 2
+    metrics.dump(str(tmp_path / 'm.prom'))
+    text = (tmp_path / 'm.prom').read_text()
+    assert 'calculator_operation_seconds_bucket{operation="calculate",le="+Inf"} 2' in text
+    assert 'calculator_operation_seconds_bucket{operation="calculate",le="0.005"} 1' in text
+    assert 'calculator_operation_errors_total{operation="calculate"} 1' in text
+
+
+def test_profile_capture(tmp_path):
+    import pstats
+
+    metrics = Metrics()
+    path = str(tmp_path / 'profile.prof')
+    metrics.profile_next(2, path)
+    jobs = [metrics.wrap_job(sum, ([1, 2],)) for _ in range(3)]
+    assert [job[0] for job in jobs] == [profile_call, profile_call, sum]
+    for func, args in jobs:
+        assert func(*args) == 3
+    assert pstats.Stats(path).total_calls > 0
@@ -0,0 +1,76 @@
+"""Tiled plot sampling; the window itself needs a display and is not tested."""
+import numpy as np
+import pytest
+
+from calc_engine import ExpressionError
+from calc_plot import TILE_SAMPLES, FunctionSampler, decimate
+
+
+def test_samples_are_exact_and_cover_the_view():
+    sampler = FunctionSampler("x**2 - 3*x")
+    xs, ys, complete = sampler.samples(-4.0, 4.0, 400)
+    assert complete
+    assert xs[0] <= -4.0 and xs[-1] >= 4.0
+    assert np.all(np.diff(xs) >= 0)
+    np.testing.assert_allclose(ys, xs ** 2 - 3 * xs)
+
+
+def test_zoom_and_pan_reuse_cached_samples():
+    sampler = FunctionSampler("2*x + 1")  # straight, so nothing is refined
+    sampler.samples(0.0, 8.0, 256)
+    first = sampler.evaluations
+    tiles = len(sampler.tiles)
+    sampler.samples(0.0, 8.0, 256)
+    assert sampler.evaluations == first
+    # One level in: every other sample comes from the parent tiles
+    sampler.samples(0.0, 4.0, 256)
+    assert sampler.evaluations - first <= (len(sampler.tiles) - tiles) * TILE_SAMPLES // 2
+
+    sampler = FunctionSampler("2*x + 1")
+    sampler.samples(0.0, 4.0, 256)
+    first = sampler.evaluations
+    # One level out: assembled from the children, except the last tile which
+    # only has its left child
+    sampler.samples(0.0, 4.0, 128)
+    assert sampler.evaluations - first <= TILE_SAMPLES + 1
+    # Panning only computes the tiles scrolled into view
+    first = sampler.evaluations
+    sampler.samples(0.5, 4.5, 128)
+    assert sampler.evaluations - first <= TILE_SAMPLES + 1
+
+
+def test_poles_are_split_with_nan():
+    sampler = FunctionSampler("tan(x)")
+    xs, ys, _ = sampler.samples(0.0, 180.0, 300)
+    assert np.isnan(ys).any()
+    left, right = ys[xs < 89.9], ys[xs > 90.1]
+    assert np.nanmax(left) > 100 and np.nanmin(right) < -100
+
+
+def test_budget_limits_work_per_call():
+    sampler = FunctionSampler("x")
+    sampler.samples(0.0, 1.0, 100)  # measures the cost of a tile
+    tiles = len(sampler.tiles)
+    _, _, complete = sampler.samples(0.0, 1000.0, 1000, budget=0.0)
+    assert not complete and len(sampler.tiles) == tiles + 1
+    for _ in range(100):
+        _, _, complete = sampler.samples(0.0, 1000.0, 1000, budget=0.0)
+        if complete:
+            break
+    assert complete
+
+
+def test_other_variables_are_rejected():
+    with pytest.raises(ExpressionError):
+        FunctionSampler("x + y")
+
+
+def test_decimate_keeps_extremes_per_column():
+    xs = np.linspace(0.0, 1.0, 1001)
+    ys = np.sin(xs * 40)
+    px, values = decimate(xs, ys, 0.0, 1.0, 10)
+    assert len(px) == len(values) == 4 * 11
+    assert values.max() == ys.max() and values.min() == ys.min()
+    ys[500] = np.nan
+    _, values = decimate(xs, ys, 0.0, 1.0, 10)
+    assert np.isnan(values).any()
@@ -0,0 +1,155 @@
+import random
+
+import pytest
+
+from calc_engine import ExpressionError, evaluate
+from calc_headless import HeadlessCalculator
+from calc_preview import IncrementalEvaluator
+
+EXPRESSIONS = [
+    "1+2*3",
+    "(1+2)*3",
+    "2**3**2",
+    "-2**2+7",
+    "10 mod 4 + 7%3",
+    "3×4÷2-1",
+    "2e3+1.5e-3",
+    "3e2e1",
+    "sin(30)+cos(60)*tan(45)",
+    "sqrt(abs(-16))+log(1000)+ln(1)",
+    "factorial(5)/factorial(3)",
+    "nCr(10, 3)*nPr(4, 2)+nCr(2+3, (1+1))",
+    "((((1+2)*3)+4)*5)",
+    "1/3+1/3+1/3",
+]
+
+
+def full(text, angle_mode='DEG'):
+    try:
+        return evaluate(text, angle_mode)
+    except (ExpressionError, ArithmeticError, ValueError):
+        return None
+
+
+@pytest.mark.parametrize('text', EXPRESSIONS)
+def test_typed_expression_matches_full_evaluation(text):
+    evaluator = IncrementalEvaluator()
+    for end in range(1, len(text) + 1):
+        value = evaluator.update(text[:end])
+        # Typing incrementally reaches the same state as starting afresh
+        assert value == IncrementalEvaluator().update(text[:end])
+    assert value == pytest.approx(full(text))
+
+
+def test_trailing_operator_is_ignored():
+    evaluator = IncrementalEvaluator()
+    assert evaluator.update("2+3*") == 5
+    assert evaluator.update("2+3*(") == 5
+    assert evaluator.update("2+3*(4") == 14
+    assert evaluator.update("(2+3") == 5
+    assert evaluator.update("nCr(5, 2") == 10
+
+
+def test_invalid_and_failing_expressions_have_no_value():
+    evaluator = IncrementalEvaluator()
+    assert evaluator.update("1/0") is None
+    assert evaluator.update("2 $") is None
+    assert evaluator.update("2)") is None
+    assert evaluator.update("9**9**9") is None
+    assert evaluator.update("(1, 2)") is None
+    assert evaluator.update("nCr(5)") is None
+    assert evaluator.update("nCr(5, 2, 1)") is None
+    assert evaluator.update("2") == 2
+
+
+def test_random_edits_match_full_evaluation():
+    rng = random.Random(7)
+    alphabet = list("0123456789+-*/().") + ["**", " mod ", "e", "sin(", "sqrt(", "nCr(", ","]
+    evaluator = IncrementalEvaluator()
+    text = ""
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.65 or not text:
+            text += rng.choice(alphabet)
+        elif action < 0.9:
+            text = text[:-rng.randint(1, 3)]
+        else:
+            # Edit in the middle, as a paste or history recall would
+            cut = rng.randrange(len(text))
+            text = text[:cut] + rng.choice(alphabet) + text[cut + 1:]
+        value = evaluator.update(text)
+        assert value == IncrementalEvaluator().update(text), text
+        expected = full(text)
+        if expected is not None and value is not None:
+            assert value == pytest.approx(expected, nan_ok=True), text
+
+
+def test_appended_and_deleted_pieces_match_update():
+    rng = random.Random(11)
+    alphabet = list("0123456789+-*/().") + ["**", " mod ", "e", "sin(", "nCr(", ","]
+    evaluator = IncrementalEvaluator()
+    text = ""
+    for _ in range(2000):
+        # Several edits may arrive before one debounced refresh
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.7 or not text:
+                piece = rng.choice(alphabet)
+                text += piece
+                evaluator.append(piece)
+            else:
+                count = rng.randint(1, 3)
+                text = text[:-count]
+                evaluator.delete(count)
+        value = evaluator.refresh(max_tokens=rng.choice([None, 8]))
+        while evaluator.pending:
+            value = evaluator.refresh(max_tokens=8)
+        assert evaluator.text == text
+        assert value == IncrementalEvaluator().update(text), text
+
+
+def test_variables_are_previewed():
+    values = {'a': 3}
+    evaluator = IncrementalEvaluator(variables=values)
+    assert evaluator.update("a*2+b") is None
+    values['b'] = 1
+    evaluator.variables_changed()
+    assert evaluator.refresh() == 7
+    values['a'] = 10
+    evaluator.variables_changed()
+    assert evaluator.refresh() == 21
+
+
+def test_calculator_feeds_edits_and_worksheet_values():
+    calculator = HeadlessCalculator()
+    try:
+        calculator.refresh_variables(calculator.worksheet.define('a', "3"))
+        calculator.paste_text("a")
+        for label in ['×', '2', '5', '⌫']:
+            calculator.button_click(label)
+        assert calculator.preview.text == calculator.current_expression == "a*2"
+        calculator.update_preview()
+        assert calculator.expression_label.text == "= 6"
+        calculator.refresh_variables(calculator.worksheet.define('a', "4"))
+        calculator.update_preview()
+        assert calculator.expression_label.text == "= 8"
+        calculator.button_click('=')
+        assert calculator.preview.text == calculator.current_expression == "8"
+    finally:
+        calculator.close()
+
+
+def test_sliced_update_resumes():
+    text = "+".join(["1"] * 1000)
+    evaluator = IncrementalEvaluator()
+    assert evaluator.update(text, max_tokens=300) is None
+    assert evaluator.pending
+    while evaluator.pending:
+        value = evaluator.update(text, max_tokens=300)
+    assert value == 1000
+
+
+def test_angle_mode_switch_recomputes():
+    evaluator = IncrementalEvaluator()
+    assert evaluator.update("sin(90)") == 1
+    evaluator.set_angle_mode('RAD')
+    assert evaluator.value() == pytest.approx(full("sin(90)", 'RAD'))
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from calc_server import EvaluationServer, evaluate_record
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_evaluate_record():
+    assert evaluate_record("3×4") == {'expression': "3×4", 'result': 12, 'display': "12"}
+    assert evaluate_record("1/0")['error'] == "Cannot divide by zero"
+    assert evaluate_record("2+")['error'] == "Error"
+    huge = evaluate_record("factorial(1000)")
+    assert huge['result'] is None and huge['display'].startswith("4.023872601e2567")
+
+
+async def _exchange(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+def _with_server(scenario, **options):
+    async def main():
+        server = EvaluationServer(workers=2, **options)
+        await server.start(port=0)
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_endpoints():
+    async def scenario(port):
+        assert await _exchange(port, 'POST', '/evaluate', {'expression': "sin(30)*2"}) == (
+            200, {'expression': "sin(30)*2", 'result': 1.0, 'display': "1.0"})
+        status, body = await _exchange(port, 'POST', '/evaluate/batch',
+                                       {'expressions': ["1+1", "cos(0)"], 'angle_mode': 'rad'})
+        assert status == 200
+        assert [record['result'] for record in body['results']] == [2, 1.0]
+        assert (await _exchange(port, 'GET', '/health'))[1]['workers'] == 2
+        assert (await _exchange(port, 'GET', '/nope'))[0] == 404
+        assert (await _exchange(port, 'GET', '/evaluate'))[0] == 405
+        assert (await _exchange(port, 'POST', '/evaluate', {'expression': 3}))[0] == 400
+        assert (await _exchange(port, 'POST', '/evaluate',
+                                {'expression': "1", 'angle_mode': 'GRAD'}))[0] == 400
+    _with_server(scenario)
+
+
+def test_runaway_expression_times_out_and_the_worker_recovers():
+    async def scenario(port):
+        assert (await _exchange(port, 'POST', '/evaluate', {'expression': "9**9**9"}))[0] == 504
+        assert (await _exchange(port, 'POST', '/evaluate', {'expression': "2+2"}))[1]['result'] == 4
+    _with_server(scenario, timeout=0.5)
+
+
+def _children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def _gone(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return stat.read().split(')')[-1].split()[0] == 'Z'
+    except OSError:
+        return True
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/task'), reason="needs /proc")
+def test_sigterm_shuts_the_workers_down():
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'calc_server.py'),
+                                '--port', '0', '-j', '2'], stderr=subprocess.PIPE, text=True)
+    try:
+        assert process.stderr.readline().startswith("Serving on ")
+        workers = _children(process.pid)
+        assert len(workers) == 2
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(10) == 0
+        deadline = time.monotonic() + 5
+        while not all(_gone(pid) for pid in workers) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert all(_gone(pid) for pid in workers)
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,96 @@
+"""Streaming statistics against NumPy over the same data."""
+import io
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import calc_stats
+from calc_engine import ExpressionError
+from calc_stats import (Summary, iter_stream_chunks, iter_text_chunks, main, parse_numbers,
+                        summarize_file, summarize_range, summarize_text)
+
+
+@pytest.fixture(scope='module')
+def values():
+    return np.random.default_rng(7).normal(1e6, 3.0, 20000)
+
+
+def check(summary, values):
+    assert summary.count == len(values)
+    assert summary.mean == pytest.approx(values.mean(), rel=1e-14)
+    assert summary.variance() == pytest.approx(values.var(ddof=1), rel=1e-9)
+    assert (summary.minimum, summary.maximum) == (values.min(), values.max())
+    for q in (0.01, 0.5, 0.99):
+        assert summary.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.011)
+
+
+def test_chunked_updates_and_merges_match(values):
+    whole = Summary().update(values)
+    check(whole, values)
+    pieces = [Summary().update(part) for part in np.array_split(values, 7)]
+    merged = Summary()
+    for piece in pieces:
+        merged.merge(piece)
+    check(merged, values)
+    assert merged.variance() == pytest.approx(whole.variance(), rel=1e-12)
+
+
+def test_parse_numbers():
+    assert parse_numbers("1, 2;3\n4\t-5e-1").tolist() == [1, 2, 3, 4, -0.5]
+    with pytest.raises(ExpressionError, match="'x'"):
+        parse_numbers("1 x 3")
+    assert summarize_text("").count == 0
+
+
+@pytest.mark.parametrize('separator', ["\n", ", ", ";", " "])
+def test_text_ranges_read_every_number_once(tmp_path, values, separator):
+    path = tmp_path / "data.txt"
+    path.write_text(separator.join(repr(v) for v in values.tolist()))
+    size = path.stat().st_size
+    # Small blocks and ranges that cut through numbers
+    bounds = [0, 1, 999, size // 3, size // 2 + 7, size]
+    total = Summary()
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        chunks = list(iter_text_chunks(str(path), start, end, block_bytes=4096))
+        assert all(len(chunk) < 4096 for chunk in chunks)
+        for chunk in chunks:
+            total.update(chunk)
+    check(total, values)
+    check(summarize_range(str(path), 0, size), values)
+
+
+def test_one_line_stream_is_read_in_blocks(values):
+    data = ",".join(repr(v) for v in values.tolist()).encode()
+    chunks = list(iter_stream_chunks(io.BytesIO(data), block_bytes=4096))
+    assert len(chunks) > 1 and max(len(chunk) for chunk in chunks) < 4096
+    check(Summary().update(np.concatenate(chunks)), values)
+
+
+def test_binary_columns_and_processes(tmp_path, values, monkeypatch):
+    np.save(tmp_path / "data.npy", values)
+    values.astype('<f8').tofile(tmp_path / "data.f64")
+    check(summarize_file(str(tmp_path / "data.npy")), values)
+    monkeypatch.setattr(calc_stats, 'MIN_PARTITION_BYTES', 4096)
+    check(summarize_file(str(tmp_path / "data.f64"), workers=3), values)
+    (tmp_path / "data.txt").write_text(" ".join(repr(v) for v in values.tolist()))
+    check(summarize_file(str(tmp_path / "data.txt"), workers=3), values)
+
+
+def test_cli(tmp_path, capsys):
+    path = tmp_path / "data.csv"
+    path.write_text("1,2,3,4\n")
+    assert main([str(path)]) == 0
+    assert "count" in capsys.readouterr().out
+    assert main([str(tmp_path / "missing.txt")]) == 1
+
+
+def test_cli_does_not_load_tk():
+    code = ("import sys, calc_stats; calc_stats.main(['-']); "
+            "sys.exit('tkinter' in sys.modules)")
+    result = subprocess.run([sys.executable, '-c', code], input=b"1 2 3\n", capture_output=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode == 0, result.stderr
+    assert b"count" in result.stdout
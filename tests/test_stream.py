@@ -0,0 +1,34 @@
+import time
+
+from calc_stream import evaluate_line, evaluate_lines, main, stream
+
+
+def test_evaluate_lines_formats_like_the_display():
+    lines = ["1+2\n", "\n", "3×4÷2", "1/0", "2+", "  0.1+0.2  "]
+    assert evaluate_lines(lines) == ["3", "", "6.0", "Cannot divide by zero", "Error", "0.3"]
+    assert evaluate_lines(["2e3"], echo=True) == ["2e3 = 2000"]
+    assert evaluate_line("sin(90)", 'RAD') != evaluate_line("sin(90)", 'DEG')
+
+
+def test_huge_powers_are_refused_quickly():
+    started = time.perf_counter()
+    assert evaluate_lines(["9**9**9", "2**2**40", "1e999999999", "2**100"]) == [
+        "Error", "Error", "Error", "1267650600228229401496703205376"]
+    assert time.perf_counter() - started < 1
+
+
+def test_stream_preserves_order_across_workers():
+    lines = [f"{i}*2" for i in range(50)]
+    lines[7] = "9**9**9"
+    expected = [str(i * 2) for i in range(50)]
+    expected[7] = "Error"
+    assert list(stream(lines, workers=1, chunk_size=4)) == expected
+    assert list(stream(lines, workers=2, chunk_size=4)) == expected
+
+
+def test_main_writes_one_line_per_input(tmp_path):
+    source = tmp_path / "in.txt"
+    source.write_text("1+1\n2**10\n", encoding='utf-8')
+    target = tmp_path / "out.txt"
+    assert main([str(source), '-o', str(target), '-j', '1', '--echo']) == 0
+    assert target.read_text(encoding='utf-8') == "1+1 = 2\n2**10 = 1024\n"
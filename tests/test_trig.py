@@ -0,0 +1,75 @@
+"""Exact degree reduction and the table-driven sine and cosine."""
+import math
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from calc_trig import (TableTrig, cos_degrees, cos_degrees_array, main, sin_degrees,
+                       sin_degrees_array, tan_degrees, tan_degrees_array)
+
+
+def exact_sin_degrees(x):
+    """sin of a float number of degrees, reduced in exact rational arithmetic"""
+    reduced = Fraction(x) % 360
+    return math.sin(float(reduced) * math.pi / 180)
+
+
+def test_multiples_of_90_are_exact():
+    angles = [0, 90, 180, 270, 360, -90, -180, 540, 3.6e15 + 180, 90.0 * 2 ** 60]
+    for x in angles:
+        quadrant = round(Fraction(x) % 360 / 90) % 4
+        assert sin_degrees(x) == [0.0, 1.0, 0.0, -1.0][quadrant]
+        assert cos_degrees(x) == [1.0, 0.0, -1.0, 0.0][quadrant]
+    assert math.copysign(1, sin_degrees(180)) == 1  # 0.0, not -0.0
+    np.testing.assert_array_equal(sin_degrees_array(angles), [sin_degrees(x) for x in angles])
+    np.testing.assert_array_equal(cos_degrees_array(angles), [cos_degrees(x) for x in angles])
+
+
+def test_huge_angles_are_reduced_exactly():
+    for x in (1e22, -3.3e19, 123456789.123, 2.0 ** 70 + 2 ** 20):
+        assert sin_degrees(x) == pytest.approx(exact_sin_degrees(x), abs=1e-15)
+        assert sin_degrees_array([x])[0] == sin_degrees(x)
+    assert sin_degrees(1e22) == pytest.approx(-0.9848077530122081, abs=1e-15)
+
+
+def test_tan_is_undefined_at_odd_multiples_of_90():
+    for x in (90, -90, 270, 450.0):
+        with pytest.raises(ValueError):
+            tan_degrees(x)
+    result = tan_degrees_array([90, -90, 270, 45, 135, 0])
+    assert np.isnan(result[:3]).all()
+    np.testing.assert_allclose(result[3:], [1, -1, 0], atol=1e-15)
+
+
+def test_arrays_match_the_scalar_functions():
+    x = np.random.default_rng(1).uniform(-1e6, 1e6, 5000)
+    # The array path takes cos r as sin(r + π/2), which may differ by an ulp
+    np.testing.assert_allclose(sin_degrees_array(x), [sin_degrees(v) for v in x.tolist()],
+                               rtol=0, atol=2.3e-16)
+    np.testing.assert_allclose(cos_degrees_array(x), [cos_degrees(v) for v in x.tolist()],
+                               rtol=0, atol=2.3e-16)
+    assert np.isnan(sin_degrees_array([np.inf, np.nan])).all()
+
+
+@pytest.mark.parametrize('angle_mode', ['DEG', 'RAD'])
+@pytest.mark.parametrize('tolerance', [1e-3, 1e-6, 1e-10])
+def test_table_trig_is_within_its_bound(angle_mode, tolerance):
+    table = TableTrig(angle_mode, tolerance)
+    assert table.error_bound <= tolerance
+    turn = 360 if angle_mode == 'DEG' else 2 * math.pi
+    x = np.random.default_rng(2).uniform(-8, 8, 50000) * turn
+    x = np.concatenate((x, [0, turn / 4, turn / 2, 1e20]))
+    exact_sin = sin_degrees_array if angle_mode == 'DEG' else np.sin
+    exact_cos = cos_degrees_array if angle_mode == 'DEG' else np.cos
+    assert np.abs(table.sin(x) - exact_sin(x)).max() <= table.error_bound
+    assert np.abs(table.cos(x) - exact_cos(x)).max() <= table.error_bound
+
+
+def test_table_trig_rejects_bad_tolerances_and_reports(capsys):
+    for tolerance in (0, 1e-20, 1):
+        with pytest.raises(ValueError):
+            TableTrig('DEG', tolerance)
+    assert main(['--tolerance', '1e-6', '--size', '20000']) == 0
+    assert "table" in capsys.readouterr().out
+    assert main(['--tolerance', '0']) == 1
@@ -0,0 +1,91 @@
+"""Worksheet dependency tracking and incremental recompute."""
+import pytest
+
+from calc_engine import ExpressionError
+from calc_variables import Worksheet, describe, parse_assignment
+
+
+@pytest.fixture
+def sheet():
+    sheet = Worksheet()
+    sheet.define('a', "3")
+    sheet.define('b', "a*2")
+    sheet.define('c', "b+1")
+    sheet.define('d', "5")
+    return sheet
+
+
+def test_values_follow_their_inputs(sheet):
+    assert [sheet.value(name) for name in 'abcd'] == [3, 6, 7, 5]
+    assert sheet.define('a', "10") == ['a', 'b', 'c']
+    assert (sheet.value('b'), sheet.value('c')) == (20, 21)
+
+
+def test_only_changed_values_propagate(sheet):
+    sheet.recomputed = 0
+    sheet.define('d', "2+3")
+    assert sheet.recomputed == 1
+    # Redefined to the same value: reported, but nothing downstream runs
+    assert sheet.define('a', "1+2") == ['a']
+    assert sheet.recomputed == 2
+    # b changes shape but not value, so c is left alone
+    sheet.define('b', "a+a")
+    assert sheet.recomputed == 3
+
+
+def test_propagation_stops_where_a_value_settles():
+    sheet = Worksheet()
+    sheet.define('x', "1")
+    sheet.define('sign', "abs(x)/x")
+    sheet.define('far', "sign*100")
+    sheet.recomputed = 0
+    assert sheet.define('x', "7") == ['x']
+    assert sheet.recomputed == 2
+    assert sheet.value('far') == 100
+
+
+@pytest.mark.parametrize('name, source', [('a', "a+1"), ('a', "c*2"), ('b', "c")])
+def test_cycles_are_refused(sheet, name, source):
+    before = sheet.source(name)
+    with pytest.raises(ExpressionError, match="Circular"):
+        sheet.define(name, source)
+    assert sheet.source(name) == before
+
+
+def test_undefined_removed_and_failing_inputs_are_errors(sheet):
+    sheet.define('u', "later*2")
+    assert sheet.error('u') == "later is undefined"
+    sheet.define('later', "4")
+    assert sheet.value('u') == 8
+    assert sheet.remove('a') == ['a', 'b', 'c']
+    assert sheet.error('b') == "a is undefined" and sheet.error('c') == "b has an error"
+    sheet.define('a', "0")
+    sheet.define('b', "1/a")
+    assert sheet.error('b') == "Cannot divide by zero"
+    sheet.define('a', "2")
+    assert sheet.value('c') == 1.5
+
+
+def test_angle_mode_recomputes_trigonometry_only():
+    sheet = Worksheet()
+    sheet.define('t', "sin(90)")
+    sheet.define('k', "sin(0)")
+    sheet.define('u', "t*2")
+    sheet.define('v', "k+1")
+    sheet.define('plain', "4")
+    sheet.recomputed = 0
+    changed = sheet.set_angle_mode('RAD')
+    assert sorted(changed) == ['t', 'u']
+    assert sheet.recomputed == 3
+    assert sheet.value('u') == pytest.approx(2 * 0.8939966636005579)
+    assert sheet.set_angle_mode('RAD') == []
+
+
+def test_names_and_listing(sheet):
+    for name in ("e", "e2", "mod", "sin", "1x"):
+        with pytest.raises(ExpressionError):
+            sheet.define(name, "1")
+    assert parse_assignment(" r = 2 * a ") == ('r', "2 * a")
+    assert parse_assignment("2 * a") is None
+    assert describe(sheet, 'b') == "b = a*2  →  6"
+    assert describe(sheet, 'd') == "d = 5"
@@ -0,0 +1,98 @@
+import math
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from calc_worker import ERROR, OK, TIMEOUT, EvaluationWorker
+
+
+def _wait(worker, limit=10):
+    deadline = time.monotonic() + limit
+    while time.monotonic() < deadline:
+        outcome = worker.poll(0.05)
+        if outcome is not None:
+            return outcome
+    raise AssertionError("no outcome")
+
+
+@pytest.fixture
+def worker():
+    worker = EvaluationWorker(timeout=1.0)
+    yield worker
+    worker.close()
+
+
+def test_result_and_error(worker):
+    worker.submit(math.factorial, 20)
+    assert _wait(worker) == (OK, 2432902008176640000)
+    worker.submit(math.sqrt, -1)
+    status, error = _wait(worker)
+    assert status == ERROR and isinstance(error, ValueError)
+
+
+def test_timeout_kills_and_restarts(worker):
+    worker.submit(pow, 9, 9 ** 9)
+    assert _wait(worker) == (TIMEOUT, None)
+    worker.submit(abs, -3)
+    assert _wait(worker) == (OK, 3)
+
+
+def test_cancel(worker):
+    worker.submit(time.sleep, 30)
+    worker.cancel()
+    assert not worker.busy
+    assert worker.poll() is None
+
+
+def test_only_one_job_at_a_time(worker):
+    worker.submit(time.sleep, 0.2)
+    with pytest.raises(RuntimeError):
+        worker.submit(abs, 1)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A zombie still answers kill(); it has exited all the same
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            return stat.read().split(')')[-1].split()[0] != 'Z'
+    except OSError:
+        return True
+
+
+@pytest.mark.parametrize('busy', [False, True])
+def test_workers_exit_with_their_parent(tmp_path, busy):
+    if busy and not sys.platform.startswith('linux'):
+        pytest.skip("a busy worker is only killed with its parent on Linux")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = textwrap.dedent(f"""
+        import os, sys, time
+        sys.path.insert(0, {root!r})
+        from calc_worker import EvaluationWorker
+        workers = [EvaluationWorker(), EvaluationWorker()]
+        for worker in workers:
+            worker.start()
+        print(' '.join(str(worker._process.pid) for worker in workers), flush=True)
+        if {busy!r}:
+            workers[0].submit(pow, 9, 9 ** 9)
+            time.sleep(0.3)
+        os._exit(0)  # no close(), as when the parent is killed
+    """)
+    output = tmp_path / 'pids'
+    with open(output, 'w') as f:
+        subprocess.run([sys.executable, '-c', script], stdout=f, timeout=30, check=True)
+    pids = [int(pid) for pid in output.read_text().split()]
+    deadline = time.monotonic() + 5
+    while any(_alive(pid) for pid in pids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    alive = [pid for pid in pids if _alive(pid)]
+    for pid in alive:
+        os.kill(pid, 9)
+    assert not alive